@@ -0,0 +1,64 @@
+"""add send ledger claims
+
+Revision ID: b3d8f1a6c2e9
+Revises: a7e3b9d1c5f2
+Create Date: 2026-10-17 19:12:36.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d8f1a6c2e9'
+down_revision = 'a7e3b9d1c5f2'
+branch_labels = None
+depends_on = None
+
+SCENARIO_TYPES = ('UNSUBSCRIBED_REMINDER', 'DAILY_SCORE_UPDATE', 'EVE_SCORE_RANKING', 'SUBSCRIPTION_EXPIRY', 'INACTIVE_SUBSCRIBER', 'DAILY_PLAY_REMINDER', 'DAILY_WINNER_CONGRATS', 'DAILY_REFERRAL_PROMO', 'WEEKLY_WINNER_LIST_PROMO', 'WINNING_POSITION_WARNING')
+MESSENGER_TYPES = ('MAIL', 'WHATSAPP', 'TELEGRAM', 'DISCORD')
+
+
+def create_ledger(name: str, claims: bool) -> None:
+    columns = [
+        sa.Column('scenario_type', sa.Enum(*SCENARIO_TYPES, name='messagescenariotype'), nullable=False),
+        sa.Column('send_date', sa.Date(), nullable=False),
+        sa.Column('messenger_type', sa.Enum(*MESSENGER_TYPES, name='messengertype'), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), autoincrement=False, nullable=False),
+    ]
+    key = ['scenario_type', 'send_date', 'messenger_type', 'user_id']
+    if claims:
+        columns += [
+            sa.Column('message_key', sa.String(length=64), nullable=False),
+            sa.Column('claim_id', sa.String(length=32), nullable=False),
+            sa.Column('status', sa.Enum('CLAIMED', 'SENT', name='ledgerstatus'), nullable=False),
+        ]
+        key.append('message_key')
+    op.create_table(name, *columns, sa.Column('created_at', sa.DateTime(), nullable=False), sa.PrimaryKeyConstraint(*key))
+
+
+def upgrade() -> None:
+    # The primary key gains message_key, so the table is rebuilt. An old row
+    # meant "this user got the scenario today", so it is carried over with
+    # the "*" key, which blocks every message of that scenario and day.
+    op.rename_table('scenario_send_ledger', 'scenario_send_ledger_old')
+    create_ledger('scenario_send_ledger', claims=True)
+    op.execute(
+        "INSERT INTO scenario_send_ledger "
+        "(scenario_type, send_date, messenger_type, user_id, message_key, claim_id, status, created_at) "
+        "SELECT scenario_type, send_date, messenger_type, user_id, '*', 'migrated', 'SENT', created_at "
+        "FROM scenario_send_ledger_old"
+    )
+    op.drop_table('scenario_send_ledger_old')
+
+
+def downgrade() -> None:
+    op.rename_table('scenario_send_ledger', 'scenario_send_ledger_new')
+    create_ledger('scenario_send_ledger', claims=False)
+    op.execute(
+        "INSERT INTO scenario_send_ledger (scenario_type, send_date, messenger_type, user_id, created_at) "
+        "SELECT scenario_type, send_date, messenger_type, user_id, MIN(created_at) "
+        "FROM scenario_send_ledger_new WHERE status = 'SENT' "
+        "GROUP BY scenario_type, send_date, messenger_type, user_id"
+    )
+    op.drop_table('scenario_send_ledger_new')
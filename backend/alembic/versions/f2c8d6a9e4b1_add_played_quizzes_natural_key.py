@@ -0,0 +1,103 @@
+"""add played quizzes natural key
+
+Revision ID: f2c8d6a9e4b1
+Revises: a1f4e8c3d5b7
+Create Date: 2026-10-17 16:41:27.903514
+
+"""
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8d6a9e4b1'
+down_revision = 'a1f4e8c3d5b7'
+branch_labels = None
+depends_on = None
+
+DELETE_BATCH_SIZE = 1000
+
+played = sa.table('played_quizzes', sa.column('id', sa.BigInteger), sa.column('user_id', sa.BigInteger),
+                  sa.column('subs_id', sa.BigInteger), sa.column('score', sa.Integer), sa.column('created_at', sa.DateTime))
+activity = sa.table('user_daily_activity', sa.column('day', sa.Date), sa.column('user_id', sa.BigInteger),
+                    sa.column('subs_id', sa.BigInteger), sa.column('rounds', sa.Integer), sa.column('max_score', sa.Integer),
+                    sa.column('sum_score', sa.Integer), sa.column('last_played_at', sa.DateTime))
+
+
+# Frozen copies of app.utils.helpers.chunked / day_range as of this revision,
+# so the migration doesn't import the app or change when the helpers do
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def day_range(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def dedupe_played_quizzes() -> set:
+    """
+    Keep the first row (lowest id) of every (user_id, subs_id, created_at, score)
+    group. Returns the days that lost rows. Rows with a NULL subs_id or score are
+    left alone: the unique index does not cover them either.
+    """
+    bind = op.get_bind()
+    key = (played.c.user_id, played.c.subs_id, played.c.created_at, played.c.score)
+    groups = sa.select(*key, sa.func.min(played.c.id).label('keep_id'))\
+        .where(played.c.subs_id.isnot(None), played.c.score.isnot(None))\
+        .group_by(*key).having(sa.func.count() > 1).subquery()
+
+    rows = bind.execute(
+        sa.select(played.c.id, played.c.created_at).join(groups, sa.and_(
+            played.c.user_id == groups.c.user_id,
+            played.c.subs_id == groups.c.subs_id,
+            played.c.created_at == groups.c.created_at,
+            played.c.score == groups.c.score,
+        )).where(played.c.id != groups.c.keep_id)
+    ).fetchall()
+
+    for ids in chunked([row.id for row in rows], DELETE_BATCH_SIZE):
+        bind.execute(played.delete().where(played.c.id.in_(ids)))
+    return {row.created_at.date() for row in rows}
+
+
+def rebuild_daily_activity(days: set) -> None:
+    """Recompute user_daily_activity for days whose plays were deduplicated."""
+    bind = op.get_bind()
+    day = sa.func.date(played.c.created_at)
+    subs_id = sa.func.coalesce(played.c.subs_id, 0)
+    for current in sorted(days):
+        start, end = day_range(current)
+        bind.execute(activity.delete().where(activity.c.day == current))
+        bind.execute(activity.insert().from_select(
+            ['day', 'user_id', 'subs_id', 'rounds', 'max_score', 'sum_score', 'last_played_at'],
+            sa.select(
+                day, played.c.user_id, subs_id, sa.func.count(played.c.id), sa.func.max(played.c.score),
+                sa.func.coalesce(sa.func.sum(played.c.score), 0), sa.func.max(played.c.created_at),
+            ).where(played.c.created_at >= start, played.c.created_at < end)
+             .group_by(day, played.c.user_id, subs_id)
+        ))
+
+
+def upgrade() -> None:
+    rebuild_daily_activity(dedupe_played_quizzes())
+    # Leaderboards still count removed duplicates: run scripts/rebuild_leaderboards.py
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_index('ix_played_quizzes_user_id_subs_id_created_at_score', 'played_quizzes', ['user_id', 'subs_id', 'created_at', 'score'], unique=True)
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index('ix_played_quizzes_user_id_subs_id_created_at_score', table_name='played_quizzes')
+    # ### end Alembic commands ###
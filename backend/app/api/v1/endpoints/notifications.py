@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.services.messaging import messaging_service
+from app.services.messaging.recipients import Recipient
 from app.models.enums import MessengerType, NotificationContextType, MessageScenarioType
 from app.crud import user as user_crud
 
@@ -94,6 +95,17 @@ def trigger_logic_check(
     result = messaging_service.process_daily_check(db, user_id)
     return result
 
+@router.post("/trigger-logic-check-bulk")
+def trigger_logic_check_bulk(
+    db: Session = Depends(deps.get_db)
+) -> Any:
+    """
+    Run the business logic check for every user at once.
+    Only users who can still win are notified, on their preferred messenger.
+    """
+    result = messaging_service.process_daily_check_bulk(db)
+    return result
+
 @router.post("/send-bulk")
 def send_bulk_notifications(
     messenger_type: MessengerType,
@@ -111,39 +123,45 @@ def send_bulk_notifications(
     from app.models.quiz import UserSubscribed
     from sqlalchemy import exists
 
-    query = db.query(User)
-    
+    filters = []
     if has_subscription is not None:
         if has_subscription:
-            query = query.filter(exists().where(UserSubscribed.user_id == User.id))
+            filters.append(exists().where(UserSubscribed.user_id == User.id))
         else:
-            query = query.filter(~exists().where(UserSubscribed.user_id == User.id))
+            filters.append(~exists().where(UserSubscribed.user_id == User.id))
             
     if subscription_id:
-        query = query.filter(
+        filters.append(
             exists().where(
                 (UserSubscribed.user_id == User.id) &
                 (UserSubscribed.subs_id == subscription_id)
             )
         )
-        
-    users = query.all()
-    count = 0
-    
-    for user in users:
-        # Determine receiver based on type
-        receiver = user.email # Default
-        if messenger_type == MessengerType.WHATSAPP:
-             receiver = user.phone_number
-             
-        # Call service (synchronous for now, ideally queue this)
-        if receiver:
-             messaging_service.send_message(db, messenger_type, receiver, text, link, user_id=user.id)
-             count += 1
+
+    # Receiver based on type: phone for WhatsApp, email otherwise
+    contact_column = User.phone_number if messenger_type == MessengerType.WHATSAPP else User.email
+
+    def recipients():
+        for batch in user_crud.iter_audience(db, columns=(contact_column,), filters=filters):
+            for user_id, receiver in batch:
+                if receiver:
+                    yield Recipient(user_id, text, link, receiver)
+
+    # Call service (synchronous for now, ideally queue this)
+    results = messaging_service.send_messages(db, messenger_type, recipients())
+    count = len(results)
              
     return {"status": "success", "queued_count": count}
 
 
+@router.get("/stats")
+def get_messaging_stats() -> Any:
+    """
+    Runtime counters of the messaging service (audit log buffer).
+    """
+    return messaging_service.stats()
+
+
 @router.post("/send-channel")
 def send_channel_notification(
     text: str,
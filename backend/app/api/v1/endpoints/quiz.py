@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from app.api import deps
 from app.crud import quiz as quiz_crud, user_subscribed as user_subscribed_crud
 from app.schemas.quiz import PlayedQuiz, PlayedQuizCreate, UserSubscribed
+from app.services.leaderboard import leaderboard_service
 from app.services.subscription_service import subscription_service
 
 router = APIRouter()
@@ -44,7 +45,10 @@ def get_user_subscriptions(user_id: int, db: Session = Depends(deps.get_db)) ->
 
 @router.post("/", response_model=PlayedQuiz)
 def create_quiz(quiz_in: PlayedQuizCreate, db: Session = Depends(deps.get_db)) -> Any:
-    return quiz_crud.create(db, obj_in=quiz_in)
+    quiz = quiz_crud.create(db, obj_in=quiz_in)
+    # After the commit, so a rolled back play never reaches the boards
+    leaderboard_service.record_play(quiz.user_id, quiz.subs_id, quiz.score)
+    return quiz
 
 @router.get("/{id}", response_model=PlayedQuiz)
 def read_quiz(id: int, db: Session = Depends(deps.get_db)) -> Any:
@@ -4,6 +4,8 @@ from sqlalchemy.orm import Session
 
 from app import crud, schemas, models
 from app.api import deps
+from app.crud.quiz import Link
+from app.services.leaderboard import leaderboard_service
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -103,6 +105,7 @@ def record_quiz(
     )
     
     quiz = crud.quiz.create(db, obj_in=internal_quiz_in)
+    leaderboard_service.record_play(quiz.user_id, quiz.subs_id, quiz.score)
     logger.info(f"Recorded quiz for user {user.username}, subscription {subscription.name}, score: {quiz_in.score}")
     return quiz
 
@@ -126,28 +129,12 @@ def link_user_subscription(
     if not subscription:
         raise HTTPException(status_code=404, detail=f"Subscription '{link_in.subs}' not found. Ensure Subscription Sync was called.")
         
-    # Check if this link already exists to avoid duplicates
-    existing_link = db.query(models.UserSubscribed).filter(
-        models.UserSubscribed.user_id == user.id,
-        models.UserSubscribed.subs_id == subscription.id
-    ).first()
-    
-    if existing_link:
-        # Update existing link dates if provided
-        if link_in.start_date:
-            existing_link.start_date = link_in.start_date
-        if link_in.end_date:
-            existing_link.end_date = link_in.end_date
-        db.add(existing_link)
-    else:
-        # Create internal link object
-        internal_link_in = schemas.UserSubscribedCreate(
-            user_id=user.id,
-            subs_id=subscription.id,
-            start_date=link_in.start_date,
-            end_date=link_in.end_date
-        )
-        existing_link = crud.user_subscribed.create(db, obj_in=internal_link_in)
+    # Insert or update in one statement on the unique (user_id, subs_id) key,
+    # so concurrent calls cannot create duplicate links
+    crud.user_subscribed.upsert_many(db, links=[
+        Link(user.id, subscription.id, link_in.start_date, link_in.end_date)
+    ])
+    existing_link = crud.user_subscribed.get_by_user_and_subscription(db, user_id=user.id, subs_id=subscription.id)
     
     # Also update the user's platform registration flags
     if subscription.platform == models.enums.PlatformType.QUIZARD:
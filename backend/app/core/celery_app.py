@@ -2,7 +2,8 @@
 from celery import Celery
 from app.core.config import settings
 
-celery_app = Celery("worker", broker=settings.CELERY_BROKER_URL)
+# Result backend is needed for the scenario chord callback
+celery_app = Celery("worker", broker=settings.CELERY_BROKER_URL, backend=settings.CELERY_RESULT_BACKEND)
 
 celery_app.conf.update(
     task_serializer="json",
@@ -1,5 +1,5 @@
 
-from typing import List, Union
+from typing import Dict, List, Union
 from pydantic import AnyHttpUrl, validator
 from pydantic_settings import BaseSettings
 
@@ -41,6 +41,26 @@ class Settings(BaseSettings):
     # Celery
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
+    SCENARIO_CHUNK_SIZE: int = 500  # users per scenario send task
+    # Send-ledger claims not marked sent within this many seconds belong to a
+    # dead worker and are taken over by the next run
+    SCENARIO_CLAIM_TTL_SECONDS: int = 900
+    LEADERBOARD_FETCH_WORKERS: int = 8  # leaderboards downloaded in parallel per scenario run
+
+    # External data sync: sources are fetched in parallel, each with its own
+    # timeout; connect errors, read timeouts and 429/5xx are retried with backoff
+    SYNC_CONNECT_TIMEOUT: float = 5.0
+    SYNC_READ_TIMEOUT: float = 30.0
+    SYNC_SOURCE_TIMEOUTS: Dict[str, float] = {}  # read timeout overrides by host, e.g. {"arcaderush.xyz": 60}
+    SYNC_FETCH_RETRIES: int = 3
+    SYNC_FETCH_BACKOFF: float = 1.0  # seconds; doubles per retry
+    # Sources that accept a watermark, by host -> query parameter. They are
+    # sent their stored cursor, or else the last consumed event time (ISO 8601).
+    SYNC_WATERMARK_PARAMS: Dict[str, str] = {}
+    # Response bodies are spooled to disk beyond this size and parsed as a
+    # stream, handed to the processors SYNC_STREAM_BATCH_SIZE records at a time
+    SYNC_SPOOL_MAX_MB: int = 8
+    SYNC_STREAM_BATCH_SIZE: int = 2000
 
     # Messaging Service Credentials
     GMAIL_ACCESS_TOKEN: str = ""
@@ -50,9 +70,57 @@ class Settings(BaseSettings):
     TELEGRAM_CHANNEL_ID: str = ""
     DISCORD_BOT_TOKEN: str = ""
     
+    # Provider API base URLs (overridable for local fake servers)
+    TELEGRAM_API_BASE_URL: str = "https://api.telegram.org"
+    DISCORD_API_BASE_URL: str = "https://discord.com/api/v10"
+    WHATSAPP_API_BASE_URL: str = "https://graph.facebook.com/v20.0"
+    GMAIL_API_BASE_URL: str = "https://gmail.googleapis.com/gmail/v1"
+    
     # Wehooks (if needed)
     DISCORD_WEBHOOK_URL: str = ""
 
+    # Shared HTTP transport for messaging providers
+    MESSAGING_HTTP_POOL_CONNECTIONS: int = 10  # per-host pools kept alive
+    MESSAGING_HTTP_POOL_MAXSIZE: int = 20      # keep-alive connections per host
+    MESSAGING_HTTP_TIMEOUT: float = 10.0
+
+    # Async dispatcher: concurrent in-flight sends per provider
+    MESSAGING_CONCURRENCY: Dict[str, int] = {"telegram": 25, "discord": 10, "whatsapp": 20, "mail": 10}
+
+    # Telegram Bot API limits enforced by the send scheduler
+    TELEGRAM_GLOBAL_RATE: float = 30.0    # messages/s per bot
+    TELEGRAM_PER_CHAT_RATE: float = 1.0   # messages/s per chat
+    TELEGRAM_MAX_SEND_ATTEMPTS: int = 5   # attempts per message when rate limited (429)
+    # The global rate is shared by all worker processes through a Redis token
+    # bucket. "memory" (or Redis being down) gives each process a local bucket
+    # at TELEGRAM_GLOBAL_RATE / TELEGRAM_RATE_PROCESSES instead.
+    TELEGRAM_RATE_BACKEND: str = "redis"
+    TELEGRAM_RATE_REDIS_URL: str = "redis://redis:6379/2"
+    TELEGRAM_RATE_KEY_PREFIX: str = "telegram:rate"
+    TELEGRAM_RATE_PROCESSES: int = 1      # processes sending at once (workers x Celery concurrency)
+
+    # In-process LRU of Discord DM channel ids (keyed by Discord user id)
+    DISCORD_DM_CACHE_SIZE: int = 10000
+
+    # Transactional outbox: scenario/contextual sends are queued and delivered
+    # by app.workers.outbox_dispatcher instead of inline
+    MESSAGING_USE_OUTBOX: bool = False
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_LEASE_SECONDS: int = 300        # claimed rows become claimable again after this
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_DELAY_SECONDS: int = 60   # multiplied by the attempt count
+
+    # Score leaderboards (sorted sets per subscription + global), updated on
+    # every recorded quiz. "memory" keeps them in-process (tests / single process).
+    LEADERBOARD_BACKEND: str = "redis"
+    LEADERBOARD_REDIS_URL: str = "redis://redis:6379/1"
+    LEADERBOARD_KEY_PREFIX: str = "leaderboard"
+    LEADERBOARD_REBUILD_LOCK_SECONDS: int = 600  # a crashed rebuild's lock expires after this
+
+    # Message audit log buffering (rows / milliseconds between multi-row INSERTs)
+    MESSAGE_LOG_FLUSH_SIZE: int = 500
+    MESSAGE_LOG_FLUSH_INTERVAL_MS: int = 2000
+
     class Config:
         case_sensitive = True
         env_file = ".env"
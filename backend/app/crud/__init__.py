@@ -3,3 +3,7 @@ from .user import user
 from .subscription import subscription
 from .messenger import messenger, message
 from .quiz import quiz, user_subscribed
+from .outbox import outbox
+from .send_ledger import scenario_send_ledger
+from .daily_activity import user_daily_activity
+from .sync_state import sync_state
@@ -0,0 +1,95 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.orm import Session
+from app.crud.upsert import upsert
+from app.models.daily_activity import UserDailyActivity
+from app.models.quiz import PlayedQuiz
+from app.utils.helpers import day_range
+
+
+class Play(NamedTuple):
+    user_id: int
+    subs_id: Optional[int]
+    played_at: datetime
+    score: Optional[int]
+
+
+def _greatest(current, new):
+    """NULL-tolerant GREATEST: MySQL's returns NULL if either side is NULL."""
+    return case(
+        (new.is_(None), current),
+        (current.is_(None), new),
+        (new > current, new),
+        else_=current,
+    )
+
+
+class CRUDUserDailyActivity:
+    """Maintains the user_daily_activity rollup (composite key, so not a CRUDBase)."""
+
+    def record_plays(self, db: Session, *, plays: Iterable[Play]) -> int:
+        """
+        Fold new PlayedQuiz rows into the rollup with one upsert. Runs in the
+        caller's transaction (no commit) so the rollup commits with the plays.
+        """
+        totals: Dict[Tuple[date, int, int], dict] = {}
+        for play in plays:
+            key = (play.played_at.date(), play.user_id, play.subs_id or 0)
+            row = totals.get(key)
+            if row is None:
+                row = totals[key] = {
+                    "day": key[0], "user_id": key[1], "subs_id": key[2],
+                    "rounds": 0, "max_score": None, "sum_score": 0, "last_played_at": None,
+                }
+            row["rounds"] += 1
+            if play.score is not None:
+                row["sum_score"] += play.score
+                row["max_score"] = play.score if row["max_score"] is None else max(row["max_score"], play.score)
+            row["last_played_at"] = play.played_at if row["last_played_at"] is None else max(row["last_played_at"], play.played_at)
+        if not totals:
+            return 0
+
+        table = UserDailyActivity.__table__
+        upsert(db, table, list(totals.values()), key=[table.c.day, table.c.user_id, table.c.subs_id], set_=lambda new: {
+            "rounds": table.c.rounds + new.rounds,
+            "max_score": _greatest(table.c.max_score, new.max_score),
+            "sum_score": table.c.sum_score + new.sum_score,
+            "last_played_at": _greatest(table.c.last_played_at, new.last_played_at),
+        })
+        return len(totals)
+
+    def rebuild(self, db: Session, *, start: date, end: date) -> int:
+        """
+        Recompute the rollup for days in [start, end) from played_quizzes with
+        one DELETE and one INSERT ... SELECT ... GROUP BY, then commit.
+        """
+        range_start, _ = day_range(start)
+        range_end, _ = day_range(end)
+
+        db.query(UserDailyActivity).filter(UserDailyActivity.day >= start, UserDailyActivity.day < end)\
+            .delete(synchronize_session=False)
+
+        day = func.date(PlayedQuiz.created_at)
+        subs_id = func.coalesce(PlayedQuiz.subs_id, 0)
+        source = select(
+            day,
+            PlayedQuiz.user_id,
+            subs_id,
+            func.count(PlayedQuiz.id),
+            func.max(PlayedQuiz.score),
+            func.coalesce(func.sum(PlayedQuiz.score), 0),
+            func.max(PlayedQuiz.created_at),
+        ).where(PlayedQuiz.created_at >= range_start, PlayedQuiz.created_at < range_end)\
+         .group_by(day, PlayedQuiz.user_id, subs_id)
+
+        result = db.execute(
+            insert(UserDailyActivity).from_select(
+                ["day", "user_id", "subs_id", "rounds", "max_score", "sum_score", "last_played_at"], source
+            )
+        )
+        db.commit()
+        return result.rowcount
+
+
+user_daily_activity = CRUDUserDailyActivity()
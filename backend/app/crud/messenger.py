@@ -1,4 +1,7 @@
 
+from typing import Any, Dict, List
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
 from app.models.messenger import Messenger, Message
 from app.schemas.messenger import (
@@ -9,10 +12,25 @@ from app.schemas.messenger import (
 # Since generic requires UpdateSchemaType, I'll pass MessageCreate effectively or use None if type system allows, but for simplicity:
 
 class CRUDMessenger(CRUDBase[Messenger, MessengerCreate, MessengerUpdate]):
-    pass
+    def set_discord_dm_channels(self, db: Session, *, channels: Dict[int, str]) -> int:
+        """Store dm_channel_id in Messenger.discord for many messengers with one SELECT and one commit."""
+        if not channels:
+            return 0
+        rows = db.query(Messenger).filter(Messenger.id.in_(channels.keys())).all()
+        for row in rows:
+            # Assign a new dict so the JSON column is flagged as changed
+            row.discord = {**(row.discord or {}), "dm_channel_id": str(channels[row.id])}
+        db.commit()
+        return len(rows)
 
 class CRUDMessage(CRUDBase[Message, MessageCreate, MessageCreate]):
-    pass
+    def create_many(self, db: Session, *, rows: List[Dict[str, Any]]) -> int:
+        """Insert many log rows with one multi-row INSERT and a single commit (no refresh)."""
+        if not rows:
+            return 0
+        db.execute(insert(Message).values(rows))
+        db.commit()
+        return len(rows)
 
 messenger = CRUDMessenger(Messenger)
 message = CRUDMessage(Message)
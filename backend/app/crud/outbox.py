@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from sqlalchemy import Select, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from app.crud.base import CRUDBase
+from app.models.enums import MessengerType, OutboxStatus
+from app.models.outbox import OutboxMessage
+from app.schemas.outbox import OutboxMessageCreate
+from app.utils.helpers import utcnow
+
+
+class ClaimedMessage(NamedTuple):
+    id: int
+    user_id: Optional[int]
+    messenger_type: MessengerType
+    target: Optional[str]
+    text: str
+    link: Optional[str]
+    attempts: int
+
+
+class CRUDOutbox(CRUDBase[OutboxMessage, OutboxMessageCreate, OutboxMessageCreate]):
+    def enqueue_many(self, db: Session, *, rows: List[Dict[str, Any]], commit: bool = True) -> int:
+        """
+        Insert pending messages with one multi-row INSERT. With commit=False the
+        rows join the caller's transaction (e.g. with the send ledger rows).
+        """
+        if not rows:
+            return 0
+        now = utcnow()
+        values = [
+            {**row, "status": OutboxStatus.PENDING, "attempts": 0, "available_at": now}
+            for row in rows
+        ]
+        db.execute(insert(OutboxMessage).values(values))
+        if commit:
+            db.commit()
+        return len(values)
+
+    def claim_batch(self, db: Session, *, limit: int, lease_seconds: int) -> List[ClaimedMessage]:
+        """
+        Claim up to `limit` deliverable rows for this worker.
+
+        Rows are locked with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+        dispatchers never pick the same row, then marked SENDING with a lease.
+        A row whose lease expires (worker died mid-send) becomes claimable again.
+        """
+        now = utcnow()
+        rows = db.scalars(self.claim_statement(limit=limit, now=now)).all()
+
+        if not rows:
+            db.commit()
+            return []
+
+        lease_until = now + timedelta(seconds=lease_seconds)
+        claimed = []
+        for row in rows:
+            row.status = OutboxStatus.SENDING
+            row.attempts += 1
+            row.available_at = lease_until
+            claimed.append(ClaimedMessage(row.id, row.user_id, row.messenger_type, row.target, row.text, row.link, row.attempts))
+        db.commit()
+        # Plain tuples: reading expired ORM rows after commit would reload them one by one
+        return claimed
+
+    def claim_statement(self, *, limit: int, now: datetime) -> Select:
+        """Deliverable rows (pending, or claimed with an expired lease), locked for this worker."""
+        return select(OutboxMessage)\
+            .where(or_(
+                OutboxMessage.status == OutboxStatus.PENDING,
+                OutboxMessage.status == OutboxStatus.SENDING,
+            ))\
+            .where(OutboxMessage.available_at <= now)\
+            .order_by(OutboxMessage.id)\
+            .limit(limit)\
+            .with_for_update(skip_locked=True)
+
+    def mark_sent(self, db: Session, *, ids: Sequence[int]) -> int:
+        if not ids:
+            return 0
+        result = db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(ids))
+            .values(status=OutboxStatus.SENT, last_error=None)
+        )
+        db.commit()
+        return result.rowcount
+
+    def mark_failed(self, db: Session, *, rows: Sequence[ClaimedMessage], max_attempts: int, retry_delay_seconds: int, error: str = None) -> int:
+        """Put failed rows back with a linear backoff, or give up after max_attempts."""
+        if not rows:
+            return 0
+        now = utcnow()
+        error = (error or "send failed")[:512]
+
+        # Backoff grows with attempts; group by attempt count to keep it to a few UPDATEs
+        by_attempts: Dict[int, List[int]] = {}
+        dead_ids = []
+        for r in rows:
+            if r.attempts >= max_attempts:
+                dead_ids.append(r.id)
+            else:
+                by_attempts.setdefault(r.attempts, []).append(r.id)
+        for attempts, ids in by_attempts.items():
+            db.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(ids))
+                .values(
+                    status=OutboxStatus.PENDING,
+                    available_at=now + timedelta(seconds=retry_delay_seconds * attempts),
+                    last_error=error,
+                )
+            )
+        if dead_ids:
+            db.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(dead_ids))
+                .values(status=OutboxStatus.FAILED, last_error=error)
+            )
+        db.commit()
+        return len(dead_ids)
+
+    def count_by_status(self, db: Session) -> Dict[str, int]:
+        rows = db.query(OutboxMessage.status, func.count(OutboxMessage.id))\
+            .group_by(OutboxMessage.status).all()
+        return {status.value: count for status, count in rows}
+
+
+outbox = CRUDOutbox(OutboxMessage)
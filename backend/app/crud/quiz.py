@@ -1,14 +1,192 @@
 
-from typing import List, Any
+from datetime import datetime
+from typing import Dict, Iterable, List, Any, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
+from app.core.exceptions import DatabaseException
 from app.crud.base import CRUDBase
+from app.crud.daily_activity import Play, user_daily_activity
+from app.crud.upsert import upsert
 from app.models.quiz import PlayedQuiz, UserSubscribed
 from app.schemas.quiz import PlayedQuizCreate, PlayedQuizUpdate, UserSubscribedCreate
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class PlayedRecord(NamedTuple):
+    user_id: int
+    subs_id: Optional[int]
+    score: Optional[int]
+    time: Optional[int]
+    created_at: datetime
+
+    @property
+    def key(self) -> Tuple:
+        """Natural key, as in ix_played_quizzes_user_id_subs_id_created_at_score."""
+        return (self.user_id, self.subs_id, self.created_at, self.score)
+
+
+class InsertCounts(NamedTuple):
+    inserted: int
+    duplicates: int
+    # The records actually written, for after-commit work such as leaderboards
+    records: Tuple[PlayedRecord, ...] = ()
+    # Rows the database ignored without a duplicate key (bad foreign key, truncation)
+    skipped: int = 0
+
+
+class Link(NamedTuple):
+    user_id: int
+    subs_id: int
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
 
 class CRUDPlayedQuiz(CRUDBase[PlayedQuiz, PlayedQuizCreate, PlayedQuizUpdate]):
-    pass
+    def create(self, db: Session, *, obj_in: PlayedQuizCreate) -> PlayedQuiz:
+        """
+        Insert a play and fold it into user_daily_activity in the same
+        transaction. Leaderboards are updated by the caller after this returns.
+        """
+        # Keep datetimes as datetimes for the rollup, and let a missing
+        # created_at fall back to the server default
+        db_obj = self.model(**obj_in.dict(exclude_none=True))
+        try:
+            db.add(db_obj)
+            db.flush()
+            if db_obj.created_at is None:
+                db.refresh(db_obj, ["created_at"])  # server default
+            user_daily_activity.record_plays(
+                db, plays=[Play(db_obj.user_id, db_obj.subs_id, db_obj.created_at, db_obj.score)]
+            )
+            db.commit()
+            db.refresh(db_obj)
+        except Exception as e:
+            logger.error(f"Error creating {self.model.__name__}: {e}")
+            db.rollback()
+            raise DatabaseException(operation="create")
+        return db_obj
+
+    def insert_many(self, db: Session, *, records: Iterable[PlayedRecord]) -> InsertCounts:
+        """
+        Insert a batch of plays, skipping any whose natural key is already
+        stored or repeated in the batch, then commit once.
+
+        Known keys are filtered out with one lookup; the rest go in a single
+        INSERT IGNORE (INSERT OR IGNORE on SQLite) so a concurrent run cannot
+        create duplicates either. Only rows actually inserted are folded into
+        user_daily_activity (same transaction) and returned in
+        InsertCounts.records for the caller's leaderboard update.
+
+        When fewer rows go in than were sent, the keys are read back to see
+        which landed. Rows ignored because another run stored the key are
+        duplicates; rows ignored for any other reason (MySQL's IGNORE also
+        skips foreign key and truncation errors) are logged and counted as
+        skipped rather than failing the batch. Only if a concurrent run's rows
+        make ours impossible to tell apart is the batch looked up again, once.
+        """
+        total = 0
+        batch: Dict[Tuple, PlayedRecord] = {}
+        for record in records:
+            total += 1
+            batch.setdefault(record.key, record)
+
+        for _ in range(2):
+            pending = self._filter_stored(db, list(batch.values()))
+            if not pending:
+                return InsertCounts(0, total)
+            try:
+                stmt = insert(self.model)\
+                    .prefix_with("IGNORE", dialect="mysql")\
+                    .prefix_with("OR IGNORE", dialect="sqlite")\
+                    .values([r._asdict() for r in pending])
+                inserted = db.execute(stmt).rowcount
+                landed = pending
+                if inserted != len(pending):
+                    stored = self._stored_keys(db, pending)
+                    landed = [r for r in pending if r.key in stored]
+                    if len(landed) != inserted:
+                        # Rows another run committed since the lookup are visible too
+                        db.rollback()
+                        continue
+                user_daily_activity.record_plays(
+                    db, plays=[Play(r.user_id, r.subs_id, r.created_at, r.score) for r in landed]
+                )
+                db.commit()
+            except Exception as e:
+                logger.error(f"Error inserting {len(pending)} {self.model.__name__} rows: {e}")
+                db.rollback()
+                raise DatabaseException(operation="create")
+
+            landed_keys = {r.key for r in landed}
+            skipped = self._count_rejected(db, [r for r in pending if r.key not in landed_keys])
+            return InsertCounts(inserted, total - inserted - skipped, tuple(landed), skipped)
+        raise DatabaseException(operation="create")
+
+    def _count_rejected(self, db: Session, ignored: List[PlayedRecord]) -> int:
+        """Log and count the ignored records whose key is still not stored, i.e. not duplicates."""
+        if not ignored:
+            return 0
+        stored = self._stored_keys(db, ignored)
+        rejected = [r for r in ignored if r.key not in stored]
+        if rejected:
+            logger.warning(
+                f"Skipped {len(rejected)} {self.model.__name__} rows the database would not store, e.g. {rejected[0]}"
+            )
+        return len(rejected)
+
+    def _stored_keys(self, db: Session, records: List[PlayedRecord]) -> Set[Tuple]:
+        """Natural keys of `records` already in played_quizzes (one range query)."""
+        rows = db.query(self.model.user_id, self.model.subs_id, self.model.created_at, self.model.score)\
+            .filter(self.model.user_id.in_({r.user_id for r in records}))\
+            .filter(self.model.created_at >= min(r.created_at for r in records))\
+            .filter(self.model.created_at <= max(r.created_at for r in records))\
+            .all()
+        return {tuple(row) for row in rows}
+
+    def _filter_stored(self, db: Session, records: List[PlayedRecord]) -> List[PlayedRecord]:
+        """Drop records whose natural key is already in played_quizzes."""
+        if not records:
+            return []
+        stored = self._stored_keys(db, records)
+        return [r for r in records if r.key not in stored]
 
 class CRUDUserSubscribed(CRUDBase[UserSubscribed, UserSubscribedCreate, UserSubscribedCreate]):
+    def upsert_many(self, db: Session, *, links: Iterable[Link]) -> int:
+        """
+        Create or update many user/subscription links with one multi-row
+        upsert (app.crud.upsert) against the unique (user_id, subs_id) index,
+        then commit.
+
+        Dates merge like the per-record path did: a provided start_date or
+        end_date replaces the stored one, a missing one keeps it. Several
+        records for the same pair are folded in order first.
+        Returns the number of distinct links written.
+        """
+        merged: Dict[Tuple[int, int], dict] = {}
+        for link in links:
+            row = merged.setdefault((link.user_id, link.subs_id), {
+                "user_id": link.user_id, "subs_id": link.subs_id, "start_date": None, "end_date": None,
+            })
+            if link.start_date:
+                row["start_date"] = link.start_date
+            if link.end_date:
+                row["end_date"] = link.end_date
+        if not merged:
+            return 0
+
+        table = UserSubscribed.__table__
+        upsert(db, table, list(merged.values()), key=[table.c.user_id, table.c.subs_id], set_=lambda new: {
+            "start_date": func.coalesce(new.start_date, table.c.start_date),
+            "end_date": func.coalesce(new.end_date, table.c.end_date),
+            "modified_at": func.now(),
+        })
+        db.commit()
+        return len(merged)
+
+    def get_by_user_and_subscription(self, db: Session, *, user_id: int, subs_id: int) -> Optional[UserSubscribed]:
+        return db.query(self.model).filter(self.model.user_id == user_id, self.model.subs_id == subs_id).first()
+
     def get_subscriptions_by_user(self, db: Session, user_id: int) -> List[Any]:
         # Circular import might happen if we import model at top if not careful, 
         # but models are usually safe.
@@ -0,0 +1,141 @@
+from datetime import date, datetime
+from typing import Iterable, List, NamedTuple, Optional, Set
+from sqlalchemy import and_, delete, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+from app.models.enums import LedgerStatus, MessageScenarioType, MessengerType
+from app.models.send_ledger import ScenarioSendLedger
+from app.utils.helpers import utcnow
+
+
+class LedgerScope(NamedTuple):
+    """Ledger rows of one scenario, channel and day."""
+    scenario_type: MessageScenarioType
+    messenger_type: MessengerType
+    send_date: date
+
+
+class LedgerKey(NamedTuple):
+    user_id: int
+    # Stable per-scenario discriminator ("" for scenarios sending one message a day)
+    message_key: str
+
+
+# Rows carried over from the per-user ledger: they block every message of the scenario that day
+ANY_MESSAGE = "*"
+
+
+class CRUDScenarioSendLedger:
+    """Claim-then-send bookkeeping on the per-day scenario send ledger (no id column, so not a CRUDBase)."""
+
+    def _in_scope(self, scope: LedgerScope, keys: List[LedgerKey]):
+        return and_(
+            ScenarioSendLedger.scenario_type == scope.scenario_type,
+            ScenarioSendLedger.send_date == scope.send_date,
+            ScenarioSendLedger.messenger_type == scope.messenger_type,
+            # user_id IN (...) first so the primary key prefix narrows the scan
+            ScenarioSendLedger.user_id.in_({k.user_id for k in keys}),
+            tuple_(ScenarioSendLedger.user_id, ScenarioSendLedger.message_key).in_(keys),
+        )
+
+    def claim(
+        self,
+        db: Session,
+        *,
+        scope: LedgerScope,
+        keys: Iterable[LedgerKey],
+        claim_id: str,
+        status: LedgerStatus = LedgerStatus.CLAIMED,
+        stale_before: Optional[datetime] = None,
+        commit: bool = True,
+    ) -> Set[LedgerKey]:
+        """
+        Claim messages for this attempt and return the ones it got.
+
+        One INSERT IGNORE writes the keys nobody holds yet; rows of other
+        claims are left alone, so concurrent runs split a chunk instead of
+        both sending it. CLAIMED rows older than `stale_before` (the worker
+        died between claim and send) are taken over. commit=False leaves the
+        claim in the caller's transaction (e.g. with the outbox rows).
+        """
+        keys = sorted({k for k in keys if k.user_id})
+        if not keys:
+            return set()
+        blocked = set(db.scalars(
+            select(ScenarioSendLedger.user_id).where(
+                ScenarioSendLedger.scenario_type == scope.scenario_type,
+                ScenarioSendLedger.send_date == scope.send_date,
+                ScenarioSendLedger.messenger_type == scope.messenger_type,
+                ScenarioSendLedger.user_id.in_({k.user_id for k in keys}),
+                ScenarioSendLedger.message_key == ANY_MESSAGE,
+            )
+        ))
+        keys = [k for k in keys if k.user_id not in blocked]
+        if not keys:
+            return set()
+
+        now = utcnow()
+        db.execute(
+            insert(ScenarioSendLedger)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite")
+            .values([
+                {
+                    "scenario_type": scope.scenario_type,
+                    "send_date": scope.send_date,
+                    "messenger_type": scope.messenger_type,
+                    "user_id": k.user_id,
+                    "message_key": k.message_key,
+                    "claim_id": claim_id,
+                    "status": status,
+                    "created_at": now,
+                }
+                for k in keys
+            ])
+        )
+        if stale_before is not None:
+            db.execute(
+                update(ScenarioSendLedger)
+                .where(
+                    self._in_scope(scope, keys),
+                    ScenarioSendLedger.status == LedgerStatus.CLAIMED,
+                    ScenarioSendLedger.created_at < stale_before,
+                )
+                .values(claim_id=claim_id, status=status, created_at=now)
+            )
+
+        rows = db.execute(
+            select(ScenarioSendLedger.user_id, ScenarioSendLedger.message_key)
+            .where(self._in_scope(scope, keys), ScenarioSendLedger.claim_id == claim_id)
+        ).all()
+        if commit:
+            db.commit()
+        return {LedgerKey(*row) for row in rows}
+
+    def mark_sent(self, db: Session, *, scope: LedgerScope, keys: Iterable[LedgerKey], claim_id: str, commit: bool = True) -> int:
+        keys = sorted(set(keys))
+        if not keys:
+            return 0
+        result = db.execute(
+            update(ScenarioSendLedger)
+            .where(self._in_scope(scope, keys), ScenarioSendLedger.claim_id == claim_id)
+            .values(status=LedgerStatus.SENT)
+        )
+        if commit:
+            db.commit()
+        return result.rowcount
+
+    def release(self, db: Session, *, scope: LedgerScope, keys: Iterable[LedgerKey], claim_id: str, commit: bool = True) -> int:
+        """Drop this attempt's claims on messages that were not sent, so a later run retries them."""
+        keys = sorted(set(keys))
+        if not keys:
+            return 0
+        result = db.execute(
+            delete(ScenarioSendLedger)
+            .where(self._in_scope(scope, keys), ScenarioSendLedger.claim_id == claim_id)
+        )
+        if commit:
+            db.commit()
+        return result.rowcount
+
+
+scenario_send_ledger = CRUDScenarioSendLedger()
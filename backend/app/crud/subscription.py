@@ -1,11 +1,25 @@
-from typing import Optional
+from typing import Dict, Iterable, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
 from app.models.subscription import Subscription
 from app.schemas.subscription import SubscriptionCreate, SubscriptionUpdate
+from app.utils.helpers import chunked
+
+# Values per IN (...) list in bulk lookups
+LOOKUP_CHUNK_SIZE = 1000
 
 class CRUDSubscription(CRUDBase[Subscription, SubscriptionCreate, SubscriptionUpdate]):
     def get_by_name(self, db: Session, *, name: str) -> Optional[Subscription]:
         return db.query(Subscription).filter(Subscription.name == name).first()
 
+    def ids_by_name(self, db: Session, *, names: Iterable[str]) -> Dict[str, int]:
+        """Map subscription names to ids (lowest id if a name repeats) with one IN query per chunk."""
+        ids: Dict[str, int] = {}
+        for chunk in chunked({name for name in names if name}, LOOKUP_CHUNK_SIZE):
+            rows = db.query(Subscription.name, func.min(Subscription.id))\
+                .filter(Subscription.name.in_(chunk)).group_by(Subscription.name).all()
+            ids.update(rows)
+        return ids
+
 subscription = CRUDSubscription(Subscription)
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from app.models.sync_state import SyncState
+from app.utils.helpers import utcnow
+
+
+class CRUDSyncState:
+    """Per-source sync watermarks (keyed by source, so not a CRUDBase)."""
+
+    def get_all(self, db: Session) -> Dict[str, SyncState]:
+        return {state.source: state for state in db.query(SyncState).all()}
+
+    def advance(
+        self, db: Session, *, source: str, last_event_at: Optional[datetime] = None, cursor: Optional[str] = None
+    ) -> SyncState:
+        """Move the source's watermark forward (never back) and commit."""
+        state = db.query(SyncState).filter(SyncState.source == source).with_for_update().first()
+        if state is None:
+            state = SyncState(source=source)
+            db.add(state)
+        if last_event_at and (state.last_event_at is None or last_event_at > state.last_event_at):
+            state.last_event_at = last_event_at
+        if cursor:
+            state.cursor = cursor
+        state.updated_at = utcnow()
+        db.commit()
+        return state
+
+
+sync_state = CRUDSyncState()
@@ -0,0 +1,83 @@
+"""
+Multi-row upsert shared by the CRUD modules.
+
+    upsert(db, User.__table__, rows, key=[User.username],
+           set_=lambda new: {"quizard": True, "modified_at": func.now()})
+
+`set_` maps column names to the values an existing row is updated with; it
+gets `new`, an accessor for the incoming row's values (`new.end_date`), so
+expressions can combine old and new (`table.c.rounds + new.rounds`).
+
+MySQL runs one INSERT ... ON DUPLICATE KEY UPDATE (`new` is VALUES()/the
+inserted alias; the conflict is on any unique key, `key` is not used), SQLite
+and PostgreSQL one INSERT ... ON CONFLICT (key) DO UPDATE (`new` is
+EXCLUDED). Any other dialect gets a generic select-then-insert/update: the
+same result, one UPDATE per existing row, and not safe against a concurrent
+writer inserting the same key in between.
+"""
+
+from typing import Any, Callable, Dict, List, Sequence
+
+from sqlalchemy import Column, Table, and_, insert, literal, or_, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.utils.helpers import chunked
+
+SetValues = Callable[[Any], Dict[str, Any]]
+
+# Rows looked up per SELECT in the generic fallback
+FALLBACK_LOOKUP_CHUNK = 500
+
+
+def upsert(db: Session, table: Table, rows: List[Dict[str, Any]], *, key: Sequence[Column], set_: SetValues) -> None:
+    """Insert `rows`, updating the rows whose `key` already exists with `set_(new)`. Does not commit."""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(set_(stmt.inserted))
+    elif dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=list(key), set_=set_(stmt.excluded))
+    else:
+        _select_then_write(db, table, rows, key, set_)
+        return
+    db.execute(stmt)
+
+
+class _RowValues:
+    """`new` for the generic path: the incoming row's values as typed bind parameters."""
+
+    def __init__(self, table: Table, row: Dict[str, Any]):
+        self._table = table
+        self._row = row
+
+    def __getattr__(self, name: str):
+        return literal(self._row[name], type_=self._table.c[name].type)
+
+
+def _select_then_write(db: Session, table: Table, rows: List[Dict[str, Any]], key: Sequence[Column], set_: SetValues) -> None:
+    names = [column.key for column in key]
+
+    def key_of(row) -> tuple:
+        return tuple(row[name] for name in names)
+
+    def matches(values: tuple):
+        return and_(*(column == value for column, value in zip(key, values)))
+
+    existing = set()
+    for chunk in chunked(rows, FALLBACK_LOOKUP_CHUNK):
+        if len(key) == 1:
+            condition = key[0].in_([row[names[0]] for row in chunk])
+        else:
+            condition = or_(*(matches(key_of(row)) for row in chunk))
+        existing.update(tuple(found) for found in db.execute(select(*key).where(condition)))
+
+    missing = [row for row in rows if key_of(row) not in existing]
+    if missing:
+        db.execute(insert(table), missing)
+    for row in rows:
+        if key_of(row) in existing:
+            db.execute(update(table).where(matches(key_of(row))).values(set_(_RowValues(table, row))))
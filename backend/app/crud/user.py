@@ -1,13 +1,34 @@
 
-from typing import Optional, List
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, List, Sequence, Tuple
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import exists, func
+from sqlalchemy import exists, func, literal, select, union_all
 from app.crud.base import CRUDBase
+from app.crud.upsert import upsert
 from app.models.user import User
 from app.models.messenger import Message, Messenger
 from app.models.quiz import UserSubscribed
+from app.models.subscription import Subscription
 from app.models.enums import PlatformType
 from app.schemas.user import UserCreate, UserUpdate
+from app.utils.helpers import chunked, normalize_msisdn
+
+# Values per IN (...) list when resolving msisdns
+RESOLVE_CHUNK_SIZE = 1000
+
+# users.<flag> column for each platform
+PLATFORM_FLAGS = {
+    PlatformType.QUIZARD: User.quizard,
+    PlatformType.WORDLY: User.wordly,
+    PlatformType.ARCADERUSH: User.arcaderush,
+}
+
+
+class UpsertCounts(NamedTuple):
+    inserted: int
+    updated: int    # existing users that got the platform flag set
+    unchanged: int  # existing users that already had it
+
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
@@ -16,6 +37,153 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def get_by_username(self, db: Session, *, username: str) -> Optional[User]:
         return db.query(User).filter(User.username == username).first()
 
+    def ids_by_username(self, db: Session, *, usernames: Iterable[str]) -> Dict[str, int]:
+        """Map exact usernames to user ids with one IN query per chunk; unknown ones are left out."""
+        ids: Dict[str, int] = {}
+        for chunk in chunked({name for name in usernames if name}, RESOLVE_CHUNK_SIZE):
+            ids.update(db.query(User.username, User.id).filter(User.username.in_(chunk)).all())
+        return ids
+
+    def resolve_msisdns(self, db: Session, *, msisdns: Iterable[str]) -> Dict[str, int]:
+        """
+        Map leaderboard msisdns/usernames to user ids with one IN query per chunk.
+        Phone numbers match on the normalized `msisdn_key` (so "01712345678",
+        "1712345678" and "8801712345678" are the same user); anything else
+        falls back to an exact username match. Unknown values are left out.
+        """
+        by_key: Dict[str, List[str]] = {}
+        plain = set()
+        for value in msisdns:
+            if value is None:
+                continue
+            value = str(value)
+            key = normalize_msisdn(value)
+            if key:
+                by_key.setdefault(key, []).append(value)
+            else:
+                plain.add(value)
+
+        resolved: Dict[str, int] = {}
+        for keys in chunked(by_key, RESOLVE_CHUNK_SIZE):
+            matches: Dict[str, Dict[str, int]] = {}
+            for key, username, user_id in db.query(User.msisdn_key, User.username, User.id).filter(User.msisdn_key.in_(keys)).all():
+                matches.setdefault(key, {})[username] = user_id
+            for key, accounts in matches.items():
+                # Several accounts can share a key (e.g. "017..." and "17..."):
+                # prefer the exact username, then the oldest account
+                fallback = min(accounts.values())
+                for value in by_key[key]:
+                    resolved[value] = accounts.get(value, fallback)
+        for usernames in chunked(plain, RESOLVE_CHUNK_SIZE):
+            for username, user_id in db.query(User.username, User.id).filter(User.username.in_(usernames)).all():
+                resolved[username] = user_id
+        return resolved
+
+    def upsert_platform_users(
+        self, db: Session, *, platform: PlatformType, users: Iterable[Tuple[str, Optional[str]]]
+    ) -> UpsertCounts:
+        """
+        Make sure every (username, phone) exists with the `platform` flag set.
+
+        One IN query finds the existing rows; new users and existing ones
+        missing the flag then go in a single multi-row upsert
+        (INSERT ... ON DUPLICATE KEY UPDATE <flag> = 1 on MySQL, see
+        app.crud.upsert), which also absorbs users created concurrently since
+        the lookup. Phone numbers are only written for new users. Commits once.
+        """
+        phones: Dict[str, Optional[str]] = {}
+        for username, phone in users:
+            if username and (username not in phones or not phones[username]):
+                phones[username] = phone or None
+        if not phones:
+            return UpsertCounts(0, 0, 0)
+
+        flag = PLATFORM_FLAGS[platform]
+        existing = dict(db.query(User.username, flag).filter(User.username.in_(list(phones))).all())
+        pending = [username for username in phones if not existing.get(username)]
+        if not pending:
+            return UpsertCounts(0, 0, len(existing))
+
+        rows = [
+            {
+                "username": username,
+                "phone_number": phones[username],
+                "msisdn_key": normalize_msisdn(username),  # @validates does not run for Core inserts
+                "quizard": False,
+                "wordly": False,
+                "arcaderush": False,
+                flag.key: True,
+            }
+            for username in pending
+        ]
+        table = User.__table__
+        upsert(db, table, rows, key=[table.c.username], set_=lambda new: {flag.key: True, "modified_at": func.now()})
+        db.commit()
+        updated = sum(1 for username in pending if username in existing)
+        return UpsertCounts(len(pending) - updated, updated, len(existing) - updated)
+
+    def iter_audience(
+        self, db: Session, *, columns: Sequence[Any] = (), filters: Sequence[Any] = (), batch_size: int = 5000
+    ) -> Iterator[List[Tuple]]:
+        """
+        Yield batches of compact (id, *columns) rows for users matching
+        `filters`, in id order. Pages are keyset-paginated
+        (WHERE id > :last ORDER BY id LIMIT n), so memory stays flat whatever
+        the table size and no ORM entities enter the identity map.
+        """
+        last_id = 0
+        while True:
+            rows = db.query(User.id, *columns).filter(User.id > last_id, *filters)\
+                .order_by(User.id).limit(batch_size).all()
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def iter_unsubscribed_platforms(
+        self, db: Session, *, today: date, chunk_size: int = 5000
+    ) -> Iterator[List[Tuple[int, PlatformType]]]:
+        """
+        Yield batches of (user_id, platform) for every platform a user is
+        registered on (users.<platform> flag) but has no subscription to
+        ending today or later. Users created today are skipped.
+
+        Each batch is one UNION ALL statement (one branch per platform, each
+        anti-joined against active user_subscribed rows) over a window of at
+        most `chunk_size` user ids, so memory stays bounded by the batch.
+        """
+        registered_before = datetime.combine(today, time.min)
+
+        def branch(platform: PlatformType, flag, lower: int, upper: int):
+            active = exists().where(
+                UserSubscribed.user_id == User.id,
+                UserSubscribed.end_date >= today,
+                Subscription.id == UserSubscribed.subs_id,
+                Subscription.platform == platform,
+            )
+            return select(User.id, literal(platform.value).label("platform")).where(
+                User.id > lower,
+                User.id <= upper,
+                flag == True,
+                User.created_at < registered_before,
+                ~active,
+            )
+
+        last_id = 0
+        while True:
+            ids = db.query(User.id).filter(User.id > last_id).order_by(User.id).limit(chunk_size).all()
+            if not ids:
+                return
+            upper = ids[-1].id
+
+            stmt = union_all(*(branch(platform, flag, last_id, upper) for platform, flag in PLATFORM_FLAGS.items()))
+            rows = db.execute(stmt).all()
+            if rows:
+                yield [(user_id, PlatformType(platform)) for user_id, platform in rows]
+            last_id = upper
+
     def get_with_filters(
         self, 
         db: Session, 
@@ -3,4 +3,8 @@ from .user import User
 from .subscription import Subscription
 from .messenger import Messenger, Message
 from .quiz import PlayedQuiz, UserSubscribed
-from .enums import QuizType, SubscriptionType, SubscriptionLength, MessengerType, PlatformStatus
+from .outbox import OutboxMessage
+from .send_ledger import ScenarioSendLedger
+from .daily_activity import UserDailyActivity
+from .sync_state import SyncState
+from .enums import QuizType, SubscriptionType, SubscriptionLength, MessengerType, PlatformStatus, OutboxStatus
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, BigInteger, Integer, Date, DateTime, Index
+from app.database.base import Base
+
+class UserDailyActivity(Base):
+    """
+    Per user, subscription and day rollup of played_quizzes, maintained on
+    every PlayedQuiz insert so the daily scenarios read one row per active
+    user instead of grouping the whole play history.
+    subs_id is 0 for plays without a subscription (it is part of the key).
+    """
+    __tablename__ = "user_daily_activity"
+    __table_args__ = (
+        # "Did this user play since <day>" checks
+        Index("ix_user_daily_activity_user_id_day", "user_id", "day"),
+    )
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    subs_id = Column(BigInteger, primary_key=True, autoincrement=False)
+
+    rounds = Column(Integer, nullable=False, default=0)
+    max_score = Column(Integer, nullable=True)
+    sum_score = Column(Integer, nullable=False, default=0)
+    last_played_at = Column(DateTime, nullable=True)
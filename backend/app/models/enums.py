@@ -48,3 +48,13 @@ class MessageScenarioType(str, enum.Enum):
     DAILY_REFERRAL_PROMO = "daily_referral_promo"
     WEEKLY_WINNER_LIST_PROMO = "weekly_winner_list_promo"
     WINNING_POSITION_WARNING = "winning_position_warning"
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+class LedgerStatus(str, enum.Enum):
+    CLAIMED = "claimed"
+    SENT = "sent"
@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, String, BigInteger, Text, Enum as SQLEnum, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, BigInteger, Text, Enum as SQLEnum, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base_model import BaseModel
@@ -20,6 +20,9 @@ class Messenger(BaseModel):
 
 class Message(BaseModel):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_user_id_time", "user_id", "time"),
+    )
 
     # sender and receiver removed as per requirement
     # sender = Column(String(255), nullable=False)
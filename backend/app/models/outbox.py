@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, BigInteger, Integer, Text, Enum as SQLEnum, DateTime, ForeignKey, Index
+from .base_model import BaseModel
+from .enums import MessengerType, OutboxStatus
+
+class OutboxMessage(BaseModel):
+    """
+    Rendered message waiting for delivery. Scenario/contextual sends insert
+    rows in bulk; outbox dispatcher workers claim and send them.
+    """
+    __tablename__ = "outbox"
+
+    user_id = Column(BigInteger, ForeignKey("users.id"), nullable=True)
+    messenger_type = Column(SQLEnum(MessengerType), nullable=False)
+    target = Column(String(255), nullable=True)  # explicit contact, else resolved from the user's messenger
+    text = Column(Text, nullable=False)
+    link = Column(String(512), nullable=True)
+    source = Column(String(64), nullable=True)   # scenario / context that produced the row
+
+    status = Column(SQLEnum(OutboxStatus), nullable=False, default=OutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Not claimable before this time (retry backoff, or the lease of a claimed row)
+    available_at = Column(DateTime, nullable=False)
+    last_error = Column(String(512), nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_status_available_at", "status", "available_at"),
+    )
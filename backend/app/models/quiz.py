@@ -1,19 +1,30 @@
 
-from sqlalchemy import Column, BigInteger, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, BigInteger, Integer, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from .base_model import BaseModel
 
 class UserSubscribed(BaseModel):
     __tablename__ = "user_subscribed"
+    __table_args__ = (
+        Index("ix_user_subscribed_user_id_subs_id", "user_id", "subs_id", unique=True),
+    )
 
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
     subs_id = Column(BigInteger, ForeignKey("subscriptions.id"), nullable=False)
     
     start_date = Column(DateTime(timezone=True), nullable=True)  # When subscription starts
-    end_date = Column(DateTime(timezone=True), nullable=True)    # When subscription expires
+    end_date = Column(DateTime(timezone=True), nullable=True, index=True)  # When subscription expires
 
 class PlayedQuiz(BaseModel):
     __tablename__ = "played_quizzes"
+    __table_args__ = (
+        # Daily scenario scans: rows played in a time range, grouped per user/subscription
+        Index("ix_played_quizzes_created_at_user_id_subs_id", "created_at", "user_id", "subs_id"),
+        # Per-user activity checks (played today / in the last N days)
+        Index("ix_played_quizzes_user_id_created_at", "user_id", "created_at"),
+        # Natural key of a round: overlapping sync windows re-deliver the same rows
+        Index("ix_played_quizzes_user_id_subs_id_created_at_score", "user_id", "subs_id", "created_at", "score", unique=True),
+    )
 
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
     subs_id = Column(BigInteger, ForeignKey("subscriptions.id"), nullable=True) 
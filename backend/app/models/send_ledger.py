@@ -0,0 +1,28 @@
+from sqlalchemy import Column, BigInteger, Date, DateTime, String, Enum as SQLEnum
+from app.database.base import Base
+from .enums import LedgerStatus, MessageScenarioType, MessengerType
+
+class ScenarioSendLedger(Base):
+    """
+    One row per scenario message served to a user on a day. Rows are claimed
+    before sending: an attempt INSERT IGNOREs its chunk under its own
+    claim_id and sends only the rows that came back with that id, so a
+    retried chunk or an overlapping run never sends a message twice.
+    message_key is a stable discriminator (subscription id, platform, game)
+    for scenarios that send a user several messages a day, "" otherwise; it
+    never depends on the rendered text, so a later run with fresh scores or
+    ranks still counts as the same message. "*" rows block the whole day.
+    Kept without the BaseModel id/modified_at columns to stay compact.
+    """
+    __tablename__ = "scenario_send_ledger"
+
+    scenario_type = Column(SQLEnum(MessageScenarioType), primary_key=True)
+    send_date = Column(Date, primary_key=True)
+    messenger_type = Column(SQLEnum(MessengerType), primary_key=True)
+    user_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    message_key = Column(String(64), primary_key=True)
+
+    claim_id = Column(String(32), nullable=False)
+    status = Column(SQLEnum(LedgerStatus), nullable=False)
+    # Naive UTC claim time; a CLAIMED row past the claim TTL belongs to a dead worker
+    created_at = Column(DateTime, nullable=False)
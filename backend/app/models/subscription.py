@@ -7,7 +7,7 @@ from .enums import QuizType, SubscriptionType, SubscriptionLength, PlatformType
 class Subscription(BaseModel):
     __tablename__ = "subscriptions"
     
-    name = Column(String(255), nullable=False)
+    name = Column(String(255), nullable=False, index=True)
     type = Column(SQLEnum(SubscriptionType), nullable=True)
     time = Column(SQLEnum(SubscriptionLength), nullable=True)
     platform = Column(SQLEnum(PlatformType), nullable=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime
+from app.database.base import Base
+
+class SyncState(Base):
+    """
+    High-water mark per external sync source (keyed by its URL): the latest
+    event time consumed and, for sources that page with one, the cursor to
+    resume from. Records older than the mark are dropped before any DB work;
+    records at the mark are kept (several rounds can share a second) and left
+    to the played_quizzes natural key to deduplicate.
+    """
+    __tablename__ = "sync_state"
+
+    source = Column(String(255), primary_key=True)
+    last_event_at = Column(DateTime, nullable=True)
+    cursor = Column(String(255), nullable=True)
+
+    # Naive UTC, set by the app
+    updated_at = Column(DateTime, nullable=False)
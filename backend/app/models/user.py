@@ -1,6 +1,7 @@
 
 from sqlalchemy import Column, String, BigInteger, ForeignKey, JSON, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+from app.utils.helpers import normalize_msisdn
 from .base_model import BaseModel
 
 class User(BaseModel):
@@ -10,6 +11,8 @@ class User(BaseModel):
     full_name = Column(String(255), nullable=True)
     email = Column(String(255), unique=True, index=True, nullable=True)
     phone_number = Column(String(50), nullable=True)
+    # normalize_msisdn(username); leaderboards identify players by msisdn
+    msisdn_key = Column(String(20), index=True, nullable=True)
     
     # Platform flags
     quizard = Column(Boolean, default=False)
@@ -25,3 +28,8 @@ class User(BaseModel):
     # Back ref for PlayedQuiz and Messages
     quizzes = relationship("PlayedQuiz", back_populates="user")
     messages = relationship("Message", back_populates="user")
+
+    @validates("username")
+    def _set_msisdn_key(self, key, username):
+        self.msisdn_key = normalize_msisdn(username)
+        return username
@@ -10,3 +10,4 @@ from .quiz import (
     UserSubscribed, UserSubscribedCreate,
     WebhookQuizCreate, WebhookUserSubscribedCreate
 )
+from .outbox import OutboxMessage, OutboxMessageCreate
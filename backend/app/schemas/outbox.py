@@ -0,0 +1,22 @@
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel
+from app.models.enums import MessengerType, OutboxStatus
+from .base import BaseSchema
+
+class OutboxMessageBase(BaseModel):
+    user_id: Optional[int] = None
+    messenger_type: MessengerType
+    target: Optional[str] = None
+    text: str
+    link: Optional[str] = None
+    source: Optional[str] = None
+
+class OutboxMessageCreate(OutboxMessageBase):
+    pass
+
+class OutboxMessage(OutboxMessageBase, BaseSchema):
+    status: OutboxStatus
+    attempts: int
+    available_at: datetime
+    last_error: Optional[str] = None
@@ -0,0 +1,402 @@
+"""
+Score leaderboards: all-time SUM(score) per user, globally and per subscription.
+
+Boards are Redis sorted sets (`ZINCRBY` on every recorded quiz, `ZREVRANGE`
+/ `ZREVRANK` / `ZSCORE` for reads, all O(log n)), so contextual sends no
+longer aggregate all of played_quizzes per call. `MemoryLeaderboardStore` is
+an in-process stand-in for tests and single-process setups.
+
+    leaderboard_service.record_play(user_id, subs_id, score)
+    leaderboard_service.top(subs_id, 3)            # [(user_id, total_score), ...]
+    leaderboard_service.rank_range(subs_id, 10, 30)
+    leaderboard_service.user_rank(subs_id, user_id) # (rank, total_score) or None
+    leaderboard_service.rebuild(db)                 # rehydrate from SQL
+    leaderboard_service.ensure_built(db)            # rebuild if Redis lost the boards
+
+A rebuild sets a "built" marker next to the boards. A store without it (never
+built, or Redis was flushed and only new increments exist) is not trusted for
+reads: `ensure_built` rebuilds it, and callers fall back to SQL meanwhile.
+
+Only one process rebuilds at a time (a SET NX lock with a TTL in Redis).
+While the lock is held every increment is also buffered in a per-board delta,
+and each board is swapped in as SQL totals + delta, so scores recorded
+between the aggregate query and the swap are not lost. A play committed just
+before the aggregate whose increment only lands after the lock was taken is
+counted twice; that window is the few milliseconds between a caller's commit
+and its record_play, against the whole rebuild without the delta.
+Scores are recorded by the API/webhook/sync layers after their commit, not by
+the CRUD layer.
+"""
+
+import bisect
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import redis
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.quiz import PlayedQuiz
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+GLOBAL_BOARD = "global"
+
+# (user_id, total_score)
+Entry = Tuple[int, int]
+
+
+class LeaderboardUnavailable(Exception):
+    """The backing store could not be reached; callers fall back to SQL."""
+
+
+class LeaderboardNotBuilt(LeaderboardUnavailable):
+    """The boards are missing or partial (no rebuild since the store was emptied)."""
+
+
+def board_name(subs_id: Optional[int]) -> str:
+    return f"subs:{subs_id}" if subs_id else GLOBAL_BOARD
+
+
+class MemoryLeaderboardStore:
+    """
+    Sorted list of (-score, member) per board plus a score dict. Reads are
+    bisect lookups; updates move one entry, which is fine for tests and small
+    boards but O(n) in the worst case, unlike a Redis sorted set.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scores: Dict[str, Dict[int, int]] = {}
+        self._order: Dict[str, List[Tuple[int, int]]] = {}
+        self._built = False
+        # Token of the rebuild in progress and the increments seen since it started
+        self._rebuild_token: Optional[str] = None
+        self._deltas: Dict[str, Dict[int, int]] = {}
+
+    def incr(self, board: str, increments: Dict[int, int]) -> None:
+        with self._lock:
+            scores = self._scores.setdefault(board, {})
+            order = self._order.setdefault(board, [])
+            for member, amount in increments.items():
+                old = scores.get(member)
+                if old is not None:
+                    del order[bisect.bisect_left(order, (-old, member))]
+                new = (old or 0) + amount
+                scores[member] = new
+                bisect.insort(order, (-new, member))
+            if self._rebuild_token is not None:
+                delta = self._deltas.setdefault(board, {})
+                for member, amount in increments.items():
+                    delta[member] = delta.get(member, 0) + amount
+
+    def replace(self, board: str, scores: Dict[int, int], token: Optional[str] = None) -> None:
+        """Swap in `scores`, plus the increments buffered since rebuild `token` started."""
+        with self._lock:
+            scores = dict(scores)
+            if token is not None and token == self._rebuild_token:
+                for member, amount in self._deltas.pop(board, {}).items():
+                    scores[member] = scores.get(member, 0) + amount
+            self._scores[board] = scores
+            self._order[board] = sorted((-score, member) for member, score in scores.items())
+
+    def range(self, board: str, start: int, stop: int) -> List[Entry]:
+        """Entries ranked start..stop (0-based, inclusive), best first."""
+        with self._lock:
+            order = self._order.get(board, [])
+            return [(member, -neg) for neg, member in order[start:stop + 1]]
+
+    def rank(self, board: str, member: int) -> Optional[Tuple[int, int]]:
+        """(0-based rank, score) or None."""
+        with self._lock:
+            score = self._scores.get(board, {}).get(member)
+            if score is None:
+                return None
+            return bisect.bisect_left(self._order[board], (-score, member)), score
+
+    def boards(self) -> List[str]:
+        with self._lock:
+            return list(self._scores)
+
+    def is_built(self) -> bool:
+        return self._built
+
+    def mark_built(self) -> None:
+        self._built = True
+
+    def acquire_rebuild(self, token: str, ttl: int) -> bool:
+        """Start buffering increments for rebuild `token`; False if another rebuild holds the lock."""
+        with self._lock:
+            if self._rebuild_token is not None:
+                return False
+            self._rebuild_token = token
+            self._deltas = {}
+            return True
+
+    def release_rebuild(self, token: str) -> None:
+        with self._lock:
+            if self._rebuild_token == token:
+                self._rebuild_token = None
+                self._deltas = {}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scores.clear()
+            self._order.clear()
+            self._built = False
+            self._rebuild_token = None
+            self._deltas = {}
+
+
+# KEYS: board, rebuild lock, delta key prefix. ARGV: member, amount, member, amount, ...
+# The delta is named after the lock's token, so a crashed rebuild's leftovers
+# are never merged by the next one, and it expires with the lock.
+INCR_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    redis.call('ZINCRBY', KEYS[1], ARGV[i + 1], ARGV[i])
+end
+local token = redis.call('GET', KEYS[2])
+if token then
+    local delta = KEYS[3] .. ':' .. token
+    for i = 1, #ARGV, 2 do
+        redis.call('ZINCRBY', delta, ARGV[i + 1], ARGV[i])
+    end
+    local ttl = redis.call('PTTL', KEYS[2])
+    if ttl > 0 then
+        redis.call('PEXPIRE', delta, ttl)
+    end
+end
+return 0
+"""
+
+# KEYS: rebuild lock. ARGV: token. Deletes the lock only if this rebuild still holds it.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLeaderboardStore:
+    def __init__(self, client: "redis.Redis", prefix: str):
+        self.client = client
+        self.prefix = prefix
+        self._incr_script = client.register_script(INCR_SCRIPT)
+        self._release_script = client.register_script(RELEASE_SCRIPT)
+
+    def _key(self, board: str) -> str:
+        return f"{self.prefix}:{board}"
+
+    @property
+    def _built_key(self) -> str:
+        # Outside the "<prefix>:*" namespace so boards() never lists it
+        return f"{self.prefix}.built"
+
+    @property
+    def _lock_key(self) -> str:
+        return f"{self.prefix}.rebuilding"
+
+    def _delta_prefix(self, board: str) -> str:
+        return f"{self.prefix}.delta:{board}"
+
+    def incr(self, board: str, increments: Dict[int, int]) -> None:
+        """ZINCRBY every member in one script call, also into the rebuild delta while a rebuild runs."""
+        args = []
+        for member, amount in increments.items():
+            args += [member, amount]
+        try:
+            self._incr_script(keys=[self._key(board), self._lock_key, self._delta_prefix(board)], args=args)
+        except redis.RedisError as e:
+            raise LeaderboardUnavailable(str(e)) from e
+
+    def replace(self, board: str, scores: Dict[int, int], token: Optional[str] = None) -> None:
+        """
+        Build the board under a temporary key and swap it in atomically,
+        adding the increments buffered since rebuild `token` started.
+        """
+        key = self._key(board)
+        tmp = f"{key}:rebuild"
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.delete(tmp)
+            if scores:
+                pipe.zadd(tmp, {str(member): score for member, score in scores.items()})
+            if token is not None:
+                delta = f"{self._delta_prefix(board)}:{token}"
+                # An empty union deletes `key`, like an empty board below
+                pipe.zunionstore(key, [tmp, delta])
+                pipe.delete(tmp, delta)
+            elif scores:
+                pipe.rename(tmp, key)
+            else:
+                pipe.delete(key)
+            pipe.execute()
+        except redis.RedisError as e:
+            raise LeaderboardUnavailable(str(e)) from e
+
+    def range(self, board: str, start: int, stop: int) -> List[Entry]:
+        try:
+            rows = self.client.zrevrange(self._key(board), start, stop, withscores=True)
+        except redis.RedisError as e:
+            raise LeaderboardUnavailable(str(e)) from e
+        return [(int(member), int(score)) for member, score in rows]
+
+    def rank(self, board: str, member: int) -> Optional[Tuple[int, int]]:
+        key = self._key(board)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.zrevrank(key, member)
+            pipe.zscore(key, member)
+            rank, score = pipe.execute()
+        except redis.RedisError as e:
+            raise LeaderboardUnavailable(str(e)) from e
+        if rank is None:
+            return None
+        return int(rank), int(score)
+
+    def boards(self) -> List[str]:
+        try:
+            keys = self.client.scan_iter(match=f"{self.prefix}:*", count=1000)
+            return [key.decode()[len(self.prefix) + 1:] if isinstance(key, bytes) else key[len(self.prefix) + 1:] for key in keys]
+        except redis.RedisError as e:
+            raise LeaderboardUnavailable(str(e)) from e
+
+    def is_built(self) -> bool:
+        try:
+            return bool(self.client.exists(self._built_key))
+        except redis.RedisError as e:
+            raise LeaderboardUnavailable(str(e)) from e
+
+    def mark_built(self) -> None:
+        try:
+            self.client.set(self._built_key, 1)
+        except redis.RedisError as e:
+            raise LeaderboardUnavailable(str(e)) from e
+
+    def acquire_rebuild(self, token: str, ttl: int) -> bool:
+        """SET NX the rebuild lock; it expires after `ttl` seconds if the holder dies."""
+        try:
+            return bool(self.client.set(self._lock_key, token, nx=True, ex=ttl))
+        except redis.RedisError as e:
+            raise LeaderboardUnavailable(str(e)) from e
+
+    def release_rebuild(self, token: str) -> None:
+        try:
+            self._release_script(keys=[self._lock_key], args=[token])
+        except redis.RedisError as e:
+            raise LeaderboardUnavailable(str(e)) from e
+
+
+def create_store():
+    if settings.LEADERBOARD_BACKEND == "memory":
+        return MemoryLeaderboardStore()
+    client = redis.Redis.from_url(settings.LEADERBOARD_REDIS_URL, socket_connect_timeout=2, socket_timeout=2)
+    return RedisLeaderboardStore(client, settings.LEADERBOARD_KEY_PREFIX)
+
+
+class LeaderboardService:
+    def __init__(self, store=None):
+        self.store = store or create_store()
+
+    def record_play(self, user_id: int, subs_id: Optional[int], score: Optional[int]) -> None:
+        """Add one quiz score to the global board and its subscription board."""
+        self.record_plays([(user_id, subs_id, score)])
+
+    def record_plays(self, plays: Iterable[Tuple[int, Optional[int], Optional[int]]]) -> None:
+        """Add (user_id, subs_id, score) plays, summed per board first so each board takes one round trip."""
+        boards: Dict[str, Dict[int, int]] = {}
+        for user_id, subs_id, score in plays:
+            if not score:
+                continue
+            for board in {GLOBAL_BOARD, board_name(subs_id)}:
+                increments = boards.setdefault(board, {})
+                increments[user_id] = increments.get(user_id, 0) + score
+        try:
+            for board, increments in boards.items():
+                self.store.incr(board, increments)
+        except LeaderboardUnavailable as e:
+            # The next rebuild restores the missed increments
+            logger.error(f"[Leaderboard] Failed to record {sum(len(i) for i in boards.values())} scores: {e}")
+
+    def top(self, subs_id: Optional[int], n: int) -> List[Entry]:
+        return self.store.range(board_name(subs_id), 0, n - 1)
+
+    def rank_range(self, subs_id: Optional[int], first: int, last: int) -> List[Entry]:
+        """Players ranked first..last, 1-based and inclusive."""
+        return self.store.range(board_name(subs_id), first - 1, last - 1)
+
+    def user_rank(self, subs_id: Optional[int], user_id: int) -> Optional[Tuple[int, int]]:
+        """(1-based rank, total score), or None if the user has no score."""
+        found = self.store.rank(board_name(subs_id), user_id)
+        if found is None:
+            return None
+        return found[0] + 1, found[1]
+
+    @contextmanager
+    def _rebuilding(self) -> Iterator[str]:
+        """Hold the rebuild lock shared by every process, or raise LeaderboardNotBuilt if another caller has it."""
+        token = uuid.uuid4().hex
+        if not self.store.acquire_rebuild(token, settings.LEADERBOARD_REBUILD_LOCK_SECONDS):
+            raise LeaderboardNotBuilt("leaderboards are being rebuilt")
+        try:
+            yield token
+        finally:
+            try:
+                self.store.release_rebuild(token)
+            except LeaderboardUnavailable as e:
+                # The lock expires on its own
+                logger.error(f"[Leaderboard] Failed to release the rebuild lock: {e}")
+
+    def rebuild(self, db: Session) -> Dict[str, int]:
+        """
+        Recompute every board from played_quizzes. Returns entries per board.
+        Raises LeaderboardNotBuilt if another process is rebuilding.
+        """
+        with self._rebuilding() as token:
+            return self._rebuild(db, token)
+
+    def _rebuild(self, db: Session, token: str) -> Dict[str, int]:
+        totals = db.query(PlayedQuiz.user_id, PlayedQuiz.subs_id, func.sum(PlayedQuiz.score))\
+            .group_by(PlayedQuiz.user_id, PlayedQuiz.subs_id).all()
+
+        boards: Dict[str, Dict[int, int]] = {GLOBAL_BOARD: {}}
+        for user_id, subs_id, total in totals:
+            total = int(total or 0)
+            if not total:
+                continue
+            boards[GLOBAL_BOARD][user_id] = boards[GLOBAL_BOARD].get(user_id, 0) + total
+            if subs_id:
+                boards.setdefault(board_name(subs_id), {})[user_id] = total
+
+        # Boards whose subscription no longer has any scores are emptied
+        for stale in set(self.store.boards()) - set(boards):
+            if stale.startswith("subs:") and not stale.endswith(":rebuild"):
+                boards[stale] = {}
+
+        # Scores recorded since the aggregate are buffered under `token` and merged here
+        for board, scores in boards.items():
+            self.store.replace(board, scores, token=token)
+        self.store.mark_built()
+        logger.info(f"[Leaderboard] Rebuilt {len(boards)} boards from {len(totals)} user/subscription totals")
+        return {board: len(scores) for board, scores in boards.items()}
+
+    def ensure_built(self, db: Session) -> None:
+        """
+        Rebuild the boards from SQL if the store lost them. One caller across
+        all processes rebuilds; concurrent callers get LeaderboardNotBuilt and
+        fall back to SQL until it is done.
+        """
+        if self.store.is_built():
+            return
+        with self._rebuilding() as token:
+            if not self.store.is_built():
+                logger.warning("[Leaderboard] Boards missing, rebuilding from played_quizzes")
+                self._rebuild(db, token)
+
+
+leaderboard_service = LeaderboardService()
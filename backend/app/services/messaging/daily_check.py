@@ -0,0 +1,82 @@
+"""
+Winning-potential daily check, evaluated for every user at once.
+
+Score totals and quiz counts come from one aggregate over the
+user_daily_activity rollup, loaded into NumPy arrays; the "can still win" rule
+is a single vectorized comparison over those arrays, so only eligible users are
+ever turned into messages.
+
+    user_ids, scores, counts = load_score_totals(db)
+    eligible = user_ids[winning_potential_mask(scores, counts)]
+"""
+
+from typing import Any, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.daily_activity import UserDailyActivity
+from app.models.enums import MessengerType
+from app.models.user import User
+
+# A user can still win if current score + the most they can earn in the quizzes
+# they have left reaches the threshold
+WINNING_THRESHOLD = 50
+TOTAL_QUIZZES_ALLOWED = 5
+MAX_SCORE_PER_QUIZ = 10
+
+
+def potential_score(current_score: int, quizzes_taken: int) -> int:
+    quizzes_remaining = max(TOTAL_QUIZZES_ALLOWED - quizzes_taken, 0)
+    return current_score + quizzes_remaining * MAX_SCORE_PER_QUIZ
+
+
+def load_score_totals(db: Session) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (user_ids, total_scores, quiz_counts) for every user, in user id order.
+    Users who never played get 0 for both.
+    """
+    totals = db.query(
+        UserDailyActivity.user_id,
+        func.sum(UserDailyActivity.sum_score).label("total_score"),
+        func.sum(UserDailyActivity.rounds).label("quiz_count"),
+    ).group_by(UserDailyActivity.user_id).subquery()
+
+    rows = db.query(
+        User.id,
+        func.coalesce(totals.c.total_score, 0),
+        func.coalesce(totals.c.quiz_count, 0),
+    ).outerjoin(totals, totals.c.user_id == User.id).order_by(User.id).all()
+
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy(), empty.copy()
+    table = np.array(rows, dtype=np.int64)
+    return table[:, 0], table[:, 1], table[:, 2]
+
+
+def winning_potential_mask(scores: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Vectorized potential_score(...) >= WINNING_THRESHOLD."""
+    remaining = np.clip(TOTAL_QUIZZES_ALLOWED - counts, 0, None)
+    return scores + remaining * MAX_SCORE_PER_QUIZ >= WINNING_THRESHOLD
+
+
+def pick_channel(contact: Any) -> Optional[MessengerType]:
+    """
+    Preferred messenger for a load_contacts() row:
+    Telegram > WhatsApp profile > phone number (WhatsApp) > Discord > email.
+    """
+    if contact is None:
+        return None
+    if isinstance(contact.telegram, dict) and contact.telegram.get("chat_id"):
+        return MessengerType.TELEGRAM
+    if isinstance(contact.whatsapp, dict) and contact.whatsapp.get("phone"):
+        return MessengerType.WHATSAPP
+    if contact.phone_number:
+        return MessengerType.WHATSAPP
+    if isinstance(contact.discord, dict) and (contact.discord.get("dm_channel_id") or contact.discord.get("user_id")):
+        return MessengerType.DISCORD
+    if contact.email:
+        return MessengerType.MAIL
+    return None
@@ -0,0 +1,88 @@
+"""
+Discord DM channel cache.
+
+Opening a DM (`POST /users/@me/channels`) costs an extra round trip, so the
+channel id is remembered per Discord user in an in-process LRU and written
+back to `Messenger.discord["dm_channel_id"]`, after which sends go straight
+to `/channels/{id}/messages`. Strategies only touch the cache; the service
+persists newly opened channels in bulk with `flush(db)`.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.messenger import messenger as messenger_crud
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DiscordChannelCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._channels: "OrderedDict[str, str]" = OrderedDict()  # discord user id -> dm channel id
+        self._pending: Dict[int, str] = {}                         # messenger id -> dm channel id to persist
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def get(self, discord_user_id: Optional[str]) -> Optional[str]:
+        if not discord_user_id:
+            return None
+        with self._lock:
+            channel_id = self._channels.get(discord_user_id)
+            if channel_id is None:
+                self.misses += 1
+                return None
+            self._channels.move_to_end(discord_user_id)
+            self.hits += 1
+            return channel_id
+
+    def put(self, discord_user_id: str, channel_id: str, messenger_id: Optional[int] = None) -> None:
+        """Remember a channel; a messenger id queues it for write-back."""
+        with self._lock:
+            self._channels[discord_user_id] = channel_id
+            self._channels.move_to_end(discord_user_id)
+            while len(self._channels) > self.maxsize:
+                self._channels.popitem(last=False)
+            if messenger_id:
+                self._pending[messenger_id] = channel_id
+
+    def invalidate(self, discord_user_id: Optional[str]) -> None:
+        if not discord_user_id:
+            return
+        with self._lock:
+            if self._channels.pop(discord_user_id, None) is not None:
+                self.invalidated += 1
+
+    def flush(self, db: Session) -> int:
+        """Persist channels opened since the last flush into Messenger.discord."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            return messenger_crud.set_discord_dm_channels(db, channels=pending)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"[Discord] Failed to persist {len(pending)} DM channel ids: {e}")
+            return 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._channels),
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidated": self.invalidated,
+            }
+
+
+dm_channel_cache = DiscordChannelCache(maxsize=settings.DISCORD_DM_CACHE_SIZE)
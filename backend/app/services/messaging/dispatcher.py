@@ -0,0 +1,161 @@
+"""
+Async dispatcher for bulk sends.
+
+Runs the async strategies concurrently with a bounded number of in-flight
+requests per provider (settings.MESSAGING_CONCURRENCY). Sync callers go
+through run_sync(), which runs every bulk send on one long-lived event loop
+per process, so all dispatch runs share that loop's keep-alive
+AsyncHttpTransport instead of opening a new pool (and TLS sessions) each time.
+That loop is shared by every thread of the process, so only network I/O may
+run on it: callers do their DB work (contacts, audience, logs) in their own
+thread and hand over ready SendJobs (dispatch_chunk).
+
+    async with AsyncDispatcher() as dispatcher:
+        results = await dispatcher.send_many(MessengerType.TELEGRAM, jobs)
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine, Dict, List, NamedTuple, Optional, TypeVar
+
+from app.core.config import settings
+from app.models.enums import MessengerType
+from app.utils.logger import get_logger
+
+from .strategies.base import AsyncMessagingStrategy
+from .strategies.email import AsyncEmailStrategy
+from .strategies.whatsapp import AsyncWhatsappStrategy
+from .strategies.discord import AsyncDiscordStrategy
+from .telegram_scheduler import TelegramSendScheduler
+from .transport import AsyncHttpTransport, get_async_transport
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# In-flight limit for providers missing from settings.MESSAGING_CONCURRENCY
+DEFAULT_CONCURRENCY = 10
+
+ASYNC_STRATEGIES = {
+    MessengerType.MAIL: AsyncEmailStrategy,
+    MessengerType.WHATSAPP: AsyncWhatsappStrategy,
+    MessengerType.TELEGRAM: TelegramSendScheduler,  # wraps AsyncTelegramStrategy with Bot API rate limits
+    MessengerType.DISCORD: AsyncDiscordStrategy,
+}
+
+
+class SendJob(NamedTuple):
+    target: Optional[str]
+    text: str
+    link: Optional[str] = None
+    extra_data: Optional[dict] = None
+
+
+class AsyncDispatcher:
+    def __init__(
+        self,
+        concurrency: Optional[Dict[str, int]] = None,
+        transport: Optional[AsyncHttpTransport] = None,
+        strategies: Optional[Dict[MessengerType, AsyncMessagingStrategy]] = None,
+    ):
+        """
+        Args:
+            concurrency: Max in-flight sends keyed by messenger type value
+            transport: Async transport to send over (default: the running
+                loop's shared one from get_async_transport())
+            strategies: Pre-built strategies, mainly for tests
+        """
+        self.concurrency = concurrency or settings.MESSAGING_CONCURRENCY
+        self.transport = transport
+        self._strategies: Dict[MessengerType, AsyncMessagingStrategy] = dict(strategies or {})
+        self._semaphores: Dict[MessengerType, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> "AsyncDispatcher":
+        if self.transport is None:
+            self.transport = get_async_transport()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # The transport outlives the run; its connections stay in the pool
+        pass
+
+    def limit_for(self, messenger_type: MessengerType) -> int:
+        return self.concurrency.get(messenger_type.value, DEFAULT_CONCURRENCY)
+
+    def strategy_for(self, messenger_type: MessengerType) -> Optional[AsyncMessagingStrategy]:
+        strategy = self._strategies.get(messenger_type)
+        if strategy is None:
+            strategy_cls = ASYNC_STRATEGIES.get(messenger_type)
+            if strategy_cls is None:
+                return None
+            strategy = strategy_cls(self.transport)
+            self._strategies[messenger_type] = strategy
+        return strategy
+
+    async def send_one(self, messenger_type: MessengerType, job: SendJob) -> bool:
+        strategy = self.strategy_for(messenger_type)
+        if strategy is None:
+            logger.error(f"No async strategy found for {messenger_type}")
+            return False
+
+        semaphore = self._semaphores.get(messenger_type)
+        if semaphore is None:
+            semaphore = self._semaphores[messenger_type] = asyncio.Semaphore(self.limit_for(messenger_type))
+
+        async with semaphore:
+            try:
+                return await strategy.send(job.target, job.text, job.link, extra_data=job.extra_data)
+            except Exception as e:
+                logger.error(f"[Dispatcher] {messenger_type.value} send to {job.target} failed: {e}")
+                return False
+
+    async def send_many(self, messenger_type: MessengerType, jobs: List[SendJob]) -> List[bool]:
+        """Send all jobs concurrently; results keep the order of `jobs`."""
+        return list(await asyncio.gather(*(self.send_one(messenger_type, job) for job in jobs)))
+
+    def strategy_stats(self) -> Dict[str, dict]:
+        """Counters from strategies that keep them (e.g. Telegram throughput)."""
+        return {
+            messenger_type.value: strategy.stats()
+            for messenger_type, strategy in self._strategies.items()
+            if hasattr(strategy, "stats")
+        }
+
+
+async def dispatch_chunk(dispatcher: AsyncDispatcher, messenger_type: MessengerType, jobs: List[SendJob]) -> List[bool]:
+    """One chunk of a sync caller's bulk send, run on the messaging loop via run_sync()."""
+    async with dispatcher:
+        return await dispatcher.send_many(messenger_type, jobs)
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_loop_lock = threading.Lock()
+
+
+def messaging_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide event loop bulk sends run on, started on first use (and again after a fork)."""
+    global _loop, _loop_pid
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(target=_loop.run_forever, name="messaging-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine to completion from sync code, on the messaging loop.
+    Works whether or not the caller's thread already runs an event loop.
+    """
+    loop = messaging_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() called from the messaging loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
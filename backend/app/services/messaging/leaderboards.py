@@ -0,0 +1,125 @@
+"""
+External game leaderboards used by the rank-based scenarios.
+
+Each scenario run downloads every leaderboard it needs once, in parallel, and
+indexes it into a username -> rank dict so per-user lookups are O(1).
+
+    boards = fetch_leaderboards(transport, LEADERBOARD_URLS.values(), timeout=10)
+    rank = boards[url].rank_for(user.username)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.helpers import normalize_msisdn
+from app.utils.logger import get_logger
+
+from .transport import HttpTransport
+
+logger = get_logger(__name__)
+
+LEADERBOARD_URLS: Dict[str, str] = {
+    # Quizard
+    "Ramadan Quiz Challenge": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=34",
+    "Sports Quiz Arena": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=75",
+    "Brain Power Quiz": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=149",
+    "Eid Mega Tournament Quiz": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=150",
+    # Wordly
+    "Wordly English": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=67",
+    "Wordly Bangla": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=79",
+    "Spelling Bee": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=134",
+    "Memory Match": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=151",
+    "Sudoku Easy": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=152",
+    "Sudoku Medium": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=153",
+    "SudokuHard": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=154",
+    "Sudoku Expert": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=155",
+    # Arcaderush
+    "Moto Race City": "https://arcaderush.xyz/Leaderboard/GetLeaderboard?gameName=Knife%20Madness&eventId=1001",
+    "Knife Madness": "https://arcaderush.xyz/Leaderboard/GetLeaderboard?gameName=Knife%20Madness&eventId=1002",
+    "20248 Crazy Merge": "https://arcaderush.xyz/Leaderboard/GetLeaderboard?gameName=Knife%20Madness&eventId=1003",
+}
+
+
+def is_arcaderush(url: str) -> bool:
+    return "arcaderush.xyz" in url
+
+
+class Leaderboard:
+    """
+    Rank index for one leaderboard.
+
+    Arcaderush returns an ordered list of entries keyed by `username`; the rank
+    is the position. Quizard/Wordly entries carry `msisdn` and `User_Rank`, and
+    are indexed by normalize_msisdn() so they match usernames with or without
+    the leading '0' / country code.
+    """
+
+    def __init__(self, url: str, data):
+        self.url = url
+        self.match_msisdn = not is_arcaderush(url)
+        self.ranks: Dict[str, int] = {}
+
+        if not isinstance(data, list):
+            return
+
+        if self.match_msisdn:
+            for entry in data:
+                if isinstance(entry, dict) and "msisdn" in entry and "User_Rank" in entry:
+                    # First entry wins, like the linear scan this replaces
+                    self.ranks.setdefault(self._key(str(entry["msisdn"])), entry["User_Rank"])
+        else:
+            for i, entry in enumerate(data):
+                if isinstance(entry, dict) and "username" in entry:
+                    self.ranks.setdefault(entry["username"], i + 1)
+
+    @staticmethod
+    def _key(msisdn: str) -> str:
+        return normalize_msisdn(msisdn) or msisdn
+
+    def rank_for(self, username: Optional[str]) -> Optional[int]:
+        if not username:
+            return None
+        if self.match_msisdn:
+            return self.ranks.get(self._key(username))
+        return self.ranks.get(username)
+
+    def players(self) -> Iterator[Tuple[str, int]]:
+        """(username or normalized msisdn, rank) for every entry."""
+        return iter(self.ranks.items())
+
+    def __len__(self) -> int:
+        return len(self.ranks)
+
+
+def fetch_leaderboards(
+    transport: HttpTransport,
+    urls: Iterable[str],
+    timeout: float = 10,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Leaderboard]:
+    """
+    Download the distinct `urls` concurrently. Leaderboards that fail to
+    download are logged and left out of the result.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+
+    def fetch(url: str) -> Leaderboard:
+        response = transport.get(url, timeout=timeout)
+        response.raise_for_status()
+        return Leaderboard(url, response.json())
+
+    boards: Dict[str, Leaderboard] = {}
+    workers = min(max_workers or settings.LEADERBOARD_FETCH_WORKERS, len(urls))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="leaderboard") as pool:
+        futures = {url: pool.submit(fetch, url) for url in urls}
+        for url, future in futures.items():
+            try:
+                boards[url] = future.result()
+            except Exception as e:
+                logger.error(f"Failed to fetch leaderboard {url}: {e}")
+
+    logger.info(f"Fetched {len(boards)}/{len(urls)} leaderboards")
+    return boards
@@ -0,0 +1,119 @@
+"""
+Buffered writer for the messages audit log.
+
+Rows are collected in memory and written with one multi-row INSERT and one
+COMMIT every `flush_size` rows or `flush_interval_ms` milliseconds, instead of
+an INSERT + COMMIT + refresh SELECT per outbound message.
+
+The buffer is shared by every request and task in the process, so flushes
+run on a session of their own rather than the caller's: a failed insert
+never rolls back someone else's pending work. A background thread flushes
+every `flush_interval_ms` so rows don't linger once traffic stops, and whatever
+is left is written at interpreter exit.
+"""
+
+import atexit
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+
+from app.crud import message as message_crud
+from app.database.session import SessionLocal
+from app.models.enums import MessengerType
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MessageLogWriter:
+    def __init__(self, flush_size: int = 500, flush_interval_ms: int = 2000, session_factory: Callable[[], Session] = SessionLocal):
+        self.flush_size = flush_size
+        self.flush_interval_ms = flush_interval_ms
+        self.session_factory = session_factory
+
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        # Serializes flushes so rows are written in the order they were buffered
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wakeup = threading.Event()
+        # pid that owns the timer thread; a forked worker starts its own
+        self._timer_pid: Optional[int] = None
+
+        # Counters
+        self.buffered = 0
+        self.flushed = 0
+        self.dropped = 0
+
+        atexit.register(self.flush)
+
+    def add(self, messenger_type: MessengerType, text: str, link: Optional[str] = None, user_id: Optional[int] = None) -> None:
+        """Buffer one log row; flushes when the size threshold is reached, else the timer does."""
+        with self._lock:
+            self._rows.append({
+                "text": text,
+                "link": link,
+                "messenger_type": messenger_type,
+                "user_id": user_id,
+            })
+            self.buffered += 1
+            elapsed_ms = (time.monotonic() - self._last_flush) * 1000
+            due = len(self._rows) >= self.flush_size or elapsed_ms >= self.flush_interval_ms
+            if self._timer_pid != os.getpid():
+                self._start_timer()
+
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write every buffered row now. Rows that fail to insert are dropped and counted."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self._last_flush = time.monotonic()
+
+            if not rows:
+                return 0
+
+            db = self.session_factory()
+            try:
+                message_crud.create_many(db, rows=rows)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(rows)} message log rows: {e}")
+                db.rollback()
+                with self._lock:
+                    self.dropped += len(rows)
+                return 0
+            finally:
+                db.close()
+
+        with self._lock:
+            self.flushed += len(rows)
+        return len(rows)
+
+    def _start_timer(self) -> None:
+        # Called with self._lock held
+        self._timer_pid = os.getpid()
+        threading.Thread(target=self._run_timer, name="message-log-flush", daemon=True).start()
+
+    def _run_timer(self) -> None:
+        interval = self.flush_interval_ms / 1000
+        while not self._wakeup.wait(interval):
+            if self._rows:
+                self.flush()
+
+    def close(self) -> None:
+        """Stop the timer thread and write what is left."""
+        self._wakeup.set()
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "buffered": self.buffered,
+                "pending": len(self._rows),
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+            }
@@ -0,0 +1,95 @@
+"""
+Recipient resolution for batched sends.
+
+Turns a chunk of user ids into provider targets (Telegram chat_id, Discord DM
+channel, WhatsApp phone, email) with one users/messengers join instead of a
+user lookup plus a lazy messenger load per message.
+"""
+
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from app.models.enums import MessengerType
+from app.models.user import User
+from app.models.messenger import Messenger
+
+
+class Recipient(NamedTuple):
+    user_id: Optional[int]
+    text: str
+    link: Optional[str] = None
+    # Explicit contact, used when the user's messenger profile has nothing better
+    to: Optional[str] = None
+    # Scenario sends: which of the day's messages this is when a scenario can
+    # send a user several (e.g. the subscription id); the send ledger key
+    message_key: Optional[str] = None
+
+
+def load_contacts(db: Session, user_ids: Iterable[int]) -> Dict[int, Any]:
+    """Fetch contact columns and messenger profiles for many users in one query."""
+    ids = {uid for uid in user_ids if uid}
+    if not ids:
+        return {}
+
+    rows = db.query(
+        User.id,
+        User.email,
+        User.phone_number,
+        User.messenger_id,
+        Messenger.telegram,
+        Messenger.discord,
+        Messenger.whatsapp,
+    ).outerjoin(Messenger, User.messenger_id == Messenger.id)\
+     .filter(User.id.in_(ids)).all()
+
+    return {row.id: row for row in rows}
+
+
+def resolve_target(messenger_type: MessengerType, contact: Any, fallback: Optional[str] = None) -> Tuple[Optional[str], dict]:
+    """
+    Pick the provider target for one user.
+
+    Returns (target, extra_data) where extra_data carries strategy hints such as
+    the Discord user id used to open a DM channel when none is stored yet.
+    """
+    extra_data = {}
+    target = fallback
+
+    if contact is None:
+        return target, extra_data
+
+    if messenger_type == MessengerType.TELEGRAM:
+        # Expect lookup in 'telegram' JSON column: {"chat_id": 123}
+        if contact.telegram and isinstance(contact.telegram, dict):
+            chat_id = contact.telegram.get("chat_id")
+            if chat_id:
+                target = str(chat_id)
+
+    elif messenger_type == MessengerType.DISCORD:
+        # Expect lookup in 'discord' JSON column: {"dm_channel_id": "...", "user_id": "..."}
+        if contact.discord and isinstance(contact.discord, dict):
+            dm_channel_id = contact.discord.get("dm_channel_id")
+            discord_user_id = contact.discord.get("user_id")
+
+            if dm_channel_id:
+                target = str(dm_channel_id)
+
+            if discord_user_id:
+                # Kept even with a stored channel so a stale one can be reopened
+                extra_data['user_id'] = str(discord_user_id)
+                extra_data['messenger_id'] = contact.messenger_id
+                extra_data['create_dm'] = not dm_channel_id
+
+    elif messenger_type == MessengerType.WHATSAPP:
+        if contact.whatsapp and isinstance(contact.whatsapp, dict):
+            phone = contact.whatsapp.get("phone")
+            if phone:
+                target = phone
+        if not target:
+            target = contact.phone_number
+
+    elif messenger_type == MessengerType.MAIL:
+        if not target:
+            target = contact.email
+
+    return target, extra_data
@@ -1,16 +1,30 @@
-from typing import Dict, Optional, Any
-from datetime import datetime, date
+from typing import Dict, Optional, Any, Iterable, Iterator, List, NamedTuple, Set, Tuple
+from datetime import date, timedelta
+import uuid
+import requests
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from app.models.enums import MessengerType, NotificationContextType, MessageScenarioType, PlatformType
+from sqlalchemy import func, and_, exists
+from app.models.enums import LedgerStatus, MessengerType, NotificationContextType, MessageScenarioType, PlatformType
 from app.models.user import User
 from app.models.quiz import PlayedQuiz, UserSubscribed
+from app.models.daily_activity import UserDailyActivity
 from app.models.subscription import Subscription
 from app.core.config import settings
-from app.crud import message as message_crud
-from app.schemas.messenger import MessageCreate
+from app.crud.outbox import outbox as outbox_crud, ClaimedMessage
+from app.crud.send_ledger import LedgerKey, LedgerScope, scenario_send_ledger as ledger_crud
+from app.crud.user import user as user_crud
+from app.services.leaderboard import LeaderboardUnavailable, leaderboard_service
 from app.utils.logger import get_logger
-
+from app.utils.helpers import chunked, day_range, utcnow
+
+from .dispatcher import ASYNC_STRATEGIES, AsyncDispatcher, SendJob, dispatch_chunk, run_sync
+from .discord_channels import dm_channel_cache
+from .daily_check import WINNING_THRESHOLD, load_score_totals, pick_channel, potential_score, winning_potential_mask
+from .leaderboards import LEADERBOARD_URLS, fetch_leaderboards
+from .message_log import MessageLogWriter
+from .recipients import Recipient, load_contacts, resolve_target
+from .templates import TOP_RANKER_HEADLINES, compile_custom_text, templates
+from .transport import HttpTransport, get_default_transport
 from .strategies.base import MessagingStrategy
 from .strategies.email import EmailStrategy
 from .strategies.whatsapp import WhatsappStrategy
@@ -19,76 +33,196 @@ from .strategies.discord import DiscordStrategy
 
 logger = get_logger(__name__)
 
+# Number of user ids resolved per users/messengers query in batch sends
+RESOLVE_CHUNK_SIZE = 500
+
+
+class RankedPlayer(NamedTuple):
+    id: int
+    username: str
+    total_score: int
+
+
+def top_players(db: Session, subscription_id: Optional[int], offset: int, limit: int) -> List[RankedPlayer]:
+    """
+    Players ranked offset+1 .. offset+limit by total score, read from the
+    leaderboard engine. Boards lost from the store are rebuilt first; while
+    the store is unreachable (or another caller is rebuilding) the ranking is
+    aggregated from played_quizzes instead.
+    """
+    try:
+        leaderboard_service.ensure_built(db)
+        ranked = leaderboard_service.rank_range(subscription_id, offset + 1, offset + limit)
+    except LeaderboardUnavailable as e:
+        logger.warning(f"[Leaderboard] Unavailable, ranking from played_quizzes: {e}")
+        query = db.query(User.id, User.username, func.sum(PlayedQuiz.score).label('total_score'))\
+            .join(PlayedQuiz, User.id == PlayedQuiz.user_id)
+        if subscription_id:
+            query = query.filter(PlayedQuiz.subs_id == subscription_id)
+        rows = query.group_by(User.id).order_by(func.sum(PlayedQuiz.score).desc()).offset(offset).limit(limit).all()
+        return [RankedPlayer(*row) for row in rows]
+
+    if not ranked:
+        return []
+    usernames = dict(db.query(User.id, User.username).filter(User.id.in_([user_id for user_id, _ in ranked])).all())
+    return [RankedPlayer(user_id, usernames[user_id], score) for user_id, score in ranked if user_id in usernames]
+
+
+def claimed_recipients(keyed: List[Tuple[LedgerKey, Recipient]], claimed: Set[LedgerKey]) -> List[Tuple[LedgerKey, Recipient]]:
+    """The claimed messages of a chunk, each once even if the chunk repeats it."""
+    remaining = set(claimed)
+    fresh = []
+    for key, recipient in keyed:
+        if key in remaining:
+            remaining.discard(key)
+            fresh.append((key, recipient))
+    return fresh
+
+
 class MessagingService:
-    def __init__(self):
+    def __init__(self, transport: Optional[HttpTransport] = None):
+        # Every strategy shares one pooled HTTP transport
+        self.transport = transport or get_default_transport()
         self._strategies: Dict[MessengerType, MessagingStrategy] = {
-            MessengerType.MAIL: EmailStrategy(),
-            MessengerType.WHATSAPP: WhatsappStrategy(),
-            MessengerType.TELEGRAM: TelegramStrategy(),
-            MessengerType.DISCORD: DiscordStrategy(),
+            MessengerType.MAIL: EmailStrategy(self.transport),
+            MessengerType.WHATSAPP: WhatsappStrategy(self.transport),
+            MessengerType.TELEGRAM: TelegramStrategy(self.transport),
+            MessengerType.DISCORD: DiscordStrategy(self.transport),
         }
+        self.message_log = MessageLogWriter(
+            flush_size=settings.MESSAGE_LOG_FLUSH_SIZE,
+            flush_interval_ms=settings.MESSAGE_LOG_FLUSH_INTERVAL_MS,
+        )
+        # Per-provider counters from the most recent bulk send (Telegram throughput etc.)
+        self.last_bulk_run: Dict[str, dict] = {}
 
     def send_message(self, db: Session, messenger_type: MessengerType, to: str, text: str, link: str = None, user_id: int = None) -> bool:
-        
-        extra_data = {}
-        target = to
-
-        # If we have a user_id, try to fetch better contact info from Messenger profile
-        if user_id:
-            from app.models.user import User as UserModel
-            # Eager load messenger
-            user = db.query(UserModel).filter(UserModel.id == user_id).first()
-            if user and user.messenger:
-                msg_profile = user.messenger
-                
-                if messenger_type == MessengerType.TELEGRAM:
-                    # Expect lookup in 'telegram' JSON column: {"chat_id": 123}
-                    if msg_profile.telegram and isinstance(msg_profile.telegram, dict):
-                        chat_id = msg_profile.telegram.get("chat_id")
-                        if chat_id:
-                            target = str(chat_id)
-                            
-                elif messenger_type == MessengerType.DISCORD:
-                    # Expect lookup in 'discord' JSON column: {"dm_channel_id": "...", "user_id": "..."}
-                    if msg_profile.discord and isinstance(msg_profile.discord, dict):
-                        dm_channel_id = msg_profile.discord.get("dm_channel_id")
-                        discord_user_id = msg_profile.discord.get("user_id")
-                        
-                        if dm_channel_id:
-                            target = str(dm_channel_id)
-                        
-                        if discord_user_id:
-                            extra_data['user_id'] = str(discord_user_id)
-                            extra_data['create_dm'] = True
-                            
-                elif messenger_type == MessengerType.WHATSAPP:
-                    # Validating phone from profile if needed, but usually 'to' from user.phone_number is fine
-                    if msg_profile.whatsapp and isinstance(msg_profile.whatsapp, dict):
-                        phone = msg_profile.whatsapp.get("phone")
-                        if phone:
-                            target = phone
-
+        """
+        Send a single message over the pooled sync transport.
+        """
         strategy = self._strategies.get(messenger_type)
         if not strategy:
             logger.error(f"No strategy found for {messenger_type}")
             return False
-            
-        success = strategy.send(target, text, link, extra_data=extra_data)
-        
-        # Log to DB via CRUD
+
+        contacts = load_contacts(db, [user_id])
+        target, extra_data = resolve_target(messenger_type, contacts.get(user_id), to)
+
         try:
-            msg_data = MessageCreate(
-                text=text,
-                link=link,
-                messenger_type=messenger_type,
-                user_id=user_id
-            )
-            message_crud.create(db, obj_in=msg_data)
-        except Exception as e:
-            logger.error(f"Failed to log message to DB: {e}")
-            
+            success = strategy.send(target, text, link, extra_data=extra_data)
+            # Written by the next size/timer flush, not one INSERT per message
+            self.message_log.add(messenger_type, text, link, user_id)
+        finally:
+            dm_channel_cache.flush(db)
+
         return success
 
+    def send_messages(self, db: Session, messenger_type: MessengerType, recipients: Iterable[Recipient], chunk_size: int = RESOLVE_CHUNK_SIZE) -> List[bool]:
+        """
+        Send a batch of messages through one messenger.
+        Targets are resolved per chunk of user ids with a single joined query
+        in the calling thread; only the prepared SendJobs are handed to the
+        shared messaging loop, which fans each chunk out concurrently. No SQL
+        runs on that loop and `db` never leaves the caller's thread.
+        Returns one success flag per recipient, in order.
+        """
+        results: List[bool] = []
+
+        if messenger_type not in ASYNC_STRATEGIES:
+            logger.error(f"No strategy found for {messenger_type}")
+            return [False for _ in recipients]
+
+        dispatcher = AsyncDispatcher()
+        try:
+            for chunk in chunked(recipients, chunk_size):
+                contacts = load_contacts(db, (r.user_id for r in chunk))
+
+                jobs = []
+                for r in chunk:
+                    target, extra_data = resolve_target(messenger_type, contacts.get(r.user_id), r.to)
+                    jobs.append(SendJob(target, r.text, r.link, extra_data))
+
+                results.extend(run_sync(dispatch_chunk(dispatcher, messenger_type, jobs)))
+
+                for r in chunk:
+                    self.message_log.add(messenger_type, r.text, r.link, r.user_id)
+
+            run_stats = dispatcher.strategy_stats()
+            if run_stats:
+                self.last_bulk_run = run_stats
+                logger.info(f"[Messaging] Bulk {messenger_type.value} run: {run_stats}")
+        finally:
+            self.message_log.flush()
+            dm_channel_cache.flush(db)
+
+        return results
+
+    def enqueue_messages(self, db: Session, messenger_type: MessengerType, recipients: Iterable[Recipient], source: Optional[str] = None, chunk_size: int = RESOLVE_CHUNK_SIZE, commit: bool = True) -> int:
+        """
+        Queue rendered messages in the outbox (one multi-row INSERT per chunk)
+        for the outbox dispatcher workers to deliver. commit=False leaves the
+        rows in the caller's transaction.
+        """
+        count = 0
+        for chunk in chunked(recipients, chunk_size):
+            count += outbox_crud.enqueue_many(db, commit=commit, rows=[
+                {
+                    "user_id": r.user_id,
+                    "messenger_type": messenger_type,
+                    "target": r.to,
+                    "text": r.text,
+                    "link": r.link,
+                    "source": source,
+                }
+                for r in chunk
+            ])
+        return count
+
+    def _deliver(self, db: Session, messenger_type: MessengerType, recipients: Iterable[Recipient], source: Optional[str] = None) -> int:
+        """Send now, or queue in the outbox when MESSAGING_USE_OUTBOX is on. Returns the message count."""
+        if settings.MESSAGING_USE_OUTBOX:
+            return self.enqueue_messages(db, messenger_type, recipients, source)
+        return len(self.send_messages(db, messenger_type, recipients))
+
+    def deliver_outbox_batch(self, db: Session, batch: List[ClaimedMessage]) -> dict:
+        """Send a claimed outbox batch and record the outcome of every row."""
+        by_type: Dict[MessengerType, List[ClaimedMessage]] = {}
+        for row in batch:
+            by_type.setdefault(row.messenger_type, []).append(row)
+
+        sent_ids: List[int] = []
+        failed: List[ClaimedMessage] = []
+        for messenger_type, rows in by_type.items():
+            results = self.send_messages(
+                db, messenger_type, [Recipient(r.user_id, r.text, r.link, r.target) for r in rows]
+            )
+            for row, ok in zip(rows, results):
+                if ok:
+                    sent_ids.append(row.id)
+                else:
+                    failed.append(row)
+
+        outbox_crud.mark_sent(db, ids=sent_ids)
+        dead = outbox_crud.mark_failed(
+            db,
+            rows=failed,
+            max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+            retry_delay_seconds=settings.OUTBOX_RETRY_DELAY_SECONDS,
+        )
+        return {"sent": len(sent_ids), "retrying": len(failed) - dead, "failed": dead}
+
+    def flush_message_log(self) -> int:
+        """Write any buffered audit log rows. Called at the end of every Celery task."""
+        return self.message_log.flush()
+
+    def stats(self) -> dict:
+        return {
+            "message_log": self.message_log.stats(),
+            "transport": self.transport.stats.snapshot(),
+            "last_bulk_run": self.last_bulk_run,
+            "discord_dm_cache": dm_channel_cache.stats(),
+        }
+
     def preview_contextual_messages(self, db: Session, context_type: NotificationContextType, subscription_id: Optional[int] = None) -> dict:
         """
         Preview what the message would look like for a given context.
@@ -104,11 +238,7 @@ class MessagingService:
 
         if context_type == NotificationContextType.TOP_RANKERS:
             draft = f"🏆 Congratulations! You are among the top rankers in {package_name}! Your total score is {{total_score}}."
-            query = db.query(User.username).join(PlayedQuiz, User.id == PlayedQuiz.user_id)
-            if subscription_id:
-                query = query.filter(PlayedQuiz.subs_id == subscription_id)
-            top_players = query.group_by(User.id).order_by(func.sum(PlayedQuiz.score).desc()).limit(3).all()
-            names = ", ".join([p.username for p in top_players])
+            names = ", ".join([p.username for p in top_players(db, subscription_id, 0, 3)])
             target_summary = f"Targets top 3 players: {names}"
 
         elif context_type == NotificationContextType.INSPIRING_TOP_10_30:
@@ -124,11 +254,7 @@ class MessagingService:
             target_summary = "Broadcast to the configured community channel."
 
         elif context_type == NotificationContextType.CHANNEL_CONGRATS_TOP_5:
-            query = db.query(User.username).join(PlayedQuiz, User.id == PlayedQuiz.user_id)
-            if subscription_id:
-                query = query.filter(PlayedQuiz.subs_id == subscription_id)
-            top_5 = query.group_by(User.id).order_by(func.sum(PlayedQuiz.score).desc()).limit(5).all()
-            names = ", ".join([f"@{p.username}" for p in top_5])
+            names = ", ".join([f"@{p.username}" for p in top_players(db, subscription_id, 0, 5)])
             draft = f"🎉 Huge congratulations to our Top 5 players in {package_name}: {names}! Amazing job! 🥳"
             target_summary = "Broadcast to the configured community channel."
 
@@ -144,6 +270,9 @@ class MessagingService:
         Allows custom_text override from frontend.
         """
         count = 0
+        recipients: List[Recipient] = []
+        # Parsed once, rendered per recipient
+        custom_template = compile_custom_text(custom_text) if custom_text else None
         package_name = "Global"
         if subscription_id:
             sub = db.query(Subscription).filter(Subscription.id == subscription_id).first()
@@ -151,465 +280,312 @@ class MessagingService:
                 package_name = sub.name
         
         if context_type == NotificationContextType.TOP_RANKERS:
-            query = db.query(User.id, User.username, func.sum(PlayedQuiz.score).label('total_score'))\
-                .join(PlayedQuiz, User.id == PlayedQuiz.user_id)
-            
-            if subscription_id:
-                query = query.filter(PlayedQuiz.subs_id == subscription_id)
+            ranked = top_players(db, subscription_id, 0, 3)
             
-            top_players = query.group_by(User.id).order_by(func.sum(PlayedQuiz.score).desc()).limit(3).all()
-            
-            for i, p in enumerate(top_players):
-                if custom_text:
-                    text = custom_text.replace("{total_score}", str(p.total_score))\
-                                     .replace("{username}", p.username)\
-                                     .replace("{package_name}", package_name)
-                else:
-                    messages = [
-                        "🏆 Congratulations! You are among the top rankers!",
-                        "🔥 Incredible performance! You're dominating the leaderboard.",
-                        "⭐ Keep it up! You are in the top 3!"
-                    ]
-                    msg_template = messages[i if i < len(messages) else 0]
-                    text = f"{msg_template} in {package_name}. Your total score is {p.total_score}."
-                
-                self.send_message(db, messenger_type, "resolve_from_user_id", text, user_id=p.id)
-                count += 1
+            template = custom_template or templates.get("contextual.top_rankers")
+            texts = template.render_many(
+                {
+                    "headline": TOP_RANKER_HEADLINES[i if i < len(TOP_RANKER_HEADLINES) else 0],
+                    "total_score": p.total_score,
+                    "username": p.username,
+                    "package_name": package_name,
+                }
+                for i, p in enumerate(ranked)
+            )
+            recipients.extend(Recipient(p.id, text) for p, text in zip(ranked, texts))
 
         elif context_type == NotificationContextType.INSPIRING_TOP_10_30:
-            sub_query = db.query(User.id, User.username, func.sum(PlayedQuiz.score).label('total_score'))\
-                .join(PlayedQuiz, User.id == PlayedQuiz.user_id)
-            if subscription_id:
-                sub_query = sub_query.filter(PlayedQuiz.subs_id == subscription_id)
-            
-            targets = sub_query.group_by(User.id).order_by(func.sum(PlayedQuiz.score).desc()).offset(9).limit(21).all()
+            targets = top_players(db, subscription_id, 9, 21)
             
-            for p in targets:
-                if custom_text:
-                    text = custom_text.replace("{total_score}", str(p.total_score))\
-                                     .replace("{username}", p.username)\
-                                     .replace("{package_name}", package_name)
-                else:
-                    text = f"Keep pushing in {package_name}! You're currently ranked in the top 30 with {p.total_score} points. You can do it!"
-                self.send_message(db, messenger_type, "resolve_from_user_id", text, user_id=p.id)
-                count += 1
+            template = custom_template or templates.get("contextual.inspiring_top_10_30")
+            texts = template.render_many(
+                {"total_score": p.total_score, "username": p.username, "package_name": package_name}
+                for p in targets
+            )
+            recipients.extend(Recipient(p.id, text) for p, text in zip(targets, texts))
 
         elif context_type == NotificationContextType.SOFT_REMINDER:
             sub_users_query = db.query(User.id).join(UserSubscribed, User.id == UserSubscribed.user_id)
             if subscription_id:
                 sub_users_query = sub_users_query.filter(UserSubscribed.subs_id == subscription_id)
             
-            played_today = db.query(PlayedQuiz.user_id).filter(func.date(PlayedQuiz.created_at) == date.today()).subquery()
+            played_today = db.query(UserDailyActivity.user_id).filter(UserDailyActivity.day == date.today()).subquery()
             users_to_remind = sub_users_query.filter(User.id.notin_(played_today)).all()
             
-            for u in users_to_remind:
-                text = custom_text if custom_text else f"👋 Don't forget to play your {package_name} quizzes today! Your streak is at risk."
-                if text and "{package_name}" in text:
-                    text = text.replace("{package_name}", package_name)
-                link = "https://yourplaylink.com" 
-                self.send_message(db, messenger_type, "resolve_from_user_id", text, link=link, user_id=u.id)
-                count += 1
+            # Same text for everyone: render once
+            text = (custom_template or templates.get("contextual.soft_reminder")).render({"package_name": package_name})
+            link = "https://yourplaylink.com" 
+            recipients.extend(Recipient(u.id, text, link) for u in users_to_remind)
 
         elif context_type == NotificationContextType.CHANNEL_PROMO:
             target = settings.TELEGRAM_CHANNEL_ID if messenger_type == MessengerType.TELEGRAM else None
             if target:
-                text = custom_text if custom_text else f"🚀 Unlock more rewards! Subscribe to our {package_name if subscription_id else 'premium'} packages."
-                if text and "{package_name}" in text:
-                    text = text.replace("{package_name}", package_name)
-                self.send_message(db, messenger_type, target, text, link="https://subscribe-here.com")
-                count = 1
+                template = custom_template or templates.get("contextual.channel_promo")
+                text = template.render({"package_name": package_name, "package_label": package_name if subscription_id else "premium"})
+                recipients.append(Recipient(None, text, "https://subscribe-here.com", to=target))
 
         elif context_type == NotificationContextType.CHANNEL_CONGRATS_TOP_5:
             target = settings.TELEGRAM_CHANNEL_ID if messenger_type == MessengerType.TELEGRAM else None
             if target:
-                if custom_text:
-                    text = custom_text.replace("{package_name}", package_name)
+                if custom_template:
+                    text = custom_template.render({"package_name": package_name})
                 else:
-                    query = db.query(User.username).join(PlayedQuiz, User.id == PlayedQuiz.user_id)
-                    if subscription_id:
-                        query = query.filter(PlayedQuiz.subs_id == subscription_id)
-                    top_5 = query.group_by(User.id).order_by(func.sum(PlayedQuiz.score).desc()).limit(5).all()
-                    names = ", ".join([f"@{p.username}" for p in top_5])
-                    text = f"🎉 Huge congratulations to our Top 5 players in {package_name}: {names}! Amazing job! 🥳"
-                
-                self.send_message(db, messenger_type, target, text)
-                count = 1
+                    names = ", ".join([f"@{p.username}" for p in top_players(db, subscription_id, 0, 5)])
+                    text = templates.render("contextual.channel_congrats_top_5", {"package_name": package_name, "names": names})
+
+                recipients.append(Recipient(None, text, to=target))
+
+        if recipients:
+            count = self._deliver(db, messenger_type, recipients, source=context_type.value)
 
         return {"status": "success", "processed_count": count}
 
     def send_scenario_messages(self, db: Session, scenario_type: MessageScenarioType, messenger_type: MessengerType) -> dict:
         """
-        Send messages based on specific business scenarios.
+        Send messages based on specific business scenarios, in this process
+        (or queue them in the outbox). Celery runs fan the same recipients out
+        over chunk tasks instead (app.tasks.scenario).
         """
-        import requests
-        from datetime import timedelta
-        count = 0
+        return self.send_scenario_recipients(db, scenario_type, messenger_type, self.iter_scenario_recipients(db, scenario_type))
+
+    def send_scenario_recipients(self, db: Session, scenario_type: MessageScenarioType, messenger_type: MessengerType, recipients: Iterable[Recipient], send_date: Optional[date] = None, chunk_size: int = RESOLVE_CHUNK_SIZE) -> dict:
+        """
+        Deliver (or queue) each scenario message at most once per user per day.
+        A message is identified by (scenario, channel, day, user,
+        Recipient.message_key), never by its text, so a rerun later in the day
+        with fresher scores or ranks does not message anyone again.
+
+        Every chunk is claimed in the send ledger before anything is sent, with
+        a claim id unique to this call: only messages this call newly claimed
+        are sent, so a retried chunk task or an overlapping run skips whatever
+        another attempt already holds. Claims of failed sends are released for
+        the next run to retry. `send_date` is the scenario day (the planner's
+        date.today(), passed to every chunk so a run spanning midnight stays on
+        one day).
+        """
+        scope = LedgerScope(scenario_type, messenger_type, send_date or date.today())
+        claim_id = uuid.uuid4().hex
+        stale_before = utcnow() - timedelta(seconds=settings.SCENARIO_CLAIM_TTL_SECONDS)
+        processed = skipped = sent = 0
 
+        for chunk in chunked(recipients, chunk_size):
+            keyed = [(LedgerKey(r.user_id, r.message_key or ""), r) for r in chunk]
+
+            if settings.MESSAGING_USE_OUTBOX:
+                # Claim and outbox rows commit together: a crash leaves both or neither
+                try:
+                    claimed = ledger_crud.claim(
+                        db, scope=scope, keys=(k for k, _ in keyed), claim_id=claim_id,
+                        status=LedgerStatus.SENT, stale_before=stale_before, commit=False,
+                    )
+                    fresh = claimed_recipients(keyed, claimed)
+                    self.enqueue_messages(db, messenger_type, [r for _, r in fresh], source=scenario_type.value, commit=False)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                delivered = len(fresh)
+            else:
+                claimed = ledger_crud.claim(db, scope=scope, keys=(k for k, _ in keyed), claim_id=claim_id, stale_before=stale_before)
+                fresh = claimed_recipients(keyed, claimed)
+                try:
+                    results = self.send_messages(db, messenger_type, [r for _, r in fresh]) if fresh else []
+                except Exception:
+                    ledger_crud.release(db, scope=scope, keys=(k for k, _ in fresh), claim_id=claim_id)
+                    raise
+                ok_keys = [k for (k, _), ok in zip(fresh, results) if ok]
+                ledger_crud.mark_sent(db, scope=scope, keys=ok_keys, claim_id=claim_id, commit=False)
+                ledger_crud.release(db, scope=scope, keys=(k for (k, _), ok in zip(fresh, results) if not ok), claim_id=claim_id, commit=False)
+                db.commit()
+                delivered = len(ok_keys)
+
+            skipped += len(chunk) - len(fresh)
+            processed += len(fresh)
+            sent += delivered
+
+        if skipped:
+            logger.info(f"[Messaging] {scenario_type.value}: skipped {skipped} messages already sent or claimed today")
+        return {"status": "success", "processed_count": processed, "sent_count": sent, "skipped_count": skipped}
+
+    def iter_scenario_recipients(self, db: Session, scenario_type: MessageScenarioType) -> Iterator[Recipient]:
+        """
+        Yield the audience and rendered text for a business scenario.
+        """
         # 1. Unsubscribed Reminder
         if scenario_type == MessageScenarioType.UNSUBSCRIBED_REMINDER:
-            # Mapping from platform attribute name to PlatformType enum and display name
-            platform_info = {
-                "quizard": (PlatformType.QUIZARD, "কুইজার্ড"),
-                "wordly": (PlatformType.WORDLY, "ওয়ার্ডলি"),
-                "arcaderush": (PlatformType.ARCADERUSH, "আরকেড রাস"),
+            platform_names = {
+                PlatformType.QUIZARD: "কুইজার্ড",
+                PlatformType.WORDLY: "ওয়ার্ডলি",
+                PlatformType.ARCADERUSH: "আরকেড রাস",
+            }
+            texts = {
+                platform: templates.render("scenario.unsubscribed_reminder", {"platform_name": name})
+                for platform, name in platform_names.items()
             }
 
-            all_users = db.query(User).all()
-            
-            for user in all_users:
-                days_since = (date.today() - user.created_at.date()).days
-                if not (days_since > 0):
-                    continue
-
-                # 1. Find platforms the user is registered for
-                registered_platforms = set()
-                for platform_attr, (platform_enum, _) in platform_info.items():
-                    if getattr(user, platform_attr, False):
-                        registered_platforms.add(platform_enum)
-                
-                if not registered_platforms:
-                    continue
-
-                # 2. Find platforms the user has an active subscription for
-                subscribed_platforms = set()
-                user_subs = db.query(Subscription.platform)\
-                    .join(UserSubscribed, Subscription.id == UserSubscribed.subs_id)\
-                    .filter(UserSubscribed.user_id == user.id)\
-                    .filter(UserSubscribed.end_date >= date.today()) \
-                    .distinct().all()
-                
-                for sub in user_subs:
-                    subscribed_platforms.add(sub.platform)
-
-                # 3. Find platforms to remind the user about
-                platforms_to_remind = registered_platforms - subscribed_platforms
-                
-                # 4. Send messages
-                for platform_enum in platforms_to_remind:
-                    # Look up the platform display name from the original platform_info dict
-                    platform_display_name = ""
-                    for key, (enum_val, display_name) in platform_info.items():
-                        if enum_val == platform_enum:
-                            platform_display_name = display_name
-                            break
-                    
-                    if platform_display_name:
-                        text = f"আপনি এখনো {platform_display_name} সার্ভিসেটিতে সাবস্ক্রিপশন করেন নি। এখনই সাবস্ক্রিপশন খেলুন এবং লুফে নিন ডেইলি, উইকলি, মেগা প্রাইজ সহ অনেক অনেক আকর্ষণীয় পুরষ্কার জেতার সুযোগ।\
-                            \n\nখেলতে ক্লিক করুন- https://quizard.live/?qcid=246"
-                        self.send_message(db, messenger_type, "resolve", text, user_id=user.id)
-                        count += 1
+            # One set-based query per id window instead of a subscription query per user
+            for batch in user_crud.iter_unsubscribed_platforms(db, today=date.today()):
+                for user_id, platform in batch:
+                    yield Recipient(user_id, texts[platform], message_key=platform.value)
         # 2. Score Summary (after 2 rounds)
         elif scenario_type == MessageScenarioType.DAILY_SCORE_UPDATE:
-            today = date.today()
             # Calculate users who played the same subscription at least 2 times today
-            round_counts = db.query(
-                PlayedQuiz.user_id,
-                PlayedQuiz.subs_id,
-                func.max(PlayedQuiz.score).label('max_score')
-            ).filter(func.date(PlayedQuiz.created_at) == today)\
-             .group_by(PlayedQuiz.user_id, PlayedQuiz.subs_id)\
-             .having(func.count(PlayedQuiz.id) >= 2).all()
-            
-            for r in round_counts:
-                # Get max score
-                max_score = r.max_score
-                if max_score is None:
-                    continue
-                    
-                text = f"আপনার আজকের দুটি রাউন্ড সফল ভাবে সম্পন্ন হয়েছে। আজকে আপনার সর্বোচ্চ স্কোর {max_score}\
-                    \n\nখেলতে ক্লিক করুন- https://quizard.live/?qcid=246"
-                self.send_message(db, messenger_type, "resolve", text, user_id=r.user_id)
-                count += 1
+            scored = db.query(UserDailyActivity.user_id, UserDailyActivity.subs_id, UserDailyActivity.max_score)\
+                .filter(UserDailyActivity.day == date.today(), UserDailyActivity.rounds >= 2,
+                        UserDailyActivity.max_score.isnot(None)).all()
+
+            texts = templates.render_many("scenario.daily_score_update", ({"max_score": r.max_score} for r in scored))
+            for r, text in zip(scored, texts):
+                yield Recipient(r.user_id, text, message_key=str(r.subs_id))
 
         # 3. 10 PM Rank Status
         elif scenario_type == MessageScenarioType.EVE_SCORE_RANKING:
             # Scenario 3: Targets users who played today. Shows rank from external leaderboard.
-            leaderboard_urls = {
-                # Quizard
-                "Ramadan Quiz Challenge": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=34",
-                "Sports Quiz Arena": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=75",
-                "Brain Power Quiz": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=149",
-                "Eid Mega Tournament Quiz": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=150",
-                # Wordly
-                "Wordly English": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=67",
-                "Wordly Bangla": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=79",
-                "Spelling Bee": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=134",
-                "Memory Match": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=151",
-                "Sudoku Easy": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=152",
-                "Sudoku Medium": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=153",
-                "SudokuHard": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=154",
-                "Sudoku Expert": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=155",
-                # Arcaderush
-                "Moto Race City": "https://arcaderush.xyz/Leaderboard/GetLeaderboard?gameName=Knife%20Madness&eventId=1001",
-                "Knife Madness": "https://arcaderush.xyz/Leaderboard/GetLeaderboard?gameName=Knife%20Madness&eventId=1002",
-                "20248 Crazy Merge": "https://arcaderush.xyz/Leaderboard/GetLeaderboard?gameName=Knife%20Madness&eventId=1003",
-            }
-            
-            # Helper to fetch rank (Duplicated or should be shared, but keeping inline for safety in replacement)
-            def get_leaderboard_data(url: str):
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                return response.json()
-                # all_mock_data = {
-                #     "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=149": [
-                #         {"User_Rank": 12, "msisdn": "1962401320", "score": 57, "time_taken": 136, "round_number": 1, "date": "2026-01-12", "event_id": 149, "category": None, "win": 1, "name": "", "username": "1962401320", "avatar_id": None, "avatar_img": ""},
-                #     ],
-                #     "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=149": [
-                #          {"User_Rank": 1, "msisdn": "1962401320", "score": 59, "time_taken": 136, "round_number": 1, "date": "2026-01-07", "event_id": 149, "category": None, "win": 1, "name": "", "username": "1962401320", "avatar_id": None, "avatar_img": ""},
-                #     ],
-                #     "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=151": [
-                #         {"User_Rank": 2, "msisdn": "1628975383", "score": 49, "time_taken": 156, "round_number": 1, "date": "2026-01-07", "event_id": 151, "category": None, "win": 1, "name": "Ullah", "username": "1628975383", "avatar_id": 1, "avatar_img": "images/20250417_180333.jpg"},
-                #     ],
-                # }
-                # return all_mock_data.get(url, [])
-
-            today = date.today()
             # Get users who played today and their max score
-            played_stats = db.query(
-                PlayedQuiz.user_id,
-                PlayedQuiz.subs_id,
-                func.max(PlayedQuiz.score).label('max_score')
-            ).filter(func.date(PlayedQuiz.created_at) == today)\
-             .group_by(PlayedQuiz.user_id, PlayedQuiz.subs_id).all()
-
-            for ps in played_stats:
-                user = db.query(User).filter(User.id == ps.user_id).first()
-                sub = db.query(Subscription).filter(Subscription.id == ps.subs_id).first()
-                
-                if not (user and sub and sub.name in leaderboard_urls):
+            played_stats = db.query(UserDailyActivity.user_id, UserDailyActivity.subs_id, UserDailyActivity.max_score)\
+                .filter(UserDailyActivity.day == date.today()).all()
+
+            sub_ids = {ps.subs_id for ps in played_stats}
+            game_names = {
+                sub.id: sub.name
+                for sub in db.query(Subscription.id, Subscription.name).filter(Subscription.id.in_(sub_ids)).all()
+                if sub.name in LEADERBOARD_URLS
+            } if sub_ids else {}
+            candidates = [ps for ps in played_stats if ps.subs_id in game_names]
+
+            users = {}
+            for ids in chunked(list({ps.user_id for ps in candidates}), RESOLVE_CHUNK_SIZE):
+                for user in db.query(User.id, User.username).filter(User.id.in_(ids)).all():
+                    users[user.id] = user
+
+            # Each leaderboard is downloaded once per run, not once per player
+            boards = fetch_leaderboards(self.transport, (LEADERBOARD_URLS[name] for name in game_names.values()), timeout=10)
+
+            for ps in candidates:
+                user = users.get(ps.user_id)
+                game_name = game_names[ps.subs_id]
+                board = boards.get(LEADERBOARD_URLS[game_name])
+                if not (user and board):
                     continue
 
-                game_name = sub.name
-                max_score = ps.max_score
-                url = leaderboard_urls[game_name]
-                
-                try:
-                    data = get_leaderboard_data(url)
-                    rank = None
-                    
-                    if "arcaderush.xyz" in url:
-                        if isinstance(data, list):
-                            for i, entry in enumerate(data):
-                                if entry.get("username") == user.username:
-                                    rank = i + 1
-                                    break
-                    else:
-                        if isinstance(data, list):
-                            for entry in data:
-                                # Match username with msisdn (handling 0 prefix if needed)
-                                msisdn = str(entry.get("msisdn", ""))
-                                if msisdn == user.username or (user.username and msisdn == user.username.lstrip('0')) or (user.username and msisdn.lstrip('0') == user.username):
-                                    rank = entry.get("User_Rank")
-                                    break
-                    
-                    if rank:
-                        text = f"আজকে আপনি {game_name} গেমটি খেলেছেন এবং এখন পর্যন্ত আপনার সর্বোচ্চ স্কোর {max_score}। আপনি লিডারবোর্ডে {rank} তম অবস্থানে রয়েছেন।\
-                            \n\nখেলতে ক্লিক করুন- https://quizard.live/?qcid=246"
-                        self.send_message(db, messenger_type, "resolve", text, user_id=user.id)
-                        count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error in EVE_SCORE_RANKING for {game_name}: {e}")
-                    continue
+                rank = board.rank_for(user.username)
+                if rank:
+                    text = templates.render("scenario.eve_score_ranking", {"game_name": game_name, "max_score": ps.max_score, "rank": rank})
+                    yield Recipient(user.id, text, message_key=str(ps.subs_id))
 
         # 4. Expiry Reminder (last_date = today)
         elif scenario_type == MessageScenarioType.SUBSCRIPTION_EXPIRY:
             # Scenario 4: end_date == today
-            expiring = db.query(UserSubscribed).filter(func.date(UserSubscribed.end_date) == date.today()).all()
-            for es in expiring:
-                sub = db.query(Subscription).filter(Subscription.id == es.subs_id).first()
-                sub_name = sub.name if sub else "সার্ভিস"
-                text = f"আগামী কাল আপনার {sub_name} সাবস্ক্রিপশনটি রিনিউ হবে। কোন রকম ব্যাঘাত ছাড়া নিয়মিত খেলে প্রাইজ পেতে অবশ্যই কাল বিকাশে যথেষ্ট ব্যালান্স রাখুন। ধন্যবাদ।\
-                    \n\nখেলতে ক্লিক করুন- https://quizard.live/?qcid=246"
-                self.send_message(db, messenger_type, "resolve", text, user_id=es.user_id)
-                count += 1
+            today_start, today_end = day_range(date.today())
+            expiring = db.query(UserSubscribed.user_id, UserSubscribed.subs_id)\
+                .filter(UserSubscribed.end_date >= today_start, UserSubscribed.end_date < today_end).all()
+            # One subscription lookup per chunk instead of one per row
+            for chunk in chunked(expiring, RESOLVE_CHUNK_SIZE):
+                sub_ids = {es.subs_id for es in chunk if es.subs_id}
+                names = dict(db.query(Subscription.id, Subscription.name).filter(Subscription.id.in_(sub_ids)).all()) if sub_ids else {}
+                texts = templates.render_many("scenario.subscription_expiry", ({"sub_name": names.get(es.subs_id) or "সার্ভিস"} for es in chunk))
+                for es, text in zip(chunk, texts):
+                    yield Recipient(es.user_id, text, message_key=str(es.subs_id))
 
         # Inactive Subscriber (last_played_date < today - 3 days)
         elif scenario_type == MessageScenarioType.INACTIVE_SUBSCRIBER:
             # Scenario 5: Subscribed but stopped playing for consecutive 3 days.
             three_days_ago = date.today() - timedelta(days=3)
-            # Users with active subscriptions
-            active_subs = db.query(UserSubscribed.user_id).distinct().subquery()
-            # Users who played in last 3 days
-            played_recently = db.query(PlayedQuiz.user_id).filter(func.date(PlayedQuiz.created_at) >= three_days_ago).distinct().subquery()
-            
-            inactive_users = db.query(User).filter(User.id.in_(active_subs)).filter(User.id.notin_(played_recently)).all()
-            for u in inactive_users:
-                text = "আমরা লক্ষ্ করেছি বিগত তিন দিন যাবত আপনি কোন গেম খেলছেন না। নিয়মিত ডেইলি প্রাইজ গুলো জিততে আজ থেকেই আবার খেলা শুরু করুন। আপনার জন্য শুভকামনা।\
-                    \n\nখেলতে ক্লিক করুন- https://quizard.live/?qcid=246"
-                self.send_message(db, messenger_type, "resolve", text, user_id=u.id)
-                count += 1
+            # Users with a subscription who haven't played in the last 3 days
+            has_subscription = exists().where(UserSubscribed.user_id == User.id)
+            played_recently = exists().where(UserDailyActivity.user_id == User.id, UserDailyActivity.day >= three_days_ago)
+
+            text = templates.render("scenario.inactive_subscriber")
+            for batch in user_crud.iter_audience(db, filters=(has_subscription, ~played_recently)):
+                for (user_id,) in batch:
+                    yield Recipient(user_id, text)
 
         # 6. 10 AM Daily Reminder
         elif scenario_type == MessageScenarioType.DAILY_PLAY_REMINDER:
             # Scenario 6: 10 AM reminder to subscribed users who didn't play today.
             today = date.today()
-            active_subs = db.query(UserSubscribed.user_id).distinct().subquery()
-            played_today = db.query(PlayedQuiz.user_id).filter(func.date(PlayedQuiz.created_at) == today).distinct().subquery()
-            
-            to_remind = db.query(User).filter(User.id.in_(active_subs)).filter(User.id.notin_(played_today)).all()
-            for u in to_remind:
-                text = "খেলার সময় চলছে। ডেইলি প্রাইজ পেতে এখনই খেলা শুরু করুন।\n\nখেলতে ক্লিক করুন- https://quizard.live/?qcid=246"
-                self.send_message(db, messenger_type, "resolve", text, user_id=u.id)
-                count += 1
+            has_subscription = exists().where(UserSubscribed.user_id == User.id)
+            played_today = exists().where(UserDailyActivity.user_id == User.id, UserDailyActivity.day == today)
+
+            text = templates.render("scenario.daily_play_reminder")
+            for batch in user_crud.iter_audience(db, filters=(has_subscription, ~played_today)):
+                for (user_id,) in batch:
+                    yield Recipient(user_id, text)
 
         # 7. Daily Winner Congrats
         elif scenario_type == MessageScenarioType.DAILY_WINNER_CONGRATS:
             # Scenario 7: External rank check.
             try:
-                rank_data = requests.get("https://cms.quizard.live/money/weeklyWinnerByUserNData/").json()
-                # Assuming JSON structure has a list of winners
-                # Logic: Find winners with serial_no and link to our users by username/msisdn
-                rank_data = [
-                    {"msisdn": "1681791286", "points": 950, "rank": 1, "serial_no": 1},
-                    {"msisdn": "1962401320", "points": 880, "rank": 2, "serial_no": 2},
-                    {"msisdn": "1910194688", "points": 810, "rank": 3, "serial_no": 3},
-                ]
-
-                
-                #make this loop enumerate from serial_no 1 to 50
-                for item in rank_data:
-                    serial_no = item.get("serial_no")
-
-                    if serial_no > 50:
-                        break
-
-                    username = item.get("msisdn")
-                    if username:
-                        user = db.query(User).filter(User.username == username).first()
-                        if user:
-                            text = "অভিনন্দন! আজকের বিজয়ী তালিকায় থাকার জন্য আপনাকে আন্তরিক অভিনন্দন। পরবর্তী দিন গুলোর জন্য শুভকামনা। "
-                            self.send_message(db, messenger_type, "resolve", text, user_id=user.id)
-                            count += 1
-            except:
-                pass
+                rank_data = self.transport.get("https://cms.quizard.live/money/weeklyWinnerByUserNData/").json()
+            except (requests.RequestException, ValueError) as e:
+                # Runs inside chunk planning: log instead of failing the whole run silently
+                logger.error(f"[Messaging] {scenario_type.value}: could not fetch winners: {e}")
+                return
+            # Assuming JSON structure has a list of winners
+            # Logic: Find winners with serial_no and link to our users by username/msisdn
+            rank_data = [
+                {"msisdn": "1681791286", "points": 950, "rank": 1, "serial_no": 1},
+                {"msisdn": "1962401320", "points": 880, "rank": 2, "serial_no": 2},
+                {"msisdn": "1910194688", "points": 810, "rank": 3, "serial_no": 3},
+            ]
+
+            #make this loop enumerate from serial_no 1 to 50
+            winners = []
+            for item in rank_data:
+                serial_no = item.get("serial_no")
+
+                if serial_no is not None and serial_no > 50:
+                    break
+
+                if item.get("msisdn"):
+                    winners.append(str(item["msisdn"]))
+
+            user_ids = user_crud.resolve_msisdns(db, msisdns=winners)
+            text = templates.render("scenario.daily_winner_congrats")
+            for msisdn in winners:
+                if msisdn in user_ids:
+                    yield Recipient(user_ids[msisdn], text)
 
         # 8. 12 PM Referral Promo
         elif scenario_type == MessageScenarioType.DAILY_REFERRAL_PROMO:
             # Scenario 8: Daily refer sms to all.
-            all_users = db.query(User).all()
-            for u in all_users:
-                text = "আজই রেফার করে জিতে নিন পর পর তিন সপ্তাহে প্রাইজ জেতার সুযোগ!\
-                    \n\nQuizard-https://quizard.live/?page=referral\
-                    \n\nWordly-https://wordly.quizard.live/?page=referral"
-                self.send_message(db, messenger_type, "resolve", text, user_id=u.id)
-                count += 1
+            text = templates.render("scenario.daily_referral_promo")
+            for batch in user_crud.iter_audience(db):
+                for (user_id,) in batch:
+                    yield Recipient(user_id, text)
 
         # 9. 3 Days Continuous Play
         elif scenario_type == MessageScenarioType.WEEKLY_WINNER_LIST_PROMO:
             # Scenario 9: 3 days continuous play.
             three_days_ago = date.today() - timedelta(days=2) # inclusive
-            continuous = db.query(PlayedQuiz.user_id)\
-                .filter(func.date(PlayedQuiz.created_at) >= three_days_ago)\
-                .group_by(PlayedQuiz.user_id, func.date(PlayedQuiz.created_at))\
-                .subquery()
-            
+
             # Count distinct days in last 3 days per user
-            streak_users = db.query(PlayedQuiz.user_id).filter(func.date(PlayedQuiz.created_at) >= three_days_ago)\
-                .group_by(PlayedQuiz.user_id).having(func.count(func.distinct(func.date(PlayedQuiz.created_at))) >= 3).all()
+            streak_users = db.query(UserDailyActivity.user_id).filter(UserDailyActivity.day >= three_days_ago)\
+                .group_by(UserDailyActivity.user_id).having(func.count(func.distinct(UserDailyActivity.day)) >= 3).all()
             
+            text = templates.render("scenario.weekly_winner_list_promo")
             for u in streak_users:
-                text = "আপনি সাপ্তাহিক উইনার হওয়ার তালিকায় রয়েছেন। অভিনন্দন! এভাবেই বেশি বেশি স্কোর করে যান। আপনার জন্য অপেক্ষা করছে সাপ্তাহিক পুরষ্কার!\
-                    \n\nখেলতে ক্লিক করুন- https://quizard.live/?qcid=246"
-                self.send_message(db, messenger_type, "resolve", text, user_id=u.user_id)
-                count += 1
+                yield Recipient(u.user_id, text)
 
         # 10. 10:30 Close-to-Winning Warning
         elif scenario_type == MessageScenarioType.WINNING_POSITION_WARNING:
-            import json
-            
-            leaderboard_urls = {
-                # Quizard
-                "Ramadan Quiz Challenge": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=34",
-                "Sports Quiz Arena": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=75",
-                "Brain Power Quiz": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=149",
-                "Eid Mega Tournament Quiz": "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=150",
-                # Wordly
-                "Wordly English": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=67",
-                "Wordly Bangla": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=79",
-                "Spelling Bee": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=134",
-                "Memory Match": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=151",
-                "Sudoku Easy": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=152",
-                "Sudoku Medium": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=153",
-                "SudokuHard": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=154",
-                "Sudoku Expert": "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=155",
-                # Arcaderush
-                "Moto Race City": "https://arcaderush.xyz/Leaderboard/GetLeaderboard?gameName=Knife%20Madness&eventId=1001",
-                "Knife Madness": "https://arcaderush.xyz/Leaderboard/GetLeaderboard?gameName=Knife%20Madness&eventId=1002",
-                "20248 Crazy Merge": "https://arcaderush.xyz/Leaderboard/GetLeaderboard?gameName=Knife%20Madness&eventId=1003",
-            }
+            # Warning if rank is worse than the daily prize cut-off
+            TARGET_RANK = 50
 
-            # Mock data 
-            # all_mock_data = {
-            #     "https://cms.quizard.live/api/leaderboard/?portal=15&event_id=149": [
-            #          {"User_Rank": 55, "msisdn": "1962401320", "score": 57, "time_taken": 136, "round_number": 1, "date": "2026-01-12", "event_id": 149, "category": None, "win": 1, "name": "", "username": "1962401320", "avatar_id": None, "avatar_img": ""}
-            #     ],
-            #     "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=153": [
-            #         {"User_Rank": 1, "msisdn": "1628975383", "score": 59, "time_taken": 136, "round_number": 1, "date": "2026-01-07", "event_id": 153, "category": None, "win": 1, "name": "", "username": "1628975383", "avatar_id": None, "avatar_img": ""}
-            #     ],
-            #     "https://cms.quizard.live/api/leaderboard/?portal=18&event_id=151": [
-            #         {"User_Rank": 2, "msisdn": "1628975383", "score": 49, "time_taken": 156, "round_number": 1, "date": "2026-01-07", "event_id": 151, "category": None, "win": 1, "name": "Ullah", "username": "1628975383", "avatar_id": 1, "avatar_img": "images/20250417_180333.jpg"}
-            #     ],
-            # }
-
-            # Validating user helper (duplicated for safety)
-            def get_user_by_msisdn(db: Session, msisdn: str) -> Optional[User]:
-                # Try direct match first
-                user = db.query(User).filter(User.username == msisdn).first()
-                if user:
-                    return user
-                # Try with/without leading '0'
-                if msisdn.startswith('0'):
-                    user = db.query(User).filter(User.username == msisdn[1:]).first()
-                else:
-                    user = db.query(User).filter(User.username == '0' + msisdn).first()
-                return user
-            
-            # This logic iterates ALL games in leaderboard_urls? 
-            # Or should it only check for users who have subscriptions/activity?
-            # Existing logic iterated all. We will iterate all urls to check rank.
-            
-            for game_name, url in leaderboard_urls.items():
-                try:
-                    response = requests.get(url, timeout=15)
-                    response.raise_for_status()
-                    leaderboard_data = response.json()
-                    
-                    # leaderboard_data = all_mock_data.get(url, [])
-
-                    players = []
-                    if "arcaderush.xyz" in url:
-                        if isinstance(leaderboard_data, list):
-                            for i, entry in enumerate(leaderboard_data):
-                                if isinstance(entry, dict) and "username" in entry:
-                                    players.append({"username": entry["username"], "rank": i + 1})
-                    else: # Quizard/Wordly
-                        if isinstance(leaderboard_data, list):
-                            for entry in leaderboard_data:
-                                if isinstance(entry, dict) and "msisdn" in entry and "User_Rank" in entry:
-                                    players.append({"username": str(entry["msisdn"]), "rank": entry["User_Rank"]})
-                    
-                    for player in players:
-                        rank = player["rank"]
-                        # Warning if rank is not "good enough"? 
-                        # User text: "আজকের ডেইলি প্রাইজ পাওয়া সম্ভব হবে না... রাত ১১.৫৯ এর মধ্যে “ “ তম অবস্থানের ভিতরে থাকলেই..."
-                        # Currently hardcoded check > 50?
-                        # Assuming threshold is 50 for now based on previous code.
-                        TARGET_RANK = 50
-                        
-                        if rank > TARGET_RANK: # If rank is worse than 50
-                            user = get_user_by_msisdn(db, player["username"])
-                            if user:
-                                text = f"ইতিমধ্যে জেনেছেন {game_name} গেমের লিডারবোর্ডে আপনার অবস্থান {rank} তম। এই অবস্থানে আজকের ডেইলি প্রাইজ পাওয়া সম্ভব হবে না। দয়া করে আরেকটু চেষ্টা করুন। রাত ১১.৫৯ এর মধ্যে {TARGET_RANK} তম অবস্থানের ভিতরে থাকলেই পেয়ে যাবেন ডেইলি প্রাইজ।\
-                                    \n\nখেলতে ক্লিক করুন- https://quizard.live/?qcid=246"
-                                self.send_message(db, messenger_type, "resolve", text, user_id=user.id)
-                                count += 1
-
-                except Exception as e:
-                    logger.error(f"Failed to process leaderboard for WINNING_POSITION_WARNING from {url}: {e}")
-                    continue
+            boards = fetch_leaderboards(self.transport, LEADERBOARD_URLS.values(), timeout=15)
+            behind = [
+                (game_name, username, rank)
+                for game_name, url in LEADERBOARD_URLS.items() if url in boards
+                for username, rank in boards[url].players() if rank > TARGET_RANK
+            ]
+            user_ids = user_crud.resolve_msisdns(db, msisdns=(username for _, username, _ in behind))
+
+            for game_name, username, rank in behind:
+                user_id = user_ids.get(username)
+                if user_id:
+                    text = templates.render("scenario.winning_position_warning", {"game_name": game_name, "rank": rank, "target_rank": TARGET_RANK})
+                    yield Recipient(user_id, text, message_key=game_name)
 
-        return {"status": "success", "processed_count": count}
 
     def process_daily_check(self, db: Session, user_id: int) -> dict:
         """
@@ -627,28 +603,14 @@ class MessagingService:
         # Note: Accessing relationship directly. If lazy loading issue, might need eager load in CRUD.
         current_score = sum([q.score for q in user.quizzes]) if user.quizzes else 0
         
-        # 2. Define Winning Threshold
-        WINNING_THRESHOLD = 50 
-        
-        # 3. Calculate Max Possible Remaining Score
-        TOTAL_QUIZZES_ALLOWED = 5
-        MAX_SCORE_PER_QUIZ = 10
-        
-        quizzes_taken = len(user.quizzes)
-        quizzes_remaining = TOTAL_QUIZZES_ALLOWED - quizzes_taken
-        
-        if quizzes_remaining < 0:
-            quizzes_remaining = 0
-            
-        max_possible_remaining_points = quizzes_remaining * MAX_SCORE_PER_QUIZ
-        
-        total_potential_score = current_score + max_possible_remaining_points
+        # 2. Max possible score with the remaining quizzes
+        total_potential_score = potential_score(current_score, len(user.quizzes))
         
         if total_potential_score < WINNING_THRESHOLD:
             logger.info(f"User {user.username} cannot win (Potential: {total_potential_score} < Threshold: {WINNING_THRESHOLD}). Skipping notification.")
             return {"status": "skipped", "reason": "Impossible to win"}
             
-        # 4. If possible to win, send notification
+        # 3. If possible to win, send notification
         # Check user's preferred messenger
         messenger_type = MessengerType.MAIL # Default
         receiver = user.email
@@ -681,7 +643,7 @@ class MessagingService:
             messenger_type = MessengerType.DISCORD
             receiver = "lookup_in_service" # send_message will resolve this if user_id is passed
             
-        message_text = f"You are doing great! You have {current_score} points. You need {WINNING_THRESHOLD - current_score} more to win!"
+        message_text = templates.render("daily_check.winning_potential", {"current_score": current_score, "points_needed": WINNING_THRESHOLD - current_score})
         
         sent = self.send_message(db, messenger_type, receiver, message_text, user_id=user.id)
         
@@ -690,4 +652,45 @@ class MessagingService:
         else:
              return {"status": "error", "message": "Failed to send notification"}
 
+    def process_daily_check_bulk(self, db: Session, chunk_size: int = RESOLVE_CHUNK_SIZE) -> dict:
+        """
+        process_daily_check for every user at once: one aggregate query for
+        score totals, a vectorized winning-potential pass, then channel
+        selection and delivery per chunk of eligible users only.
+        """
+        user_ids, scores, counts = load_score_totals(db)
+        eligible = winning_potential_mask(scores, counts)
+        template = templates.get("daily_check.winning_potential")
+
+        queued: Dict[str, int] = {}
+        unreachable = 0
+        eligible_ids = user_ids[eligible].tolist()
+        eligible_scores = scores[eligible].tolist()
+        for chunk in chunked(zip(eligible_ids, eligible_scores), chunk_size):
+            contacts = load_contacts(db, (user_id for user_id, _ in chunk))
+            by_channel: Dict[MessengerType, List[Recipient]] = {}
+            for user_id, score in chunk:
+                messenger_type = pick_channel(contacts.get(user_id))
+                if messenger_type is None:
+                    unreachable += 1
+                    continue
+                text = template.render({"current_score": score, "points_needed": WINNING_THRESHOLD - score})
+                by_channel.setdefault(messenger_type, []).append(Recipient(user_id, text))
+
+            for messenger_type, recipients in by_channel.items():
+                sent = self._deliver(db, messenger_type, recipients, source="daily_check")
+                queued[messenger_type.value] = queued.get(messenger_type.value, 0) + sent
+
+        result = {
+            "status": "success",
+            "checked_count": len(user_ids),
+            "eligible_count": len(eligible_ids),
+            "skipped_count": len(user_ids) - len(eligible_ids),
+            "unreachable_count": unreachable,
+            "processed_count": sum(queued.values()),
+            "by_messenger": queued,
+        }
+        logger.info(f"[Messaging] Bulk daily check: {result}")
+        return result
+
 messaging_service = MessagingService()
@@ -1,7 +1,23 @@
 
 import abc
+from typing import Optional
+
+from ..transport import AsyncHttpTransport, HttpTransport, get_default_transport
 
 class MessagingStrategy(abc.ABC):
+    def __init__(self, transport: Optional[HttpTransport] = None):
+        self.transport = transport or get_default_transport()
+
     @abc.abstractmethod
     def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
         pass
+
+class AsyncMessagingStrategy(abc.ABC):
+    """Asyncio variant of MessagingStrategy, driven by the async dispatcher."""
+
+    def __init__(self, transport: AsyncHttpTransport):
+        self.transport = transport
+
+    @abc.abstractmethod
+    async def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
+        pass
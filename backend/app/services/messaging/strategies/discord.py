@@ -1,65 +1,169 @@
 
-import requests
+from typing import Optional
 from app.core.config import settings
-from .base import MessagingStrategy
+from .base import MessagingStrategy, AsyncMessagingStrategy
+from ..discord_channels import dm_channel_cache
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+
+def discord_headers() -> Optional[dict]:
+    """Bot auth headers, or None when running without a token."""
+    if not settings.DISCORD_BOT_TOKEN:
+        logger.warning("[Discord] Token not set, skipping API call.")
+        return None
+
+    return {
+        "Authorization": f"Bot {settings.DISCORD_BOT_TOKEN}",
+        "Content-Type": "application/json",
+        "User-Agent": "DiscordBot (https://purplepatch.notifications, 1.0)"
+    }
+
+
+def discord_message_payload(content: str, link: str = None) -> dict:
+    full_text = content
+    if link:
+        full_text += f"\n\nLink: {link}"
+    return {"content": full_text}
+
+
+# Discord answers these for a DM channel that no longer works for us
+STALE_CHANNEL_STATUSES = (403, 404)
+
+
+def wants_dm(extra_data: Optional[dict]) -> bool:
+    # If extra_data has user_id and 'to' seems invalid or we want to ensure DM existence
+    return bool(extra_data and extra_data.get('create_dm') and extra_data.get('user_id'))
+
+
+def known_channel(to: str, extra_data: Optional[dict]) -> Optional[str]:
+    """Cached DM channel for the user, else `to` unless the caller asked for a fresh DM."""
+    discord_user_id = (extra_data or {}).get('user_id')
+    channel_id = dm_channel_cache.get(discord_user_id)
+    if channel_id is None and not wants_dm(extra_data):
+        channel_id = to
+    return channel_id
+
+
+def remember_dm_channel(extra_data: dict, channel_id: str) -> None:
+    dm_channel_cache.put(extra_data['user_id'], channel_id, messenger_id=extra_data.get('messenger_id'))
+    logger.info(f"[Discord] Created/Found DM channel {channel_id} for user {extra_data['user_id']}")
+
+
 class DiscordStrategy(MessagingStrategy):
+    def _open_dm(self, headers: dict, extra_data: dict) -> Optional[str]:
+        create_dm_url = f"{settings.DISCORD_API_BASE_URL}/users/@me/channels"
+        dm_payload = {"recipient_id": extra_data['user_id']}
+        try:
+            dm_resp = self.transport.post(create_dm_url, headers=headers, json=dm_payload, timeout=5)
+            if dm_resp.status_code in [200, 201]:
+                channel_id = dm_resp.json().get('id')
+                remember_dm_channel(extra_data, channel_id)
+                return channel_id
+            logger.error(f"[Discord] Failed to create DM: {dm_resp.text}")
+        except Exception as e:
+            logger.error(f"[Discord] Exception creating DM: {e}")
+        return None
+
+    def _post_message(self, headers: dict, channel_id: str, payload: dict):
+        url = f"{settings.DISCORD_API_BASE_URL}/channels/{channel_id}/messages"
+        return self.transport.post(url, headers=headers, json=payload, timeout=10)
+
     def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
-        # 'to' is expected to be the dm_channel_id OR user_id if we want to create DM
-        # But per logic in Service, we should pass the right ID. 
-        # If 'to' looks like a channel ID (snowflake), we send.
-        
+        # 'to' is the stored dm_channel_id when we have one. extra_data['user_id']
+        # lets us open (or reopen) the DM channel; opened channels are cached
+        # and written back to Messenger.discord by the service.
+
         logger.info(f"[Discord] Sending to {to}")
-        
-        if not settings.DISCORD_BOT_TOKEN:
-            logger.warning("[Discord] Token not set, skipping API call.")
+
+        headers = discord_headers()
+        if headers is None:
             return True
-        
-        headers = {
-            "Authorization": f"Bot {settings.DISCORD_BOT_TOKEN}",
-            "Content-Type": "application/json",
-            "User-Agent": "DiscordBot (https://purplepatch.notifications, 1.0)"
-        }
-        
-        # Logic: 
-        # 1. Try sending to 'to' assuming it is a channel_id
-        # 2. If failure (or if we know it's a user_id), try creating a DM channel first.
-        # Use extra_data to hint if 'to' is user_id or channel_id? 
-        # For simplicity: Assume 'to' is channel_id. If missing, we might use extra_data['user_id'] to create it.
-        
-        target_channel_id = to
-        
-        # If extra_data has user_id and 'to' seems invalid or we want to ensure DM existence
-        if extra_data and extra_data.get('create_dm') and extra_data.get('user_id'):
-            # Create DM Channel
-            create_dm_url = "https://discord.com/api/v10/users/@me/channels"
-            dm_payload = {"recipient_id": extra_data['user_id']}
-            try:
-                dm_resp = requests.post(create_dm_url, headers=headers, json=dm_payload, timeout=5)
-                if dm_resp.status_code in [200, 201]:
-                    target_channel_id = dm_resp.json().get('id')
-                    logger.info(f"[Discord] Created/Found DM channel {target_channel_id} for user {extra_data['user_id']}")
-                else:
-                    logger.error(f"[Discord] Failed to create DM: {dm_resp.text}")
+
+        target_channel_id = known_channel(to, extra_data)
+        opened = False
+        if target_channel_id is None:
+            if not wants_dm(extra_data):
+                logger.error("[Discord] No channel or user id to send to")
+                return False
+            target_channel_id = self._open_dm(headers, extra_data)
+            opened = True
+            if target_channel_id is None:
+                return False
+
+        payload = discord_message_payload(content, link)
+
+        try:
+            response = self._post_message(headers, target_channel_id, payload)
+            if response.status_code in STALE_CHANNEL_STATUSES and not opened and (extra_data or {}).get('user_id'):
+                logger.warning(f"[Discord] Channel {target_channel_id} rejected ({response.status_code}), reopening DM")
+                dm_channel_cache.invalidate(extra_data['user_id'])
+                target_channel_id = self._open_dm(headers, extra_data)
+                if target_channel_id is None:
                     return False
-            except Exception as e:
-                logger.error(f"[Discord] Exception creating DM: {e}")
+                response = self._post_message(headers, target_channel_id, payload)
+
+            if response.status_code in [200, 201]:
+                logger.info(f"[Discord] Successfully sent to channel {target_channel_id}")
+                return True
+            else:
+                logger.error(f"[Discord] Failed to send: {response.text}")
                 return False
+        except Exception as e:
+            logger.error(f"[Discord] Exception: {e}")
+            return False
 
-        full_text = content
-        if link:
-            full_text += f"\n\nLink: {link}"
-            
-        url = f"https://discord.com/api/v10/channels/{target_channel_id}/messages"
-        payload = {
-            "content": full_text
-        }
-        
+
+class AsyncDiscordStrategy(AsyncMessagingStrategy):
+    async def _open_dm(self, headers: dict, extra_data: dict) -> Optional[str]:
+        create_dm_url = f"{settings.DISCORD_API_BASE_URL}/users/@me/channels"
+        dm_payload = {"recipient_id": extra_data['user_id']}
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
+            dm_resp = await self.transport.post(create_dm_url, headers=headers, json=dm_payload, timeout=5)
+            if dm_resp.status_code in [200, 201]:
+                channel_id = dm_resp.json().get('id')
+                remember_dm_channel(extra_data, channel_id)
+                return channel_id
+            logger.error(f"[Discord] Failed to create DM: {dm_resp.text}")
+        except Exception as e:
+            logger.error(f"[Discord] Exception creating DM: {e}")
+        return None
+
+    async def _post_message(self, headers: dict, channel_id: str, payload: dict):
+        url = f"{settings.DISCORD_API_BASE_URL}/channels/{channel_id}/messages"
+        return await self.transport.post(url, headers=headers, json=payload, timeout=10)
+
+    async def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
+        logger.info(f"[Discord] Sending to {to}")
+
+        headers = discord_headers()
+        if headers is None:
+            return True
+
+        target_channel_id = known_channel(to, extra_data)
+        opened = False
+        if target_channel_id is None:
+            if not wants_dm(extra_data):
+                logger.error("[Discord] No channel or user id to send to")
+                return False
+            target_channel_id = await self._open_dm(headers, extra_data)
+            opened = True
+            if target_channel_id is None:
+                return False
+
+        payload = discord_message_payload(content, link)
+
+        try:
+            response = await self._post_message(headers, target_channel_id, payload)
+            if response.status_code in STALE_CHANNEL_STATUSES and not opened and (extra_data or {}).get('user_id'):
+                logger.warning(f"[Discord] Channel {target_channel_id} rejected ({response.status_code}), reopening DM")
+                dm_channel_cache.invalidate(extra_data['user_id'])
+                target_channel_id = await self._open_dm(headers, extra_data)
+                if target_channel_id is None:
+                    return False
+                response = await self._post_message(headers, target_channel_id, payload)
+
             if response.status_code in [200, 201]:
                 logger.info(f"[Discord] Successfully sent to channel {target_channel_id}")
                 return True
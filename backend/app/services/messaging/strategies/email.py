@@ -1,50 +1,81 @@
 
-import requests
 import json
 import base64
+from typing import Optional, Tuple
 from app.core.config import settings
-from .base import MessagingStrategy
+from .base import MessagingStrategy, AsyncMessagingStrategy
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+
+def build_email_request(to: str, content: str, link: str = None) -> Optional[Tuple[str, dict, dict]]:
+    """Build (url, headers, payload) for the Gmail API, or None when running without a token."""
+    if not settings.GMAIL_ACCESS_TOKEN:
+        logger.warning("[Email] GMAIL_ACCESS_TOKEN not set, skipping API call.")
+        return None
+
+    url = f"{settings.GMAIL_API_BASE_URL}/users/me/messages/send"
+    headers = {
+        "Authorization": f"Bearer {settings.GMAIL_ACCESS_TOKEN}",
+        "Content-Type": "application/json"
+    }
+
+    # Prepare RFC2822 email
+    # Subject: Notification from PurplePatch
+    # To: {to}
+    # Body: {content} \n Link: {link}
+
+    message_body = f"Subject: Notification from PurplePatch\nTo: {to}\n\n{content}"
+    if link:
+        message_body += f"\n\nLink: {link}"
+
+    encoded_message = base64.urlsafe_b64encode(message_body.encode("utf-8")).decode("utf-8")
+
+    payload = {
+        "raw": encoded_message
+    }
+    return url, headers, payload
+
+
+def handle_email_response(to: str, status_code: int, text: str) -> bool:
+    if status_code == 200:
+        logger.info(f"[Email] Successfully sent to {to}")
+        return True
+    else:
+        logger.error(f"[Email] Failed to send: {text}")
+        return False
+
+
 class EmailStrategy(MessagingStrategy):
     def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
         logger.info(f"[Email] Sending to {to}")
-        
-        if not settings.GMAIL_ACCESS_TOKEN:
-            logger.warning("[Email] GMAIL_ACCESS_TOKEN not set, skipping API call.")
+
+        request = build_email_request(to, content, link)
+        if request is None:
+            return True # Pretend success for dev
+        url, headers, payload = request
+
+        try:
+            response = self.transport.post(url, headers=headers, json=payload, timeout=10)
+            return handle_email_response(to, response.status_code, response.text)
+        except Exception as e:
+            logger.error(f"[Email] Exception: {e}")
+            return False
+
+
+class AsyncEmailStrategy(AsyncMessagingStrategy):
+    async def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
+        logger.info(f"[Email] Sending to {to}")
+
+        request = build_email_request(to, content, link)
+        if request is None:
             return True # Pretend success for dev
+        url, headers, payload = request
 
-        url = "https://gmail.googleapis.com/gmail/v1/users/me/messages/send"
-        headers = {
-            "Authorization": f"Bearer {settings.GMAIL_ACCESS_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
-        # Prepare RFC2822 email
-        # Subject: Notification from PurplePatch
-        # To: {to}
-        # Body: {content} \n Link: {link}
-        
-        message_body = f"Subject: Notification from PurplePatch\nTo: {to}\n\n{content}"
-        if link:
-            message_body += f"\n\nLink: {link}"
-            
-        encoded_message = base64.urlsafe_b64encode(message_body.encode("utf-8")).decode("utf-8")
-        
-        payload = {
-            "raw": encoded_message
-        }
-        
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
-            if response.status_code == 200:
-                logger.info(f"[Email] Successfully sent to {to}")
-                return True
-            else:
-                logger.error(f"[Email] Failed to send: {response.text}")
-                return False
+            response = await self.transport.post(url, headers=headers, json=payload, timeout=10)
+            return handle_email_response(to, response.status_code, response.text)
         except Exception as e:
             logger.error(f"[Email] Exception: {e}")
             return False
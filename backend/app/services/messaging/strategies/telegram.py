@@ -3,15 +3,63 @@ Enhanced Telegram Strategy - Uses stored chat_id for sending
 Part of the Messaging Strategy Pattern
 """
 
+import httpx
 import requests
 from typing import Optional
 from app.core.config import settings
-from .base import MessagingStrategy
+from .base import MessagingStrategy, AsyncMessagingStrategy
+from ..transport import HttpTransport
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+class TelegramRetryAfter(Exception):
+    """Raised by AsyncTelegramStrategy on HTTP 429 so the scheduler can requeue the message."""
+
+    def __init__(self, chat_id: str, retry_after: float):
+        super().__init__(f"Telegram rate limited chat {chat_id}, retry after {retry_after}s")
+        self.chat_id = chat_id
+        self.retry_after = retry_after
+
+
+def is_dummy_token(token: Optional[str]) -> bool:
+    return not token or token == "dummy_telegram_bot_token"
+
+
+def telegram_api_url(method: str) -> str:
+    return f"{settings.TELEGRAM_API_BASE_URL}/bot{settings.TELEGRAM_BOT_TOKEN}/{method}"
+
+
+def build_send_message_payload(chat_id: str, content: str, link: str = None) -> dict:
+    # Construct message text
+    full_text = content
+    if link:
+        full_text += f"\n\n🔗 {link}"
+    
+    return {
+        "chat_id": str(chat_id),  # Ensure it's a string
+        "text": full_text,
+        "parse_mode": "HTML"  # Support basic formatting
+    }
+
+
+def parse_retry_after(error_data: dict, default: float = 1.0) -> float:
+    # 429 bodies look like {"ok": false, "error_code": 429, "parameters": {"retry_after": 5}}
+    try:
+        return float(error_data.get("parameters", {}).get("retry_after", default))
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+def resolve_chat_id(to: str, extra_data: dict = None) -> Optional[str]:
+    # Extract chat_id from 'to' parameter or extra_data
+    chat_id = to
+    if extra_data and 'chat_id' in extra_data:
+        chat_id = extra_data['chat_id']
+    return chat_id
+
+
 class TelegramStrategy(MessagingStrategy):
     """
     Telegram message sender implementation
@@ -33,11 +81,7 @@ class TelegramStrategy(MessagingStrategy):
         Returns:
             True if successful, False otherwise
         """
-        # Extract chat_id from 'to' parameter or extra_data
-        chat_id = to
-        
-        if extra_data and 'chat_id' in extra_data:
-            chat_id = extra_data['chat_id']
+        chat_id = resolve_chat_id(to, extra_data)
         
         if not chat_id:
             logger.error("[Telegram] No chat_id provided")
@@ -46,37 +90,71 @@ class TelegramStrategy(MessagingStrategy):
         logger.info(f"[Telegram] Sending to chat_id: {chat_id}")
         
         # Check if token is configured
-        if not settings.TELEGRAM_BOT_TOKEN or settings.TELEGRAM_BOT_TOKEN == "dummy_telegram_bot_token":
+        if is_dummy_token(settings.TELEGRAM_BOT_TOKEN):
             logger.warning(f"[Telegram] DUMMY MODE - Would send to {chat_id}: {content}")
             return True
             
-        # Build API URL
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
+        url = telegram_api_url("sendMessage")
+        payload = build_send_message_payload(chat_id, content, link)
+        
+        try:
+            response = self.transport.post(url, json=payload, timeout=10)
+            
+            if response.status_code == 200:
+                logger.info(f"[Telegram] Successfully sent to {chat_id}")
+                return True
+            else:
+                error_data = response.json()
+                logger.error(f"[Telegram] Failed to send: {error_data}")
+                return False
+                
+        except requests.RequestException as e:
+            logger.error(f"[Telegram] Request exception: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"[Telegram] Unexpected error: {e}")
+            return False
+
+
+class AsyncTelegramStrategy(AsyncMessagingStrategy):
+    """
+    Asyncio Telegram sender used by the dispatcher for bulk sends.
+    Raises TelegramRetryAfter on 429; wrap it in TelegramSendScheduler
+    to respect the Bot API limits and requeue throttled messages.
+    """
+    
+    async def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
+        chat_id = resolve_chat_id(to, extra_data)
         
-        # Construct message text
-        full_text = content
-        if link:
-            full_text += f"\n\n🔗 {link}"
+        if not chat_id:
+            logger.error("[Telegram] No chat_id provided")
+            return False
+            
+        logger.info(f"[Telegram] Sending to chat_id: {chat_id}")
         
-        # Prepare payload
-        payload = {
-            "chat_id": str(chat_id),  # Ensure it's a string
-            "text": full_text,
-            "parse_mode": "HTML"  # Support basic formatting
-        }
+        if is_dummy_token(settings.TELEGRAM_BOT_TOKEN):
+            logger.warning(f"[Telegram] DUMMY MODE - Would send to {chat_id}: {content}")
+            return True
+            
+        url = telegram_api_url("sendMessage")
+        payload = build_send_message_payload(chat_id, content, link)
         
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = await self.transport.post(url, json=payload, timeout=10)
             
             if response.status_code == 200:
                 logger.info(f"[Telegram] Successfully sent to {chat_id}")
                 return True
+            elif response.status_code == 429:
+                raise TelegramRetryAfter(chat_id, parse_retry_after(response.json()))
             else:
                 error_data = response.json()
                 logger.error(f"[Telegram] Failed to send: {error_data}")
                 return False
                 
-        except requests.RequestException as e:
+        except TelegramRetryAfter:
+            raise
+        except httpx.HTTPError as e:
             logger.error(f"[Telegram] Request exception: {e}")
             return False
         except Exception as e:
@@ -92,10 +170,11 @@ class TelegramAdapter:
     additional convenience methods for common operations.
     """
     
-    def __init__(self):
-        self.strategy = TelegramStrategy()
+    def __init__(self, transport: Optional[HttpTransport] = None):
+        self.strategy = TelegramStrategy(transport)
+        self.transport = self.strategy.transport
         self.bot_token = settings.TELEGRAM_BOT_TOKEN
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.base_url = f"{settings.TELEGRAM_API_BASE_URL}/bot{self.bot_token}"
     
     def send_notification(self, chat_id: int, message: str, link: Optional[str] = None) -> bool:
         """
@@ -162,7 +241,7 @@ class TelegramAdapter:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.transport.post(url, json=payload, timeout=10)
             return response.status_code == 200
         except Exception as e:
             logger.error(f"[Telegram Adapter] Failed to send buttons: {e}")
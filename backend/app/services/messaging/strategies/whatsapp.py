@@ -1,46 +1,77 @@
 
-import requests
+from typing import Optional, Tuple
 from app.core.config import settings
-from .base import MessagingStrategy
+from .base import MessagingStrategy, AsyncMessagingStrategy
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+
+def build_whatsapp_request(to: str, content: str, link: str = None) -> Optional[Tuple[str, dict, dict]]:
+    """Build (url, headers, payload) for the WhatsApp Cloud API, or None when credentials are missing."""
+    if not settings.WHATSAPP_ACCESS_TOKEN or not settings.WHATSAPP_PHONE_NUMBER_ID:
+        logger.warning("[Whatsapp] Credentials not set, skipping API call.")
+        return None
+
+    url = f"{settings.WHATSAPP_API_BASE_URL}/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
+    headers = {
+        "Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}",
+        "Content-Type": "application/json"
+    }
+
+    full_text = content
+    if link:
+        full_text += f"\n\nLink: {link}"
+
+    payload = {
+        "messaging_product": "whatsapp",
+        "to": to,
+        "type": "text",
+        "text": {
+            "body": full_text
+        }
+    }
+    return url, headers, payload
+
+
+def handle_whatsapp_response(to: str, status_code: int, text: str) -> bool:
+    if status_code in [200, 201]:
+        logger.info(f"[Whatsapp] Successfully sent to {to}")
+        return True
+    else:
+        logger.error(f"[Whatsapp] Failed to send: {text}")
+        return False
+
+
 class WhatsappStrategy(MessagingStrategy):
     def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
         logger.info(f"[Whatsapp] Sending to {to}")
-        
-        if not settings.WHATSAPP_ACCESS_TOKEN or not settings.WHATSAPP_PHONE_NUMBER_ID:
-            logger.warning("[Whatsapp] Credentials not set, skipping API call.")
+
+        request = build_whatsapp_request(to, content, link)
+        if request is None:
             return True
+        url, headers, payload = request
+
+        try:
+            response = self.transport.post(url, headers=headers, json=payload, timeout=10)
+            return handle_whatsapp_response(to, response.status_code, response.text)
+        except Exception as e:
+            logger.error(f"[Whatsapp] Exception: {e}")
+            return False
+
+
+class AsyncWhatsappStrategy(AsyncMessagingStrategy):
+    async def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
+        logger.info(f"[Whatsapp] Sending to {to}")
+
+        request = build_whatsapp_request(to, content, link)
+        if request is None:
+            return True
+        url, headers, payload = request
 
-        url = f"https://graph.facebook.com/v20.0/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
-        headers = {
-            "Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
-        full_text = content
-        if link:
-            full_text += f"\n\nLink: {link}"
-            
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": to,
-            "type": "text",
-            "text": {
-                "body": full_text
-            }
-        }
-        
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
-            if response.status_code in [200, 201]:
-                logger.info(f"[Whatsapp] Successfully sent to {to}")
-                return True
-            else:
-                logger.error(f"[Whatsapp] Failed to send: {response.text}")
-                return False
+            response = await self.transport.post(url, headers=headers, json=payload, timeout=10)
+            return handle_whatsapp_response(to, response.status_code, response.text)
         except Exception as e:
             logger.error(f"[Whatsapp] Exception: {e}")
             return False
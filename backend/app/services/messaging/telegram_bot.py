@@ -13,6 +13,7 @@ from app.utils.logger import get_logger
 from app.crud.user import user as user_crud
 from app.crud.messenger import messenger as messenger_crud
 from app.database.session import SessionLocal
+from .transport import get_default_transport
 
 logger = get_logger(__name__)
 
@@ -27,8 +28,9 @@ class TelegramBotService:
     
     def __init__(self):
         self.bot_token = settings.TELEGRAM_BOT_TOKEN
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.base_url = f"{settings.TELEGRAM_API_BASE_URL}/bot{self.bot_token}"
         self.last_update_id = 0
+        self.transport = get_default_transport()
         
     def get_updates(self, offset: Optional[int] = None, timeout: int = 30) -> List[Dict[str, Any]]:
         """
@@ -55,7 +57,7 @@ class TelegramBotService:
             params["offset"] = offset
             
         try:
-            response = requests.get(url, params=params, timeout=timeout + 5)
+            response = self.transport.get(url, params=params, timeout=timeout + 5)
             response.raise_for_status()
             
             data = response.json()
@@ -253,7 +255,7 @@ class TelegramBotService:
             payload["parse_mode"] = parse_mode
             
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.transport.post(url, json=payload, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -276,7 +278,7 @@ class TelegramBotService:
         url = f"{self.base_url}/getMe"
         
         try:
-            response = requests.get(url, timeout=10)
+            response = self.transport.get(url, timeout=10)
             response.raise_for_status()
             
             data = response.json()
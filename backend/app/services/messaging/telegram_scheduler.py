@@ -0,0 +1,281 @@
+"""
+Rate-limit aware scheduler in front of AsyncTelegramStrategy.
+
+Telegram allows roughly 30 messages/s per bot and 1 message/s per chat.
+Every send first reserves a slot in the chat's bucket, then one in the
+global bucket, and sleeps until both are available. A 429 pauses the global
+bucket and the chat for `parameters.retry_after` seconds and the message is
+requeued behind them instead of being reported as failed.
+
+The 30/s limit is bot-wide, while scenario chunks are sent by many Celery
+worker processes at once. The global bucket therefore lives in Redis
+(RedisTokenBucket, one atomic script per reservation) and is shared by every
+process and run. With TELEGRAM_RATE_BACKEND=memory, or while Redis is
+unreachable, each process uses a local bucket at TELEGRAM_GLOBAL_RATE /
+TELEGRAM_RATE_PROCESSES. Per-chat slots stay in-process: a chat appears in
+only one chunk of a run.
+
+    scheduler = TelegramSendScheduler(transport)
+    ok = await scheduler.send(chat_id, text)
+    scheduler.stats()  # sent / failed / retried / throughput
+"""
+
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar, Union
+
+import redis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+from .strategies.base import AsyncMessagingStrategy
+from .strategies.telegram import AsyncTelegramStrategy, TelegramRetryAfter, is_dummy_token, resolve_chat_id
+from .transport import AsyncHttpTransport
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Per-chat slots are pruned once this many chats are tracked
+MAX_TRACKED_CHATS = 10000
+
+# Seconds the local bucket stands in after the shared one fails
+REDIS_RETRY_SECONDS = 5.0
+
+
+class TokenBucket:
+    """
+    Token bucket with `rate` tokens/s and a burst of `capacity`.
+    `reserve()` takes a token immediately and returns how long the caller
+    must wait before using it, so concurrent callers queue up in order
+    without holding a lock across the sleep.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds` (used on 429)."""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            # Repeated 429s extend the pause to the latest retry_after, they don't stack
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+# TokenBucket.reserve()/pause() on a Redis hash, timed by the Redis clock so
+# every process agrees. ARGV: rate, capacity, pause seconds (0 = reserve one
+# token). Returns the wait in seconds as a string (Lua numbers become integers).
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local pause = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+if now > updated then
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    updated = now
+end
+if pause > 0 then
+    tokens = math.min(tokens, -pause * rate)
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(updated))
+redis.call('EXPIRE', KEYS[1], 3600)
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+
+class RedisTokenBucket:
+    """
+    TokenBucket shared by every process through Redis. Falls back to the
+    local `fallback` bucket while Redis is unreachable, so sends slow down to
+    the per-process share instead of failing.
+    """
+
+    def __init__(self, client: "redis.Redis", key: str, rate: float, fallback: TokenBucket, capacity: Optional[float] = None):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.fallback = fallback
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        # After a Redis error the local bucket is used for a while, so an
+        # outage doesn't add a connect timeout to every send
+        self._down_until = 0.0
+
+    def _call(self, pause: float) -> Optional[float]:
+        """Wait in seconds from the shared bucket, or None if Redis is (recently) unreachable."""
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return float(self._script(keys=[self.key], args=[self.rate, self.capacity, pause]))
+        except redis.RedisError as e:
+            logger.warning(f"[Telegram] Shared rate limit unavailable for {REDIS_RETRY_SECONDS}s, using the local bucket: {e}")
+            self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+            return None
+
+    def reserve(self) -> float:
+        delay = self._call(0)
+        return self.fallback.reserve() if delay is None else delay
+
+    def pause(self, seconds: float) -> None:
+        self._call(seconds)
+        self.fallback.pause(seconds)
+
+
+GlobalBucket = Union[TokenBucket, RedisTokenBucket]
+
+_global_bucket: Optional[GlobalBucket] = None
+_global_bucket_lock = threading.Lock()
+
+
+def global_bucket() -> GlobalBucket:
+    """The bot-wide bucket of this process, built once from settings and shared by every run."""
+    global _global_bucket
+    with _global_bucket_lock:
+        if _global_bucket is None:
+            local = TokenBucket(settings.TELEGRAM_GLOBAL_RATE / max(settings.TELEGRAM_RATE_PROCESSES, 1))
+            if settings.TELEGRAM_RATE_BACKEND == "memory":
+                _global_bucket = local
+            else:
+                client = redis.Redis.from_url(
+                    settings.TELEGRAM_RATE_REDIS_URL, socket_connect_timeout=1, socket_timeout=1, retry=Retry(NoBackoff(), 0),
+                )
+                # Keyed by the bot id (the token's prefix), never the token itself
+                bot_id = settings.TELEGRAM_BOT_TOKEN.split(":", 1)[0] or "default"
+                _global_bucket = RedisTokenBucket(client, f"{settings.TELEGRAM_RATE_KEY_PREFIX}:{bot_id}", settings.TELEGRAM_GLOBAL_RATE, local)
+        return _global_bucket
+
+
+class TelegramSendScheduler(AsyncMessagingStrategy):
+    def __init__(
+        self,
+        transport: AsyncHttpTransport,
+        strategy: Optional[AsyncMessagingStrategy] = None,
+        global_rate: Optional[float] = None,
+        per_chat_rate: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        super().__init__(transport)
+        self.strategy = strategy or AsyncTelegramStrategy(transport)
+        # An explicit rate gets a private bucket (tests, benchmarks); normal
+        # runs share the process-wide / Redis one
+        self.global_bucket: GlobalBucket = TokenBucket(global_rate) if global_rate else global_bucket()
+        self.chat_interval = 1.0 / (per_chat_rate or settings.TELEGRAM_PER_CHAT_RATE)
+        self.max_attempts = max_attempts or settings.TELEGRAM_MAX_SEND_ATTEMPTS
+
+        # chat_id -> earliest monotonic time the next message to that chat may go out
+        self._chat_next_slot: Dict[str, float] = {}
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._first_send: Optional[float] = None
+        self._last_send: Optional[float] = None
+
+    def _reserve_chat(self, chat_id: str) -> float:
+        now = time.monotonic()
+        if len(self._chat_next_slot) >= MAX_TRACKED_CHATS:
+            self._chat_next_slot = {k: v for k, v in self._chat_next_slot.items() if v > now}
+
+        slot = max(now, self._chat_next_slot.get(chat_id, now))
+        self._chat_next_slot[chat_id] = slot + self.chat_interval
+        return slot - now
+
+    def _pause_chat(self, chat_id: str, seconds: float) -> None:
+        resume_at = time.monotonic() + seconds
+        self._chat_next_slot[chat_id] = max(self._chat_next_slot.get(chat_id, 0.0), resume_at)
+
+    async def _call_global(self, fn: Callable[..., T], *args) -> T:
+        """Run a global bucket method; only the Redis bucket is a round trip worth moving off the event loop."""
+        if isinstance(self.global_bucket, RedisTokenBucket):
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def _acquire(self, chat_id: str) -> None:
+        # Wait for the chat first so a slow chat doesn't hold a global token
+        delay = self._reserve_chat(chat_id)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        delay = await self._call_global(self.global_bucket.reserve)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def send(self, to: str, content: str, link: str = None, extra_data: dict = None) -> bool:
+        chat_id = resolve_chat_id(to, extra_data)
+        if is_dummy_token(settings.TELEGRAM_BOT_TOKEN):
+            # Dummy mode never calls the API, so there is nothing to throttle
+            return await self.strategy.send(to, content, link, extra_data=extra_data)
+        if not chat_id:
+            # Nothing will be sent; don't queue it behind the rate limits
+            self.failed += 1
+            return await self.strategy.send(to, content, link, extra_data=extra_data)
+        chat_id = str(chat_id)
+
+        for attempt in range(1, self.max_attempts + 1):
+            await self._acquire(chat_id)
+            if self._first_send is None:
+                self._first_send = time.monotonic()
+
+            try:
+                ok = await self.strategy.send(to, content, link, extra_data=extra_data)
+            except TelegramRetryAfter as e:
+                self.retried += 1
+                logger.warning(f"[Telegram] 429 for {chat_id}, retry after {e.retry_after}s (attempt {attempt}/{self.max_attempts})")
+                await self._call_global(self.global_bucket.pause, e.retry_after)
+                self._pause_chat(chat_id, e.retry_after)
+                continue
+
+            self._last_send = time.monotonic()
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+            return ok
+
+        logger.error(f"[Telegram] Giving up on {chat_id} after {self.max_attempts} rate-limited attempts")
+        self.failed += 1
+        return False
+
+    def stats(self) -> dict:
+        elapsed = 0.0
+        if self._first_send is not None and self._last_send is not None:
+            elapsed = self._last_send - self._first_send
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(self.sent / elapsed, 2) if elapsed > 0 else 0.0,
+        }
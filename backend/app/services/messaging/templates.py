@@ -0,0 +1,221 @@
+"""
+Message templates for contextual and scenario sends.
+
+Templates are parsed once into a compiled form: the `{placeholder}` offsets
+are recorded, the placeholders are validated against the fields the caller
+declares, and the text is split into literal parts and field slots. Rendering
+a row fills the slots and joins the parts, with no parsing.
+
+    template = templates.get("scenario.daily_score_update")
+    texts = template.render_many({"max_score": r.max_score} for r in rows)
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence
+
+PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+PLAY_FOOTER = "\n\nখেলতে ক্লিক করুন- https://quizard.live/?qcid=246"
+
+# Placeholders the frontend may use in custom_text
+CUSTOM_TEXT_FIELDS = ("total_score", "username", "package_name")
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class Placeholder(NamedTuple):
+    name: str
+    start: int
+    end: int
+
+
+def join_fields(literals: Sequence[str], names: Sequence[str]) -> Callable[[Mapping[str, object]], str]:
+    """
+    Build a render function that joins `literals` around the row's values for
+    `names` (len(literals) == len(names) + 1). The common arities get a
+    closure with unrolled lookups; a row of a 1-3 field template then costs
+    about as much as the equivalent inline f-string.
+    """
+    head, tail = literals[0], tuple(literals[1:])
+    pairs = tuple(zip(names, tail))
+    if len(pairs) == 1:
+        ((n1, l1),) = pairs
+        return lambda v: "".join((head, str(v[n1]), l1))
+    if len(pairs) == 2:
+        (n1, l1), (n2, l2) = pairs
+        return lambda v: "".join((head, str(v[n1]), l1, str(v[n2]), l2))
+    if len(pairs) == 3:
+        (n1, l1), (n2, l2), (n3, l3) = pairs
+        return lambda v: "".join((head, str(v[n1]), l1, str(v[n2]), l2, str(v[n3]), l3))
+
+    def join(v):
+        out = [head]
+        for name, literal in pairs:
+            out.append(str(v[name]))
+            out.append(literal)
+        return "".join(out)
+
+    return join
+
+
+class CompiledTemplate:
+    def __init__(self, name: str, source: str, fields: Optional[Sequence[str]] = None, strict: bool = True):
+        """
+        Args:
+            name: Registry key, used in error messages
+            source: Template text with {placeholder} fields
+            fields: Allowed placeholder names; defaults to every placeholder found
+            strict: Strict templates reject unknown placeholders at compile time and
+                missing values at render time. Non-strict templates (user-supplied
+                text) only substitute `fields` and leave anything else untouched.
+        """
+        self.name = name
+        self.source = source
+        self.strict = strict
+
+        found = [Placeholder(m.group(1), m.start(), m.end()) for m in PLACEHOLDER_RE.finditer(source)]
+        allowed = set(fields) if fields is not None else {p.name for p in found}
+
+        unknown = sorted({p.name for p in found} - allowed)
+        if unknown and strict:
+            raise TemplateError(f"Template {name!r} uses undeclared placeholders: {', '.join(unknown)}")
+
+        self.placeholders: List[Placeholder] = [p for p in found if p.name in allowed]
+        self.fields = tuple(dict.fromkeys(p.name for p in self.placeholders))
+
+        # Split into the literal text around each placeholder; literal braces
+        # need no escaping since the text is never formatted.
+        literals = []
+        pos = 0
+        for p in self.placeholders:
+            literals.append(source[pos:p.start])
+            pos = p.end
+        literals.append(source[pos:])
+        self._join = join_fields(literals, [p.name for p in self.placeholders])
+        # Non-strict fallback when a row lacks a field: the placeholder stays
+        self._placeholder_values = {name: "{" + name + "}" for name in self.fields}
+
+    @property
+    def is_constant(self) -> bool:
+        return not self.placeholders
+
+    def _render(self, values: Mapping[str, object]) -> str:
+        try:
+            return self._join(values)
+        except KeyError:
+            if self.strict:
+                raise
+            return self._join({**self._placeholder_values, **values})
+
+    def render(self, values: Optional[Mapping[str, object]] = None) -> str:
+        if self.is_constant:
+            return self.source
+        try:
+            return self._render(values or {})
+        except KeyError as e:
+            raise TemplateError(f"Template {self.name!r} is missing a value for {e.args[0]}") from None
+
+    def render_many(self, rows: Iterable[Mapping[str, object]]) -> List[str]:
+        """Render one text per row, in order."""
+        if self.is_constant:
+            return [self.source for _ in rows]
+        if not self.strict:
+            render = self._render
+            return [render(row) for row in rows]
+        join = self._join
+        try:
+            return [join(row) for row in rows]
+        except KeyError as e:
+            raise TemplateError(f"Template {self.name!r} is missing a value for {e.args[0]}") from None
+
+
+class TemplateRegistry:
+    def __init__(self):
+        self._templates: Dict[str, CompiledTemplate] = {}
+
+    def register(self, name: str, source: str, fields: Optional[Sequence[str]] = None) -> CompiledTemplate:
+        template = CompiledTemplate(name, source, fields)
+        self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> CompiledTemplate:
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise TemplateError(f"Unknown template {name!r}") from None
+
+    def render(self, name: str, values: Optional[Mapping[str, object]] = None) -> str:
+        return self.get(name).render(values)
+
+    def render_many(self, name: str, rows: Iterable[Mapping[str, object]]) -> List[str]:
+        return self.get(name).render_many(rows)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+
+def compile_custom_text(custom_text: str) -> CompiledTemplate:
+    """Compile frontend-supplied text; only CUSTOM_TEXT_FIELDS are substituted."""
+    return CompiledTemplate("custom_text", custom_text, CUSTOM_TEXT_FIELDS, strict=False)
+
+
+templates = TemplateRegistry()
+
+# Contextual messages
+TOP_RANKER_HEADLINES = (
+    "🏆 Congratulations! You are among the top rankers!",
+    "🔥 Incredible performance! You're dominating the leaderboard.",
+    "⭐ Keep it up! You are in the top 3!",
+)
+templates.register("contextual.top_rankers", "{headline} in {package_name}. Your total score is {total_score}.")
+templates.register("contextual.inspiring_top_10_30", "Keep pushing in {package_name}! You're currently ranked in the top 30 with {total_score} points. You can do it!")
+templates.register("contextual.soft_reminder", "👋 Don't forget to play your {package_name} quizzes today! Your streak is at risk.")
+templates.register("contextual.channel_promo", "🚀 Unlock more rewards! Subscribe to our {package_label} packages.")
+templates.register("contextual.channel_congrats_top_5", "🎉 Huge congratulations to our Top 5 players in {package_name}: {names}! Amazing job! 🥳")
+templates.register("daily_check.winning_potential", "You are doing great! You have {current_score} points. You need {points_needed} more to win!")
+
+# Scenario messages
+templates.register(
+    "scenario.unsubscribed_reminder",
+    "আপনি এখনো {platform_name} সার্ভিসেটিতে সাবস্ক্রিপশন করেন নি। এখনই সাবস্ক্রিপশন খেলুন এবং লুফে নিন ডেইলি, উইকলি, মেগা প্রাইজ সহ অনেক অনেক আকর্ষণীয় পুরষ্কার জেতার সুযোগ।" + PLAY_FOOTER,
+)
+templates.register(
+    "scenario.daily_score_update",
+    "আপনার আজকের দুটি রাউন্ড সফল ভাবে সম্পন্ন হয়েছে। আজকে আপনার সর্বোচ্চ স্কোর {max_score}" + PLAY_FOOTER,
+)
+templates.register(
+    "scenario.eve_score_ranking",
+    "আজকে আপনি {game_name} গেমটি খেলেছেন এবং এখন পর্যন্ত আপনার সর্বোচ্চ স্কোর {max_score}। আপনি লিডারবোর্ডে {rank} তম অবস্থানে রয়েছেন।" + PLAY_FOOTER,
+)
+templates.register(
+    "scenario.subscription_expiry",
+    "আগামী কাল আপনার {sub_name} সাবস্ক্রিপশনটি রিনিউ হবে। কোন রকম ব্যাঘাত ছাড়া নিয়মিত খেলে প্রাইজ পেতে অবশ্যই কাল বিকাশে যথেষ্ট ব্যালান্স রাখুন। ধন্যবাদ।" + PLAY_FOOTER,
+)
+templates.register(
+    "scenario.inactive_subscriber",
+    "আমরা লক্ষ্ করেছি বিগত তিন দিন যাবত আপনি কোন গেম খেলছেন না। নিয়মিত ডেইলি প্রাইজ গুলো জিততে আজ থেকেই আবার খেলা শুরু করুন। আপনার জন্য শুভকামনা।" + PLAY_FOOTER,
+)
+templates.register(
+    "scenario.daily_play_reminder",
+    "খেলার সময় চলছে। ডেইলি প্রাইজ পেতে এখনই খেলা শুরু করুন।" + PLAY_FOOTER,
+)
+templates.register(
+    "scenario.daily_winner_congrats",
+    "অভিনন্দন! আজকের বিজয়ী তালিকায় থাকার জন্য আপনাকে আন্তরিক অভিনন্দন। পরবর্তী দিন গুলোর জন্য শুভকামনা। ",
+)
+templates.register(
+    "scenario.daily_referral_promo",
+    "আজই রেফার করে জিতে নিন পর পর তিন সপ্তাহে প্রাইজ জেতার সুযোগ!"
+    "\n\nQuizard-https://quizard.live/?page=referral"
+    "\n\nWordly-https://wordly.quizard.live/?page=referral",
+)
+templates.register(
+    "scenario.weekly_winner_list_promo",
+    "আপনি সাপ্তাহিক উইনার হওয়ার তালিকায় রয়েছেন। অভিনন্দন! এভাবেই বেশি বেশি স্কোর করে যান। আপনার জন্য অপেক্ষা করছে সাপ্তাহিক পুরষ্কার!" + PLAY_FOOTER,
+)
+templates.register(
+    "scenario.winning_position_warning",
+    "ইতিমধ্যে জেনেছেন {game_name} গেমের লিডারবোর্ডে আপনার অবস্থান {rank} তম। এই অবস্থানে আজকের ডেইলি প্রাইজ পাওয়া সম্ভব হবে না। দয়া করে আরেকটু চেষ্টা করুন। রাত ১১.৫৯ এর মধ্যে {target_rank} তম অবস্থানের ভিতরে থাকলেই পেয়ে যাবেন ডেইলি প্রাইজ।" + PLAY_FOOTER,
+)
@@ -0,0 +1,181 @@
+"""
+Shared HTTP transport for the messaging providers.
+
+One requests.Session with per-host keep-alive connection pools is shared by every
+strategy and the Telegram bot service, so a broadcast reuses a handful of
+TCP/TLS connections to api.telegram.org, graph.facebook.com, discord.com and
+gmail.googleapis.com instead of opening one per message.
+
+AsyncHttpTransport is the asyncio counterpart used by the async dispatcher.
+An httpx client is bound to the event loop it runs on, so get_async_transport()
+keeps one per loop; bulk sends run on a long-lived loop (dispatcher.run_sync)
+and so reuse the same keep-alive connections run after run. It reports into
+the same TransportStats as the sync transport.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.core.config import settings
+
+
+class TransportStats:
+    """Thread-safe per-host request counters and latency."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, dict] = {}
+
+    def record(self, host: str, elapsed_ms: float, status_code: Optional[int] = None) -> None:
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = {"requests": 0, "errors": 0, "http_errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+                self._hosts[host] = stats
+
+            stats["requests"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            if status_code is None:
+                stats["errors"] += 1
+            elif status_code >= 400:
+                stats["http_errors"] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            result = {}
+            for host, stats in self._hosts.items():
+                result[host] = {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "http_errors": stats["http_errors"],
+                    "avg_ms": round(stats["total_ms"] / stats["requests"], 2) if stats["requests"] else 0.0,
+                    "max_ms": round(stats["max_ms"], 2),
+                }
+            return result
+
+
+class HttpTransport:
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 20, timeout: float = 10.0):
+        """
+        Args:
+            pool_connections: Number of per-host pools kept alive
+            pool_maxsize: Maximum keep-alive connections per host
+            timeout: Default request timeout in seconds
+        """
+        self.timeout = timeout
+        self.stats = TransportStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            self.stats.record(host, (time.perf_counter() - start) * 1000)
+            raise
+
+        self.stats.record(host, (time.perf_counter() - start) * 1000, response.status_code)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncHttpTransport:
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20, timeout: float = 10.0, stats: Optional[TransportStats] = None):
+        self.timeout = timeout
+        self.stats = stats or TransportStats()
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=timeout,
+        )
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(host, (time.perf_counter() - start) * 1000)
+            raise
+
+        self.stats.record(host, (time.perf_counter() - start) * 1000, response.status_code)
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncHttpTransport":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport() -> HttpTransport:
+    """Process-wide transport built from settings; shared by all strategies."""
+    global _default_transport
+    if _default_transport is None:
+        with _default_lock:
+            if _default_transport is None:
+                _default_transport = HttpTransport(
+                    pool_connections=settings.MESSAGING_HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=settings.MESSAGING_HTTP_POOL_MAXSIZE,
+                    timeout=settings.MESSAGING_HTTP_TIMEOUT,
+                )
+    return _default_transport
+
+
+_async_transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncHttpTransport]" = weakref.WeakKeyDictionary()
+
+
+def get_async_transport() -> AsyncHttpTransport:
+    """
+    Keep-alive async transport for the running event loop, created on first
+    use and shared by every dispatch run on that loop. Must be called from
+    inside the loop.
+    """
+    loop = asyncio.get_running_loop()
+    transport = _async_transports.get(loop)
+    if transport is None:
+        max_in_flight = sum(settings.MESSAGING_CONCURRENCY.values()) or 10
+        transport = _async_transports[loop] = AsyncHttpTransport(
+            max_connections=max_in_flight,
+            max_keepalive_connections=max_in_flight,
+            timeout=settings.MESSAGING_HTTP_TIMEOUT,
+            stats=get_default_transport().stats,
+        )
+    return transport
@@ -48,14 +48,21 @@ class SubscriptionService:
         else:
             end_date = start_date + timedelta(days=30)
 
-        # 4. Create UserSubscribed with dates
-        user_sub_in = UserSubscribedCreate(
-            user_id=user.id, 
-            subs_id=sub.id,
-            start_date=start_date,
-            end_date=end_date
-        )
-        user_sub = user_sup_crud.create(db, obj_in=user_sub_in)
+        # 4. Create UserSubscribed with dates, or renew the existing link
+        # ((user_id, subs_id) is unique)
+        user_sub = user_sup_crud.get_by_user_and_subscription(db, user_id=user.id, subs_id=sub.id)
+        if user_sub:
+            user_sub.start_date = start_date
+            user_sub.end_date = end_date
+            db.add(user_sub)
+        else:
+            user_sub_in = UserSubscribedCreate(
+                user_id=user.id, 
+                subs_id=sub.id,
+                start_date=start_date,
+                end_date=end_date
+            )
+            user_sub = user_sup_crud.create(db, obj_in=user_sub_in)
         
         # 6. Increment Subscription Quantity
         sub.current_subs_quantity += 1
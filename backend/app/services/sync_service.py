@@ -1,14 +1,25 @@
 
-import requests
 from sqlalchemy.orm import Session
 from app import crud, schemas, models
+from app.core.config import settings
+from app.crud.quiz import Link, PlayedRecord
 from app.utils.logger import get_logger
 from app.models.enums import PlatformType
+from app.services.leaderboard import leaderboard_service
+from app.services.sync_sources import CATEGORIES, PayloadStream, create_sync_session, fetch_sources
+from app.utils.helpers import chunked
+import time
 from datetime import datetime # Added datetime import
-from typing import Optional
+from typing import IO, Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
 
 logger = get_logger("sync_service")
 
+# Records per bulk lookup + upsert statement
+LOGIN_BATCH_SIZE = 1000
+SUBSCRIPTION_BATCH_SIZE = 1000
+PLAYED_BATCH_SIZE = 2000
+
 # This should ideally be in app/core/config.py and loaded from environment variables
 # For now, hardcoding the list of external API URLs
 EXTERNAL_API_URLS = [
@@ -17,7 +28,41 @@ EXTERNAL_API_URLS = [
     "https://arcaderush.xyz/api/manual/last30minutes"
 ]
 
+class SyncContext:
+    """
+    Username -> user id and subscription name -> id caches for one sync run.
+
+    preload() fills them for a whole payload with one bulk query per kind, so
+    the subscription and played phases resolve names from dicts instead of a
+    get_by_username / get_by_name query per record. Ids created during the run
+    are added as they appear; None marks a name that could not be created, so
+    it is not retried for every record.
+    """
+
+    def __init__(self):
+        self.user_ids: Dict[str, Optional[int]] = {}
+        self.subs_ids: Dict[str, Optional[int]] = {}
+
+    def preload(self, db: Session, payload: dict) -> None:
+        usernames, sub_names = set(), set()
+        for category in ("subscription", "played"):
+            for records in (payload.get(category) or {}).values():
+                for record in records:
+                    usernames.add(record.get("username"))
+                    sub_names.add(record.get("service_type"))
+
+        usernames = {name for name in usernames if name and name not in self.user_ids}
+        sub_names = {name for name in sub_names if name and name not in self.subs_ids}
+        if usernames:
+            self.user_ids.update(crud.user.ids_by_username(db, usernames=usernames))
+        if sub_names:
+            self.subs_ids.update(crud.subscription.ids_by_name(db, names=sub_names))
+
+
 class SyncService:
+    def __init__(self):
+        self.session = None
+
     def _get_platform_enum(self, platform_name: str) -> PlatformType:
         try:
             return PlatformType[platform_name.upper()]
@@ -37,6 +82,10 @@ class SyncService:
             logger.warning(f"Could not parse datetime string '{datetime_str}'")
             return None
 
+    def _parse_datetime(self, datetime_str: str) -> Optional[datetime]:
+        formatted = self.formatDatetime(datetime_str)
+        return datetime.fromisoformat(formatted) if formatted else None
+
     def _get_or_create_user(self, db: Session, username: str, platform_enum: PlatformType, phone: Optional[str] = None) -> Optional[models.User]:
         """Gets a user by username or creates a new one if not found."""
         if not username:
@@ -85,99 +134,135 @@ class SyncService:
             db.rollback()
             return None
 
-    def _process_logins(self, db: Session, login_data: dict):
+    def _resolve_user_id(self, db: Session, ctx: SyncContext, username: str, platform_enum: PlatformType, phone: Optional[str] = None) -> Optional[int]:
+        if username not in ctx.user_ids:
+            user = self._get_or_create_user(db, username, platform_enum, phone=phone)
+            ctx.user_ids[username] = user.id if user else None
+        return ctx.user_ids[username]
+
+    def _resolve_subs_id(self, db: Session, ctx: SyncContext, sub_name: str, platform_enum: PlatformType) -> Optional[int]:
+        if sub_name not in ctx.subs_ids:
+            subscription = self._get_or_create_subscription(db, sub_name, platform_enum)
+            ctx.subs_ids[sub_name] = subscription.id if subscription else None
+        return ctx.subs_ids[sub_name]
+
+    def _process_logins(self, db: Session, login_data: dict) -> dict:
+        """
+        Create missing users and set the platform flag, LOGIN_BATCH_SIZE
+        records per bulk lookup + multi-row upsert.
+        """
         logger.info("Processing logins...")
+        stats = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "failed": 0, "batches": []}
         for platform_name, users in login_data.items():
             platform_enum = self._get_platform_enum(platform_name)
             if not platform_enum:
                 continue
 
+            records = []
             for user_data in users:
                 username = user_data.get("username")
                 if not username:
-                    logger.warning("Skipping login record with empty username.")
+                    stats["skipped"] += 1
                     continue
+                records.append((username, user_data.get("phone")))
 
-                user = crud.user.get_by_username(db, username=username)
-                if user:
-                    logger.debug(f"User '{username}' already exists, skipping creation.")
-                    continue
-                
+            for batch in chunked(records, LOGIN_BATCH_SIZE):
+                start = time.perf_counter()
                 try:
-                    # Create new user if it doesn't exist
-                    user_in = schemas.UserCreate(
-                        username=username,
-                        phone_number=user_data.get("phone"),
-                    )
-                    new_user = crud.user.create(db, obj_in=user_in)
-                    setattr(new_user, platform_enum.value, True)
-                    db.add(new_user)
-                    db.commit()
-                    logger.info(f"Created new user via login sync: {username}")
+                    counts = crud.user.upsert_platform_users(db, platform=platform_enum, users=batch)
                 except Exception as e:
-                    logger.error(f"Error processing login for user '{username}': {e}")
+                    logger.error(f"Error processing {len(batch)} {platform_name} logins: {e}")
                     db.rollback()
-        logger.info("Finished processing logins.")
+                    stats["failed"] += len(batch)
+                    continue
+                elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+
+                stats["inserted"] += counts.inserted
+                stats["updated"] += counts.updated
+                stats["unchanged"] += counts.unchanged
+                stats["batches"].append({"platform": platform_enum.value, "records": len(batch), "ms": elapsed_ms})
+                logger.info(
+                    f"Login batch {platform_enum.value}: {len(batch)} records, {counts.inserted} inserted, "
+                    f"{counts.updated} updated, {counts.unchanged} unchanged in {elapsed_ms}ms"
+                )
+        logger.info(
+            f"Finished processing logins: {stats['inserted']} inserted, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['skipped']} skipped in {len(stats['batches'])} batches."
+        )
+        return stats
 
-    def _process_subscriptions(self, db: Session, subscription_data: dict):
+    def _process_subscriptions(self, db: Session, subscription_data: dict, ctx: Optional[SyncContext] = None) -> dict:
+        """
+        Resolve users and subscriptions through the run's SyncContext, then
+        write the window's links SUBSCRIPTION_BATCH_SIZE at a time with one
+        upsert statement per batch.
+        """
+        ctx = ctx or SyncContext()
         logger.info("Processing subscriptions...")
+        stats = {"links": 0, "skipped": 0, "failed": 0, "batches": []}
         for platform_name, subscriptions in subscription_data.items():
             platform_enum = self._get_platform_enum(platform_name)
             if not platform_enum:
                 continue
-            
+
+            links = []
             for sub_data in subscriptions:
                 username = sub_data.get("username")
                 sub_name = sub_data.get("service_type")
                 if not (username and sub_name):
                     logger.warning(f"Skipping subscription record with missing username or service_type: {sub_data}")
+                    stats["skipped"] += 1
                     continue
 
-                try:
-                    user = self._get_or_create_user(db, username, platform_enum, phone=sub_data.get("phone"))
-                    if not user:
-                        logger.warning(f"Could not get or create user '{username}', skipping subscription link.")
-                        continue
+                user_id = self._resolve_user_id(db, ctx, username, platform_enum, phone=sub_data.get("phone"))
+                subs_id = self._resolve_subs_id(db, ctx, sub_name, platform_enum)
 
-                    subscription = self._get_or_create_subscription(db, sub_name, platform_enum)
-                    if not subscription:
-                        logger.warning(f"Could not get or create subscription '{sub_name}', skipping link for user '{username}'.")
-                        continue
+                if not user_id:
+                    logger.warning(f"Could not get or create user '{username}', skipping subscription link.")
+                    stats["skipped"] += 1
+                    continue
+                if not subs_id:
+                    logger.warning(f"Could not get or create subscription '{sub_name}', skipping link for user '{username}'.")
+                    stats["skipped"] += 1
+                    continue
 
-                    start_date = self.formatDatetime(sub_data.get("start_date"))
-                    end_date = self.formatDatetime(sub_data.get("end_date"))
-                    
-                    existing_link = db.query(models.UserSubscribed).filter(
-                        models.UserSubscribed.user_id == user.id,
-                        models.UserSubscribed.subs_id == subscription.id
-                    ).first()
-
-                    if existing_link:
-                        if start_date: existing_link.start_date = start_date
-                        if end_date: existing_link.end_date = end_date
-                        db.add(existing_link)
-                        logger.debug(f"Updated subscription link for user '{username}' to '{sub_name}'.")
-                    else:
-                        link_in = schemas.UserSubscribedCreate(
-                            user_id=user.id, subs_id=subscription.id,
-                            start_date=start_date, end_date=end_date
-                        )
-                        crud.user_subscribed.create(db, obj_in=link_in)
-                        logger.info(f"Linked user '{username}' to subscription '{sub_name}'.")
-
-                    db.commit()
+                links.append(Link(
+                    user_id, subs_id,
+                    self._parse_datetime(sub_data.get("start_date")),
+                    self._parse_datetime(sub_data.get("end_date")),
+                ))
+
+            for batch in chunked(links, SUBSCRIPTION_BATCH_SIZE):
+                start = time.perf_counter()
+                try:
+                    written = crud.user_subscribed.upsert_many(db, links=batch)
                 except Exception as e:
-                    logger.error(f"Error processing subscription for user '{username}' and sub '{sub_name}': {e}")
+                    logger.error(f"Error linking {len(batch)} {platform_name} subscriptions: {e}")
                     db.rollback()
-        logger.info("Finished processing subscriptions.")
+                    stats["failed"] += len(batch)
+                    continue
+                elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+                stats["links"] += written
+                stats["batches"].append({"platform": platform_enum.value, "records": len(batch), "ms": elapsed_ms})
+                logger.info(f"Subscription batch {platform_enum.value}: {len(batch)} records, {written} links in {elapsed_ms}ms")
+        logger.info(f"Finished processing subscriptions: {stats['links']} links written, {stats['skipped']} skipped.")
+        return stats
 
-    def _process_played(self, db: Session, played_data: dict):
+    def _process_played(self, db: Session, played_data: dict, ctx: Optional[SyncContext] = None) -> dict:
+        """
+        Insert played rounds PLAYED_BATCH_SIZE at a time. Rounds already stored
+        (overlapping sync windows) are skipped by their natural key and
+        reported as duplicates.
+        """
+        ctx = ctx or SyncContext()
         logger.info("Processing played quizzes...")
+        stats = {"inserted": 0, "duplicates": 0, "skipped": 0, "failed": 0, "batches": []}
         for platform_name, played_list in played_data.items():
             platform_enum = self._get_platform_enum(platform_name)
             if not platform_enum:
                 continue
 
+            records = []
             for played_item in played_list:
                 username = played_item.get("username")
                 sub_name = played_item.get("service_type")
@@ -187,80 +272,185 @@ class SyncService:
 
                 if not all([username, sub_name, score is not None, time_taken is not None, played_time_str]):
                     logger.warning(f"Skipping incomplete played record: {played_item}")
+                    stats["skipped"] += 1
+                    continue
+
+                played_time = self._parse_datetime(played_time_str)
+                if not played_time:
+                    logger.warning(f"Could not parse played time for record: {played_item}. Skipping.")
+                    stats["skipped"] += 1
+                    continue
+
+                user_id = self._resolve_user_id(db, ctx, username, platform_enum)
+                subs_id = self._resolve_subs_id(db, ctx, sub_name, platform_enum)
+
+                if not user_id:
+                    logger.warning(f"Could not find or create user '{username}', skipping played record.")
+                    stats["skipped"] += 1
                     continue
-                
+                if not subs_id:
+                    logger.warning(f"Could not find or create subscription '{sub_name}', skipping played record for user '{username}'.")
+                    stats["skipped"] += 1
+                    continue
+
+                records.append(PlayedRecord(user_id, subs_id, score, time_taken, played_time))
+
+            for batch in chunked(records, PLAYED_BATCH_SIZE):
+                start = time.perf_counter()
                 try:
-                    user = self._get_or_create_user(db, username, platform_enum)
-                    if not user:
-                        logger.warning(f"Could not find or create user '{username}', skipping played record.")
-                        continue
-                        
-                    subscription = self._get_or_create_subscription(db, sub_name, platform_enum)
-                    if not subscription:
-                        logger.warning(f"Could not find or create subscription '{sub_name}', skipping played record for user '{username}'.")
-                        continue
+                    counts = crud.quiz.insert_many(db, records=batch)
+                except Exception as e:
+                    logger.error(f"Error recording {len(batch)} {platform_name} quizzes: {e}")
+                    stats["failed"] += len(batch)
+                    continue
+                leaderboard_service.record_plays((r.user_id, r.subs_id, r.score) for r in counts.records)
+                elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+                stats["inserted"] += counts.inserted
+                stats["duplicates"] += counts.duplicates
+                stats["skipped"] += counts.skipped
+                stats["batches"].append({"platform": platform_enum.value, "records": len(batch), "ms": elapsed_ms})
+                logger.info(
+                    f"Played batch {platform_enum.value}: {len(batch)} records, {counts.inserted} new, "
+                    f"{counts.duplicates} duplicates, {counts.skipped} skipped in {elapsed_ms}ms"
+                )
+        logger.info(
+            f"Finished processing played quizzes: {stats['inserted']} new, {stats['duplicates']} duplicates, "
+            f"{stats['skipped']} skipped."
+        )
+        return stats
+
+    def _event_time(self, record: Any) -> Optional[datetime]:
+        """Event time of a payload record (its "time" field), if it has one."""
+        if not isinstance(record, dict) or not record.get("time"):
+            return None
+        return self._parse_datetime(record["time"])
 
-                    played_time = self.formatDatetime(played_time_str)
-                    if not played_time:
-                        logger.warning(f"Could not parse played time for record: {played_item}. Skipping.")
+    def _drop_consumed(self, payload: dict, since: Optional[datetime]) -> Tuple[int, Optional[datetime]]:
+        """
+        Remove records older than the source's watermark from `payload` in
+        place. Returns (records dropped, latest event time left in the payload).
+        """
+        dropped = 0
+        latest = None
+        for category in ("login", "subscription", "played"):
+            for platform_name, records in (payload.get(category) or {}).items():
+                kept = []
+                for record in records:
+                    event_time = self._event_time(record)
+                    if since and event_time and event_time < since:
+                        dropped += 1
                         continue
-                        
-                    quiz_in = schemas.PlayedQuizCreate(
-                        user_id=user.id, subs_id=subscription.id,
-                        score=score, time=time_taken, created_at=played_time
-                    )
-                    crud.quiz.create(db, obj_in=quiz_in)
-                    db.commit()
-                    logger.info(f"Recorded quiz for user '{username}', sub '{sub_name}', score: {score}")
+                    if event_time and (latest is None or event_time > latest):
+                        latest = event_time
+                    kept.append(record)
+                payload[category][platform_name] = kept
+        return dropped, latest
 
-                except Exception as e:
-                    logger.error(f"Error recording quiz for user '{username}' and sub '{sub_name}': {e}")
-                    db.rollback()
-        logger.info("Finished processing played quizzes.")
+    def _watermark_params(self, url: str, state: Optional[models.SyncState]) -> Optional[dict]:
+        """Query parameters asking a watermark-aware source for new records only."""
+        param = settings.SYNC_WATERMARK_PARAMS.get(urlsplit(url).hostname or "")
+        if not (param and state):
+            return None
+        if state.cursor:
+            return {param: state.cursor}
+        if state.last_event_at:
+            return {param: state.last_event_at.isoformat(sep=" ")}
+        return None
 
-    def sync_from_updates_api(self, db: Session):
+    def _process_batch(self, db: Session, category: str, platform_name: str, records: list, ctx: SyncContext) -> dict:
+        """Apply one batch of a payload section through its phase processor."""
+        section = {platform_name: records}
+        if category == "login":
+            return self._process_logins(db, section)
+        # Logins earlier in the payload have already been written, so users
+        # they created are found by the bulk lookup
+        ctx.preload(db, {category: section})
+        if category == "subscription":
+            return self._process_subscriptions(db, section, ctx)
+        return self._process_played(db, section, ctx)
+
+    def _merge_stats(self, report: dict, category: str, stats: dict) -> None:
+        total = report.setdefault(category, {})
+        for key, value in stats.items():
+            total[key] = total.get(key, [] if isinstance(value, list) else 0) + value
+
+    def _process_payload(self, db: Session, payload: dict, ctx: Optional[SyncContext] = None) -> dict:
+        """Apply an already parsed payload: logins, then subscriptions, then played quizzes."""
+        ctx = ctx or SyncContext()
+        report = {}
+        if not isinstance(payload, dict):
+            logger.warning(f"Ignoring sync payload of type {type(payload).__name__}")
+            return report
+        for category in CATEGORIES:
+            for platform_name, records in (payload.get(category) or {}).items():
+                self._merge_stats(report, category, self._process_batch(db, category, platform_name, records, ctx))
+        return report
+
+    def _process_stream(self, db: Session, body: IO[bytes], since: Optional[datetime], ctx: SyncContext) -> Tuple[dict, Optional[datetime], Optional[str]]:
+        """
+        Parse a source body incrementally and process it batch by batch, so
+        memory stays bounded by SYNC_STREAM_BATCH_SIZE records whatever the
+        payload size. Returns (report, latest event time, cursor).
+        """
+        stream = PayloadStream(body, batch_size=settings.SYNC_STREAM_BATCH_SIZE)
+        report = {"stale": 0}
+        latest = None
+        for batch in stream:
+            section = {batch.category: {batch.platform: batch.records}}
+            dropped, batch_latest = self._drop_consumed(section, since)
+            report["stale"] += dropped
+            if batch_latest and (latest is None or batch_latest > latest):
+                latest = batch_latest
+
+            records = section[batch.category][batch.platform]
+            if records:
+                self._merge_stats(report, batch.category, self._process_batch(db, batch.category, batch.platform, records, ctx))
+        return report, latest, stream.cursor
+
+    def sync_from_updates_api(self, db: Session) -> dict:
+        """
+        Fetch every source concurrently and process each payload as soon as it
+        arrives, so a slow source no longer holds back the others. Payloads are
+        parsed as streams and processed in bounded batches.
+        Returns the per-phase counts for each source that was processed.
+        """
         logger.info(f"Starting synchronization from external APIs: {EXTERNAL_API_URLS}")
-        
-        aggregated_payload = {"login": {}, "subscription": {}, "played": {}}
+        if self.session is None:
+            # Kept for the worker's lifetime so beats reuse keep-alive connections
+            self.session = create_sync_session(pool_maxsize=len(EXTERNAL_API_URLS))
 
-        for api_url in EXTERNAL_API_URLS:
-            try:
-                response = requests.get(api_url, timeout=30)
-                response.raise_for_status()
-                payload = response.json()
-                logger.info(f"Successfully fetched data from {api_url}.")
-
-                for category in ["login", "subscription", "played"]:
-                    if category in payload:
-                        for platform_name, data_list in payload[category].items():
-                            if platform_name not in aggregated_payload[category]:
-                                aggregated_payload[category][platform_name] = []
-                            aggregated_payload[category][platform_name].extend(data_list)
-
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Failed to fetch data from external API {api_url}: {e}")
-                # Do not rollback entire transaction here, try next API
-            except Exception as e:
-                logger.error(f"An unexpected error occurred while fetching from {api_url}: {e}")
-                # Do not rollback entire transaction here, try next API
-        
-        # Only process if any data was successfully aggregated
-        if any(aggregated_payload[cat] for cat in aggregated_payload):
-            try:
-                if "login" in aggregated_payload:
-                    self._process_logins(db, aggregated_payload["login"])
-                
-                if "subscription" in aggregated_payload:
-                    self._process_subscriptions(db, aggregated_payload["subscription"])
+        ctx = SyncContext()
+        marks = crud.sync_state.get_all(db)
+        params = {url: self._watermark_params(url, marks.get(url)) for url in EXTERNAL_API_URLS}
 
-                if "played" in aggregated_payload:
-                    self._process_played(db, aggregated_payload["played"])
+        report = {}
+        for source in fetch_sources(EXTERNAL_API_URLS, session=self.session, params=params):
+            if source.body is None:
+                # Already logged; the other sources still go through
+                continue
+            mark = marks.get(source.url)
+            since = mark.last_event_at if mark else None
+            try:
+                result, latest, cursor = self._process_stream(db, source.body, since, ctx)
+                report[source.url] = result
+                if result["stale"]:
+                    logger.info(f"[Sync] {source.url}: dropped {result['stale']} records older than {since}")
 
-                logger.info("Synchronization process completed successfully for all aggregated data.")
+                # Only move the mark once every record up to it is stored
+                if any(phase.get("failed") for phase in result.values() if isinstance(phase, dict)):
+                    logger.warning(f"[Sync] {source.url}: some batches failed, watermark left at {since}")
+                elif latest or cursor:
+                    crud.sync_state.advance(db, source=source.url, last_event_at=latest, cursor=cursor)
             except Exception as e:
-                logger.error(f"An error occurred during processing aggregated data: {e}")
-                db.rollback() # Rollback if processing of aggregated data fails
+                logger.error(f"An error occurred while processing data from {source.url}: {e}")
+                db.rollback()
+            finally:
+                source.body.close()
+
+        if report:
+            logger.info(f"Synchronization process completed for {len(report)}/{len(EXTERNAL_API_URLS)} sources.")
         else:
             logger.info("No data fetched from any external API. Skipping processing.")
+        return report
 
 sync_service = SyncService()
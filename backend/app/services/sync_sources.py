@@ -0,0 +1,173 @@
+"""
+Concurrent fetching and streaming parsing of the external sync sources.
+
+Every source in EXTERNAL_API_URLS is requested at the same time over one
+keep-alive session (gzip accepted, connect/read errors and 429/5xx retried
+with exponential backoff). Bodies are streamed into spooled temporary files
+(in memory up to SYNC_SPOOL_MAX_MB, on disk beyond) and yielded in arrival
+order, so the first source to answer is processed while slower ones are still
+downloading.
+
+PayloadStream then parses a body incrementally with ijson and yields
+bounded (category, platform, records) batches; a full payload is never held
+in memory, whatever its size.
+
+    for source in fetch_sources(urls):
+        if source.body is not None:
+            for batch in PayloadStream(source.body, batch_size=2000):
+                process(batch.category, batch.platform, batch.records)
+"""
+
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import ijson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Payload sections processed by the sync, each {platform: [records]}
+CATEGORIES = ("login", "subscription", "played")
+
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class SourceResult(NamedTuple):
+    url: str
+    body: Optional[IO[bytes]]  # decoded response body, rewound; the caller closes it
+    elapsed: float
+    error: Optional[str] = None
+    size: int = 0
+
+
+class PayloadBatch(NamedTuple):
+    category: str
+    platform: str
+    records: List[Any]
+
+
+class PayloadStream:
+    """
+    Incremental reader for {"login"|"subscription"|"played": {platform: [records]}}
+    payloads. Iterating yields PayloadBatch objects of at most `batch_size`
+    records in document order; only the batch being built is in memory.
+    A top-level "cursor" value is exposed as `.cursor` once it has been read.
+    """
+
+    def __init__(self, body: IO[bytes], batch_size: int = 2000):
+        self.body = body
+        self.batch_size = batch_size
+        self.cursor: Optional[str] = None
+
+    def __iter__(self) -> Iterator[PayloadBatch]:
+        builder = None
+        depth = 0
+        category = platform = None
+        batch: List[Any] = []
+
+        for prefix, event, value in ijson.parse(self.body, use_float=True):
+            if builder is not None:
+                # Inside a record: feed the builder until the record closes
+                builder.event(event, value)
+                if event in ("start_map", "start_array"):
+                    depth += 1
+                elif event in ("end_map", "end_array"):
+                    depth -= 1
+                    if depth == 0:
+                        batch.append(builder.value)
+                        builder = None
+                        if len(batch) >= self.batch_size:
+                            yield PayloadBatch(category, platform, batch)
+                            batch = []
+                continue
+
+            parts = prefix.split(".")
+            if len(parts) == 3 and parts[0] in CATEGORIES and parts[2] == "item":
+                category, platform = parts[0], parts[1]
+                if event in ("start_map", "start_array"):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    depth = 1
+                else:
+                    batch.append(value)
+            elif len(parts) == 2 and parts[0] in CATEGORIES and event == "end_array":
+                if batch:
+                    yield PayloadBatch(category, platform, batch)
+                    batch = []
+            elif prefix == "cursor" and event in ("string", "number"):
+                self.cursor = str(value)
+
+
+def create_sync_session(retries: Optional[int] = None, backoff: Optional[float] = None, pool_maxsize: int = 10) -> requests.Session:
+    retry = Retry(
+        total=settings.SYNC_FETCH_RETRIES if retries is None else retries,
+        backoff_factor=settings.SYNC_FETCH_BACKOFF if backoff is None else backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def source_timeout(url: str) -> Tuple[float, float]:
+    """(connect, read) timeout for one source; read timeouts can be overridden per host."""
+    host = urlsplit(url).hostname or ""
+    return settings.SYNC_CONNECT_TIMEOUT, settings.SYNC_SOURCE_TIMEOUTS.get(host, settings.SYNC_READ_TIMEOUT)
+
+
+def fetch_source(session: requests.Session, url: str, params: Optional[dict] = None) -> SourceResult:
+    """Download one source's body (gzip decoded) into a spooled temporary file."""
+    start = time.perf_counter()
+    body = tempfile.SpooledTemporaryFile(max_size=settings.SYNC_SPOOL_MAX_MB * 1024 * 1024)
+    size = 0
+    try:
+        with session.get(url, params=params, timeout=source_timeout(url), stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                body.write(chunk)
+                size += len(chunk)
+    except requests.exceptions.RequestException as e:
+        body.close()
+        return SourceResult(url, None, time.perf_counter() - start, f"Failed to fetch: {e}")
+    body.seek(0)
+    return SourceResult(url, body, time.perf_counter() - start, size=size)
+
+
+def fetch_sources(
+    urls: Iterable[str], session: Optional[requests.Session] = None, params: Optional[Dict[str, dict]] = None
+) -> Iterator[SourceResult]:
+    """
+    Fetch every url concurrently and yield results as they complete. Failed
+    sources are logged and yielded with body=None. `params` maps a url to
+    the query parameters to send it.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return
+    session = session or create_sync_session(pool_maxsize=len(urls))
+
+    with ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="sync-fetch") as pool:
+        futures = [pool.submit(fetch_source, session, url, (params or {}).get(url)) for url in urls]
+        for future in as_completed(futures):
+            result = future.result()
+            if result.error:
+                logger.error(f"[Sync] {result.url}: {result.error} ({result.elapsed:.2f}s)")
+            else:
+                logger.info(f"[Sync] Fetched {result.url} ({result.size} bytes) in {result.elapsed:.2f}s")
+            yield result
@@ -21,4 +21,23 @@ def send_notification_task(user_id: int):
     except Exception as e:
         logger.error(f"Error in background task for user {user_id}: {e}")
     finally:
+        messaging_service.flush_message_log()
+        db.close()
+
+@celery_app.task(name="send_daily_check_bulk_task")
+def send_daily_check_bulk_task():
+    """
+    Background task running the daily logic check for all users in one pass.
+    """
+    logger.info("Starting bulk daily check")
+    
+    db = next(deps.get_db())
+    try:
+        result = messaging_service.process_daily_check_bulk(db)
+        logger.info(f"Bulk daily check result: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Error in bulk daily check task: {e}")
+    finally:
+        messaging_service.flush_message_log()
         db.close()
\ No newline at end of file
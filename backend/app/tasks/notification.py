@@ -40,4 +40,5 @@ def send_notification_task(messenger_type_str: str, text: str, link: str = None,
             user_id=user_id
         )
     finally:
+        messaging_service.flush_message_log()
         db.close()
@@ -1,20 +1,129 @@
-from celery import shared_task
-from app.api import deps
+from datetime import date
+from typing import Dict, List, Optional
+
+from celery import chord, shared_task
+from celery.utils.log import get_task_logger
+
+from app.core.config import settings
 from app.services.messaging import messaging_service
+from app.services.messaging.recipients import Recipient
 from app.models.enums import MessengerType, MessageScenarioType
 from app.database.session import SessionLocal
+from app.utils.helpers import chunked
+
+logger = get_task_logger(__name__)
+
+
+def _ref(values: List[str], positions: Dict[str, int], value: Optional[str]) -> Optional[int]:
+    """Index of `value` in `values`, appending it on first sight; None stays None."""
+    if value is None:
+        return None
+    idx = positions.get(value)
+    if idx is None:
+        idx = positions[value] = len(values)
+        values.append(value)
+    return idx
+
+
+def pack_chunk(chunk: List[Recipient]) -> dict:
+    """
+    JSON-friendly chunk payload. Most scenarios send the same text (and
+    link) to every user, so texts and links are stored once and referenced
+    by index. Each row keeps the recipient's explicit contact and ledger
+    message_key.
+    """
+    texts: List[str] = []
+    links: List[str] = []
+    text_index: Dict[str, int] = {}
+    link_index: Dict[str, int] = {}
+    rows = [
+        [r.user_id, _ref(texts, text_index, r.text), _ref(links, link_index, r.link), r.to, r.message_key]
+        for r in chunk
+    ]
+    return {"texts": texts, "links": links, "rows": rows}
+
+
+def unpack_chunk(payload: dict) -> List[Recipient]:
+    texts, links = payload["texts"], payload["links"]
+    return [
+        Recipient(user_id, texts[text_idx], None if link_idx is None else links[link_idx], to, key)
+        for user_id, text_idx, link_idx, to, key in payload["rows"]
+    ]
+
 
 @shared_task(name="run_messaging_scenario")
 def run_messaging_scenario(scenario_type_str: str, messenger_type_str: str = "telegram"):
     """
-    Celery task to run a specific messaging scenario.
+    Celery task to plan a messaging scenario: compute the audience, then fan
+    it out as one send task per SCENARIO_CHUNK_SIZE users with a chord
+    callback that aggregates the counts. Sends scale with the worker count.
+    With MESSAGING_USE_OUTBOX the audience is queued in the outbox instead.
+    Messages already sent or claimed today (send ledger) are skipped either way.
     """
+    # The scenario day, fixed at planning time for every chunk
+    send_date = date.today()
     db = SessionLocal()
     try:
         scenario_type = MessageScenarioType(scenario_type_str)
         messenger_type = MessengerType(messenger_type_str)
-        
-        result = messaging_service.send_scenario_messages(db, scenario_type, messenger_type)
-        return result
+
+        recipients = messaging_service.iter_scenario_recipients(db, scenario_type)
+        if settings.MESSAGING_USE_OUTBOX:
+            # Delivery is left to the outbox dispatcher workers
+            result = messaging_service.send_scenario_recipients(db, scenario_type, messenger_type, recipients, send_date=send_date)
+            logger.info(f"Scenario {scenario_type_str}: queued {result['processed_count']} messages in the outbox, skipped {result['skipped_count']}")
+            return {**result, "status": "queued"}
+
+        chunk_tasks = [
+            send_scenario_chunk.s(scenario_type_str, messenger_type_str, pack_chunk(chunk), send_date.isoformat())
+            for chunk in chunked(recipients, settings.SCENARIO_CHUNK_SIZE)
+        ]
     finally:
         db.close()
+
+    if not chunk_tasks:
+        logger.info(f"Scenario {scenario_type_str}: no recipients")
+        return {"status": "success", "processed_count": 0, "chunks": 0}
+
+    chord(chunk_tasks)(aggregate_scenario_results.s(scenario_type_str))
+    logger.info(f"Scenario {scenario_type_str}: dispatched {len(chunk_tasks)} chunk tasks")
+    return {"status": "dispatched", "chunks": len(chunk_tasks)}
+
+
+@shared_task(name="send_scenario_chunk")
+def send_scenario_chunk(scenario_type_str: str, messenger_type_str: str, payload: dict, send_date: str):
+    """
+    Send one chunk of a scenario audience. Safe to retry or redeliver: each
+    attempt sends only the messages it newly claims in the send ledger.
+    """
+    db = SessionLocal()
+    try:
+        return messaging_service.send_scenario_recipients(
+            db,
+            MessageScenarioType(scenario_type_str),
+            MessengerType(messenger_type_str),
+            unpack_chunk(payload),
+            send_date=date.fromisoformat(send_date),
+        )
+    finally:
+        messaging_service.flush_message_log()
+        db.close()
+
+
+@shared_task(name="aggregate_scenario_results")
+def aggregate_scenario_results(chunk_results: List[dict], scenario_type_str: str):
+    """
+    Chord callback: total the per-chunk counts of a scenario run.
+    """
+    processed_count = sum(r.get("processed_count", 0) for r in chunk_results)
+    sent = sum(r.get("sent_count", 0) for r in chunk_results)
+    skipped = sum(r.get("skipped_count", 0) for r in chunk_results)
+    logger.info(f"Scenario {scenario_type_str}: processed {processed_count}, sent {sent}, skipped {skipped} over {len(chunk_results)} chunks")
+    return {
+        "status": "success",
+        "scenario": scenario_type_str,
+        "processed_count": processed_count,
+        "sent_count": sent,
+        "skipped_count": skipped,
+        "chunks": len(chunk_results),
+    }
@@ -0,0 +1,50 @@
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield successive lists of at most `size` items from any iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def utcnow() -> datetime:
+    """Naive UTC now, for DATETIME columns compared against Python-side timestamps."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def day_range(day: date, days: int = 1) -> Tuple[datetime, datetime]:
+    """
+    Half-open [start, end) bounds covering `days` calendar days from `day`.
+    Filter with `col >= start, col < end` instead of `func.date(col) == day`,
+    which can't use an index on the column.
+    """
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=days)
+
+
+def normalize_msisdn(value) -> Optional[str]:
+    """
+    Canonical form of a Bangladeshi phone number for matching: digits only,
+    without the 880 country code or leading zeros ("+880 1712-345678",
+    "01712345678" and "1712345678" all become "1712345678").
+    Returns None for values that are not phone numbers (e.g. arcaderush usernames).
+    """
+    if value is None:
+        return None
+    raw = str(value).strip()
+    digits = "".join(ch for ch in raw if ch.isdigit())
+    if not digits or len(digits) < len(raw.lstrip("+").replace(" ", "").replace("-", "")):
+        return None
+    if digits.startswith("880") and len(digits) == 13:
+        digits = digits[3:]
+    digits = digits.lstrip("0")
+    # E.164 numbers are at most 15 digits; anything longer is not a phone number
+    return digits if 0 < len(digits) <= 15 else None
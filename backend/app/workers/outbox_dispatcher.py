@@ -0,0 +1,108 @@
+"""
+Outbox dispatcher worker
+Claims pending outbox rows in batches (SELECT ... FOR UPDATE SKIP LOCKED)
+and sends them concurrently. Run as many processes as needed; they never
+claim the same row.
+"""
+
+import time
+import signal
+import sys
+
+from app.core.config import settings
+from app.crud.outbox import outbox as outbox_crud
+from app.database.session import SessionLocal
+from app.services.messaging import messaging_service
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class OutboxDispatcherWorker:
+    """
+    Background worker that drains the outbox table
+    """
+
+    def __init__(self, batch_size: int = None, poll_interval: float = 2, lease_seconds: int = None):
+        """
+        Args:
+            batch_size: Rows claimed per round (default: settings.OUTBOX_BATCH_SIZE)
+            poll_interval: Seconds to wait when the outbox is empty (default: 2)
+            lease_seconds: How long a claim is held before another worker may retry it
+        """
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds or settings.OUTBOX_LEASE_SECONDS
+        self.running = False
+
+    def run_once(self) -> dict:
+        """Claim and deliver one batch. Returns the batch outcome counts."""
+        with SessionLocal() as db:
+            try:
+                batch = outbox_crud.claim_batch(db, limit=self.batch_size, lease_seconds=self.lease_seconds)
+                if not batch:
+                    return {"sent": 0, "retrying": 0, "failed": 0}
+                return messaging_service.deliver_outbox_batch(db, batch)
+            finally:
+                messaging_service.flush_message_log()
+
+    def start(self):
+        """Start the dispatcher loop"""
+        self.running = True
+        logger.info("[Outbox Worker] Starting outbox dispatcher...")
+
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+        while self.running:
+            try:
+                result = self.run_once()
+                delivered = sum(result.values())
+                if delivered:
+                    logger.info(f"[Outbox Worker] Batch done: {result}")
+                if delivered < self.batch_size:
+                    # Queue drained (or nearly); don't spin on an empty table
+                    time.sleep(self.poll_interval)
+            except Exception as e:
+                logger.error(f"[Outbox Worker] Error in dispatch loop: {e}")
+                time.sleep(self.poll_interval)
+
+        logger.info("[Outbox Worker] Outbox dispatcher stopped")
+
+    def stop(self):
+        """Stop the dispatcher loop"""
+        logger.info("[Outbox Worker] Stopping outbox dispatcher...")
+        self.running = False
+
+    def _signal_handler(self, signum, frame):
+        """Handle shutdown signals; the current batch finishes first"""
+        logger.info(f"[Outbox Worker] Received signal {signum}")
+        self.stop()
+
+
+def run_outbox_dispatcher(batch_size: int = None, poll_interval: float = 2):
+    """
+    Run the outbox dispatcher worker
+
+    Usage:
+        python -m app.workers.outbox_dispatcher --batch-size 500
+    """
+    worker = OutboxDispatcherWorker(batch_size=batch_size, poll_interval=poll_interval)
+
+    try:
+        worker.start()
+    except Exception as e:
+        logger.error(f"[Outbox Worker] Fatal error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Outbox Dispatcher Worker")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows claimed per batch")
+    parser.add_argument("--interval", type=float, default=2, help="Idle poll interval in seconds (default: 2)")
+
+    args = parser.parse_args()
+
+    run_outbox_dispatcher(batch_size=args.batch_size, poll_interval=args.interval)
@@ -0,0 +1,64 @@
+"""
+Rebuild the user_daily_activity rollup from played_quizzes.
+
+Works through the range a few days at a time (one DELETE + INSERT ... SELECT
+per batch), so it can run against a live database and be re-run safely.
+
+Usage:
+    python scripts/backfill_daily_activity.py                  # whole play history
+    python scripts/backfill_daily_activity.py --since 2026-01-01 --days-per-batch 7
+"""
+
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+# Add parent dir to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+
+from app.crud.daily_activity import user_daily_activity
+from app.database.session import SessionLocal
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.quiz import PlayedQuiz
+
+
+def backfill(since: date = None, until: date = None, days_per_batch: int = 7) -> int:
+    db = SessionLocal()
+    try:
+        if since is None:
+            first_play = db.query(func.min(PlayedQuiz.created_at)).scalar()
+            if first_play is None:
+                print("No played quizzes, nothing to backfill.")
+                return 0
+            since = first_play.date()
+        until = until or date.today() + timedelta(days=1)
+
+        total = 0
+        start = since
+        while start < until:
+            end = min(start + timedelta(days=days_per_batch), until)
+            rows = user_daily_activity.rebuild(db, start=start, end=end)
+            total += rows
+            print(f"  {start} .. {end - timedelta(days=1)}: {rows} rows")
+            start = end
+
+        print(f"Backfilled {total} user_daily_activity rows.")
+        return total
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild user_daily_activity from played_quizzes")
+    parser.add_argument("--since", type=date.fromisoformat, help="First day to rebuild (default: first play)")
+    parser.add_argument("--until", type=date.fromisoformat, help="Day after the last one to rebuild (default: tomorrow)")
+    parser.add_argument("--days-per-batch", type=int, default=7)
+    args = parser.parse_args()
+    backfill(args.since, args.until, args.days_per_batch)
+
+
+if __name__ == "__main__":
+    main()
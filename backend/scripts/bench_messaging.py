@@ -0,0 +1,130 @@
+"""
+Benchmark: sequential send loop vs. the async dispatcher.
+
+Starts a local fake provider server (Telegram / Discord / WhatsApp / Gmail
+endpoints all answer 200 after a fixed latency), points the strategies at it
+and reports messages per second for both paths.
+
+Usage:
+    python scripts/bench_messaging.py --messages 500 --latency-ms 50 --provider telegram
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent dir to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.models.enums import MessengerType
+from app.services.messaging.dispatcher import AsyncDispatcher, SendJob
+from app.services.messaging.strategies.discord import DiscordStrategy
+from app.services.messaging.strategies.email import EmailStrategy
+from app.services.messaging.strategies.telegram import TelegramStrategy
+from app.services.messaging.strategies.whatsapp import WhatsappStrategy
+from app.services.messaging.transport import HttpTransport
+
+SYNC_STRATEGIES = {
+    MessengerType.TELEGRAM: TelegramStrategy,
+    MessengerType.DISCORD: DiscordStrategy,
+    MessengerType.WHATSAPP: WhatsappStrategy,
+    MessengerType.MAIL: EmailStrategy,
+}
+
+
+def start_fake_provider(latency_ms: int) -> ThreadingHTTPServer:
+    class FakeProviderHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_ms / 1000)
+            body = json.dumps({"ok": True, "id": "1000", "result": {"message_id": 1}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class FakeProviderServer(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 256  # default backlog of 5 resets bursts of new connections
+
+    server = FakeProviderServer(("127.0.0.1", 0), FakeProviderHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def point_settings_at(base_url: str) -> None:
+    settings.TELEGRAM_API_BASE_URL = base_url
+    settings.TELEGRAM_BOT_TOKEN = "bench-token"
+    # The fake provider has no Bot API limits; measure the dispatcher, not the scheduler
+    settings.TELEGRAM_GLOBAL_RATE = 1_000_000
+    settings.DISCORD_API_BASE_URL = base_url
+    settings.DISCORD_BOT_TOKEN = "bench-token"
+    settings.WHATSAPP_API_BASE_URL = base_url
+    settings.WHATSAPP_ACCESS_TOKEN = "bench-token"
+    settings.WHATSAPP_PHONE_NUMBER_ID = "1"
+    settings.GMAIL_API_BASE_URL = base_url
+    settings.GMAIL_ACCESS_TOKEN = "bench-token"
+
+
+def bench_sequential(messenger_type: MessengerType, jobs) -> float:
+    strategy = SYNC_STRATEGIES[messenger_type](HttpTransport())
+    start = time.perf_counter()
+    for job in jobs:
+        strategy.send(job.target, job.text, job.link, extra_data=job.extra_data)
+    return time.perf_counter() - start
+
+
+def bench_async(messenger_type: MessengerType, jobs, concurrency: int) -> float:
+    async def run():
+        async with AsyncDispatcher(concurrency={messenger_type.value: concurrency}) as dispatcher:
+            results = await dispatcher.send_many(messenger_type, jobs)
+        assert all(results), "fake provider rejected a message"
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Messaging throughput benchmark")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency-ms", type=int, default=50, help="Simulated provider latency")
+    parser.add_argument("--concurrency", type=int, default=25, help="Async in-flight limit")
+    parser.add_argument("--provider", choices=[m.value for m in SYNC_STRATEGIES], default="telegram")
+    args = parser.parse_args()
+
+    # Per-message INFO logs would dominate the timings
+    logging.disable(logging.INFO)
+
+    server = start_fake_provider(args.latency_ms)
+    point_settings_at(f"http://127.0.0.1:{server.server_port}")
+
+    messenger_type = MessengerType(args.provider)
+    jobs = [SendJob(str(100000 + i), f"Benchmark message {i}") for i in range(args.messages)]
+
+    sequential = bench_sequential(messenger_type, jobs)
+    concurrent = bench_async(messenger_type, jobs, args.concurrency)
+    server.shutdown()
+
+    print(f"provider={args.provider} messages={args.messages} latency={args.latency_ms}ms concurrency={args.concurrency}")
+    print(f"  sequential loop : {sequential:8.2f}s  {args.messages / sequential:10.1f} msg/s")
+    print(f"  async dispatcher: {concurrent:8.2f}s  {args.messages / concurrent:10.1f} msg/s")
+    print(f"  speedup         : {sequential / concurrent:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
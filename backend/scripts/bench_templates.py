@@ -0,0 +1,88 @@
+"""
+Benchmark: per-recipient message rendering.
+
+Compares the old chained `str.replace` on custom text, an inline f-string and
+the compiled template's `render_many` for the same rows (best of --repeat runs).
+
+Usage:
+    python scripts/bench_templates.py --rows 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent dir to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.messaging.templates import PLAY_FOOTER, compile_custom_text, templates
+
+CUSTOM_TEXT = "Hi {username}! You have {total_score} points in {package_name}. Keep going!"
+
+
+def bench_replace(rows) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        CUSTOM_TEXT.replace("{total_score}", str(row["total_score"])) \
+                   .replace("{username}", str(row["username"])) \
+                   .replace("{package_name}", str(row["package_name"]))
+    return time.perf_counter() - start
+
+
+def bench_fstring(rows) -> float:
+    start = time.perf_counter()
+    [f"Hi {row['username']}! You have {row['total_score']} points in {row['package_name']}. Keep going!" for row in rows]
+    return time.perf_counter() - start
+
+
+def bench_compiled(rows) -> float:
+    start = time.perf_counter()
+    compile_custom_text(CUSTOM_TEXT).render_many(rows)
+    return time.perf_counter() - start
+
+
+def bench_scenario_fstring(rows) -> float:
+    start = time.perf_counter()
+    [f"আপনার আজকের দুটি রাউন্ড সফল ভাবে সম্পন্ন হয়েছে। আজকে আপনার সর্বোচ্চ স্কোর {row['max_score']}" + PLAY_FOOTER for row in rows]
+    return time.perf_counter() - start
+
+
+def bench_scenario_compiled(rows) -> float:
+    start = time.perf_counter()
+    templates.render_many("scenario.daily_score_update", rows)
+    return time.perf_counter() - start
+
+
+def best_of(bench, rows, repeat: int) -> float:
+    return min(bench(rows) for _ in range(repeat))
+
+
+def report(label: str, seconds: float, rows: int) -> None:
+    print(f"  {label:<22}: {seconds * 1e6 / rows:7.3f} us/recipient  {seconds * 1000:9.1f} ms total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template rendering benchmark")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5, help="Report the best of this many runs")
+    args = parser.parse_args()
+
+    custom_rows = [
+        {"total_score": i % 997, "username": f"user{i}", "package_name": "Quizard Daily"}
+        for i in range(args.rows)
+    ]
+    scenario_rows = [{"max_score": i % 997} for i in range(args.rows)]
+
+    print(f"rows={args.rows}")
+    print("custom_text:")
+    report("chained str.replace", best_of(bench_replace, custom_rows, args.repeat), args.rows)
+    report("f-string", best_of(bench_fstring, custom_rows, args.repeat), args.rows)
+    report("compiled render_many", best_of(bench_compiled, custom_rows, args.repeat), args.rows)
+    print("scenario.daily_score_update:")
+    report("f-string", best_of(bench_scenario_fstring, scenario_rows, args.repeat), args.rows)
+    report("compiled render_many", best_of(bench_scenario_compiled, scenario_rows, args.repeat), args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark: UNSUBSCRIBED_REMINDER audience, per-user loop vs. set-based query.
+
+Seeds a throwaway database with users, subscriptions and user_subscribed rows,
+then times the old N+1 loop (all users + one subscription query per user)
+against crud.user.iter_unsubscribed_platforms and checks both return the same
+(user_id, platform) pairs.
+
+Usage:
+    python scripts/bench_unsubscribed_audience.py --users 100000
+    python scripts/bench_unsubscribed_audience.py --database-url mysql+pymysql://... --users 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Add parent dir to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import user as user_crud
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.enums import PlatformType
+from app.models.quiz import UserSubscribed
+from app.models.subscription import Subscription
+from app.models.user import User
+from app.utils.helpers import chunked
+
+INSERT_BATCH = 5000
+
+
+def seed(engine, users: int) -> None:
+    rng = random.Random(42)
+    today = date.today()
+    created = datetime.combine(today - timedelta(days=30), datetime.min.time())
+
+    with engine.begin() as conn:
+        # MySQL indexes foreign keys implicitly; mirror that on SQLite
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("CREATE INDEX IF NOT EXISTS bench_user_subscribed_user_id ON user_subscribed (user_id)"))
+
+        subs = [
+            {"id": i + 1, "name": f"{platform.value} package {i}", "platform": platform.name}
+            for i, platform in enumerate(PlatformType)
+        ]
+        conn.execute(insert(Subscription.__table__), subs)
+
+        user_rows = (
+            {
+                "id": i,
+                "username": f"01{700000000 + i}",
+                "quizard": rng.random() < 0.8,
+                "wordly": rng.random() < 0.4,
+                "arcaderush": rng.random() < 0.2,
+                # A few users registered today are excluded
+                "created_at": created if i % 100 else datetime.combine(today, datetime.min.time()) + timedelta(hours=1),
+            }
+            for i in range(1, users + 1)
+        )
+        for batch in chunked(user_rows, INSERT_BATCH):
+            conn.execute(insert(User.__table__), batch)
+
+        sub_rows = []
+        next_id = 1
+        for user_id in range(1, users + 1):
+            # ~30% of users hold a subscription, some already expired
+            if rng.random() < 0.3:
+                sub = rng.choice(subs)
+                end = today + timedelta(days=rng.randint(-5, 10))
+                sub_rows.append({"id": next_id, "user_id": user_id, "subs_id": sub["id"],
+                                 "start_date": created, "end_date": datetime.combine(end, datetime.min.time())})
+                next_id += 1
+        for batch in chunked(sub_rows, INSERT_BATCH):
+            conn.execute(insert(UserSubscribed.__table__), batch)
+
+
+def legacy_audience(db, today: date):
+    """The pre-refactor loop from MessagingService.iter_scenario_recipients."""
+    platform_attrs = {"quizard": PlatformType.QUIZARD, "wordly": PlatformType.WORDLY, "arcaderush": PlatformType.ARCADERUSH}
+    result = []
+    for user in db.query(User).all():
+        if not (today - user.created_at.date()).days > 0:
+            continue
+        registered = {platform for attr, platform in platform_attrs.items() if getattr(user, attr, False)}
+        if not registered:
+            continue
+        subscribed = {
+            row.platform
+            for row in db.query(Subscription.platform)
+            .join(UserSubscribed, Subscription.id == UserSubscribed.subs_id)
+            .filter(UserSubscribed.user_id == user.id)
+            .filter(UserSubscribed.end_date >= today)
+            .distinct().all()
+        }
+        result.extend((user.id, platform) for platform in registered - subscribed)
+    return result
+
+
+def set_based_audience(db, today: date, chunk_size: int):
+    result = []
+    for batch in user_crud.iter_unsubscribed_platforms(db, today=today, chunk_size=chunk_size):
+        result.extend(batch)
+    return result
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UNSUBSCRIBED_REMINDER audience benchmark")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--database-url", help="Empty database to seed (default: temporary SQLite file)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the set-based query")
+    args = parser.parse_args()
+
+    tmp = None
+    url = args.database_url
+    if not url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        url = f"sqlite:///{tmp.name}"
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    _, seed_time = timed(seed, engine, args.users)
+    Session = sessionmaker(bind=engine)
+    today = date.today()
+
+    print(f"users={args.users} chunk_size={args.chunk_size} backend={engine.dialect.name} (seeded in {seed_time:.1f}s)")
+
+    with Session() as db:
+        new, new_time = timed(set_based_audience, db, today, args.chunk_size)
+    print(f"  set-based query : {new_time:8.2f}s  {len(new)} reminders")
+
+    if not args.skip_legacy:
+        with Session() as db:
+            old, old_time = timed(legacy_audience, db, today)
+        print(f"  per-user loop   : {old_time:8.2f}s  {len(old)} reminders")
+        print(f"  speedup         : {old_time / new_time:8.1f}x")
+        assert sorted(old) == sorted(new), "audiences differ"
+        print("  audiences match")
+
+    engine.dispose()
+    if tmp:
+        os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
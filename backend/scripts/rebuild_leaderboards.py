@@ -0,0 +1,39 @@
+"""
+Rehydrate the score leaderboards from played_quizzes.
+
+Recomputes SUM(score) per user for the global board and every subscription
+board, and swaps each board in atomically. Run after deploying, after a Redis
+flush, or whenever increments may have been lost while Redis was down.
+
+Usage:
+    python scripts/rebuild_leaderboards.py
+"""
+
+import os
+import sys
+
+# Add parent dir to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.session import SessionLocal
+from app.models import *  # noqa: F401,F403 - register every table
+from app.services.leaderboard import LeaderboardNotBuilt, leaderboard_service
+
+
+def rebuild() -> dict:
+    db = SessionLocal()
+    try:
+        boards = leaderboard_service.rebuild(db)
+        for board, entries in sorted(boards.items()):
+            print(f"  {board}: {entries} players")
+        print(f"Rebuilt {len(boards)} leaderboards.")
+        return boards
+    except LeaderboardNotBuilt:
+        print("Another process is rebuilding the leaderboards; nothing to do.")
+        return {}
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -1 +1,15 @@
 # Pytest configuration placeholder
+import os
+
+# Keep leaderboards in-process; there is no Redis under test
+os.environ.setdefault("LEADERBOARD_BACKEND", "memory")
+os.environ.setdefault("TELEGRAM_RATE_BACKEND", "memory")
+
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(type_, compiler, **kw):
+    # SQLite only autoincrements INTEGER PRIMARY KEY columns
+    return "INTEGER"
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_users(db, ids, **flags):
+    db.add_all(User(id=i, username=f"user{i}", email=f"user{i}@example.com", **flags) for i in ids)
+    db.commit()
+
+
+def count_user_selects(db):
+    selects = []
+
+    def capture(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            selects.append(statement)
+
+    event.listen(db.connection(), "before_cursor_execute", capture)
+    return selects
+
+
+def test_full_last_page_ends_on_an_empty_page(db):
+    add_users(db, range(1, 7))
+    selects = count_user_selects(db)
+
+    batches = list(crud.user.iter_audience(db, batch_size=3))
+
+    assert batches == [[(1,), (2,), (3,)], [(4,), (5,), (6,)]]
+    # Two full pages, then one empty page confirms the end
+    assert len(selects) == 3
+
+
+def test_gaps_in_ids_keep_pages_full(db):
+    ids = [2, 3, 10, 11, 57, 58, 400, 1000, 1001, 99999]
+    add_users(db, ids)
+
+    batches = list(crud.user.iter_audience(db, columns=(User.email,), batch_size=4))
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert [row[0] for batch in batches for row in batch] == ids
+    assert batches[0][0] == (2, "user2@example.com")
+
+
+def test_filters_apply_on_every_page(db):
+    add_users(db, range(1, 21), quizard=False)
+    add_users(db, range(21, 31), quizard=True)
+    add_users(db, range(31, 41), quizard=False)
+    add_users(db, range(41, 46), quizard=True)
+
+    batches = list(crud.user.iter_audience(db, filters=(User.quizard == True,), batch_size=4))  # noqa: E712
+
+    # Non-matching users before, between and after never show up, and
+    # non-matching ids don't eat into a page
+    assert [row[0] for batch in batches for row in batch] == [*range(21, 31), *range(41, 46)]
+    assert [len(batch) for batch in batches] == [4, 4, 4, 3]
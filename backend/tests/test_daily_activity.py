@@ -0,0 +1,89 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.crud.daily_activity import Play
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.daily_activity import UserDailyActivity
+from app.schemas.quiz import PlayedQuizCreate
+
+TODAY = datetime.combine(date.today(), datetime.min.time())
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([User(id=1, username="01700000001"), User(id=2, username="01700000002"), Subscription(id=7, name="Quiz")])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def rollup(db):
+    return {
+        (row.day, row.user_id, row.subs_id): (row.rounds, row.max_score, row.sum_score, row.last_played_at)
+        for row in db.query(UserDailyActivity)
+    }
+
+
+def test_quiz_create_updates_rollup(db):
+    plays = [
+        (1, 7, 4, TODAY + timedelta(hours=9)),
+        (1, 7, 9, TODAY + timedelta(hours=10)),
+        (1, 7, 6, TODAY + timedelta(hours=11)),
+        (1, None, 3, TODAY + timedelta(hours=12)),
+        (2, 7, 5, TODAY - timedelta(hours=1)),
+    ]
+    for user_id, subs_id, score, played_at in plays:
+        crud.quiz.create(db, obj_in=PlayedQuizCreate(user_id=user_id, subs_id=subs_id, score=score, created_at=played_at))
+
+    yesterday = (TODAY - timedelta(days=1)).date()
+    assert rollup(db) == {
+        (TODAY.date(), 1, 7): (3, 9, 19, TODAY + timedelta(hours=11)),
+        (TODAY.date(), 1, 0): (1, 3, 3, TODAY + timedelta(hours=12)),
+        (yesterday, 2, 7): (1, 5, 5, TODAY - timedelta(hours=1)),
+    }
+
+
+def test_record_plays_merges_with_existing_rows(db):
+    crud.user_daily_activity.record_plays(db, plays=[Play(1, 7, TODAY + timedelta(hours=8), 5)])
+    crud.user_daily_activity.record_plays(db, plays=[
+        Play(1, 7, TODAY + timedelta(hours=6), 2),
+        Play(1, 7, TODAY + timedelta(hours=7), None),
+    ])
+    db.commit()
+
+    assert rollup(db) == {(TODAY.date(), 1, 7): (3, 5, 7, TODAY + timedelta(hours=8))}
+
+
+def test_record_plays_merges_without_a_native_upsert(db):
+    # Dialects other than MySQL/SQLite/PostgreSQL take the generic select-then-write path
+    db.get_bind().dialect.name = "generic"
+    crud.user_daily_activity.record_plays(db, plays=[Play(1, 7, TODAY + timedelta(hours=8), None)])
+    crud.user_daily_activity.record_plays(db, plays=[
+        Play(1, 7, TODAY + timedelta(hours=6), 2),
+        Play(1, 7, TODAY + timedelta(hours=9), 4),
+        Play(2, None, TODAY + timedelta(hours=7), 1),
+    ])
+    db.commit()
+
+    assert rollup(db) == {
+        (TODAY.date(), 1, 7): (3, 4, 6, TODAY + timedelta(hours=9)),
+        (TODAY.date(), 2, 0): (1, 1, 1, TODAY + timedelta(hours=7)),
+    }
+
+
+def test_rebuild_matches_incremental_rollup(db):
+    for hours, score in [(1, 4), (2, 8), (26, 1), (-3, 6)]:
+        crud.quiz.create(db, obj_in=PlayedQuizCreate(user_id=1, subs_id=7, score=score, created_at=TODAY + timedelta(hours=hours)))
+    incremental = rollup(db)
+
+    crud.user_daily_activity.rebuild(db, start=date.today() - timedelta(days=1), end=date.today() + timedelta(days=2))
+    assert rollup(db) == incremental
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.enums import MessengerType
+from app.schemas.quiz import PlayedQuizCreate
+from app.services.messaging import messaging_service
+from app.services.messaging.daily_check import WINNING_THRESHOLD, load_score_totals, potential_score, winning_potential_mask
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Messenger(id=1, telegram={"chat_id": 111}),
+        Messenger(id=2, discord={"user_id": "42"}),
+        User(id=1, username="u1", messenger_id=1, email="u1@example.com"),   # 5 quizzes, 49 points: cannot win
+        User(id=2, username="u2", phone_number="01700000002"),              # 5 quizzes, 50 points
+        User(id=3, username="u3", messenger_id=2),                          # 2 quizzes, 15 points: 45 possible
+        User(id=4, username="u4", email="u4@example.com"),                  # 4 quizzes, 40 points: 50 possible
+        User(id=5, username="u5"),                                          # never played, no contact
+    ])
+    session.commit()
+    for user_id, scores in {1: [10, 10, 10, 10, 9], 2: [10] * 5, 3: [5, 10], 4: [10] * 4}.items():
+        for score in scores:
+            crud.quiz.create(session, obj_in=PlayedQuizCreate(user_id=user_id, score=score, created_at=datetime.now()))
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_mask_matches_per_user_rule():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 80, 1000)
+    counts = rng.integers(0, 9, 1000)
+    expected = [potential_score(int(s), int(c)) >= WINNING_THRESHOLD for s, c in zip(scores, counts)]
+    assert winning_potential_mask(scores, counts).tolist() == expected
+
+
+def test_bulk_check_notifies_eligible_users_only(db, monkeypatch):
+    user_ids, scores, counts = load_score_totals(db)
+    assert user_ids.tolist() == [1, 2, 3, 4, 5]
+    assert scores.tolist() == [49, 50, 15, 40, 0]
+    assert counts.tolist() == [5, 5, 2, 4, 0]
+
+    delivered = {}
+
+    def deliver(db, messenger_type, recipients, source=None):
+        delivered.setdefault(messenger_type, []).extend(recipients)
+        return len(recipients)
+
+    monkeypatch.setattr(messaging_service, "_deliver", deliver)
+    result = messaging_service.process_daily_check_bulk(db, chunk_size=2)
+
+    assert {t: [r.user_id for r in rs] for t, rs in delivered.items()} == {
+        MessengerType.WHATSAPP: [2],
+        MessengerType.MAIL: [4],
+    }
+    assert delivered[MessengerType.MAIL][0].text == "You are doing great! You have 40 points. You need 10 more to win!"
+    assert result["checked_count"] == 5
+    assert result["eligible_count"] == 3   # users 2, 4 and 5
+    assert result["unreachable_count"] == 1
+    assert result["processed_count"] == 2
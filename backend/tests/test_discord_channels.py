@@ -0,0 +1,121 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.services.messaging.discord_channels import DiscordChannelCache
+from app.services.messaging.strategies import discord as discord_strategy
+from app.services.messaging.strategies.discord import DiscordStrategy
+from app.services.messaging.transport import HttpTransport
+
+
+class FakeDiscordAPI(ThreadingHTTPServer):
+    """Local stand-in for discord.com that records every call."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.calls = []              # request paths, in order
+        self.stale_channels = set()  # channel ids answered with 404
+        self.next_channel = 100
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), FakeDiscordHandler)
+
+
+class FakeDiscordHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        with server.lock:
+            server.calls.append(self.path)
+            if self.path == "/users/@me/channels":
+                server.next_channel += 1
+                status, reply = 200, {"id": str(server.next_channel)}
+            elif self.path.split("/")[2] in server.stale_channels:
+                status, reply = 404, {"message": "Unknown Channel"}
+            else:
+                status, reply = 200, {"id": "1"}
+
+        data = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def discord_api(monkeypatch):
+    server = FakeDiscordAPI()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "DISCORD_API_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(settings, "DISCORD_BOT_TOKEN", "test-token")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = DiscordChannelCache(maxsize=100)
+    monkeypatch.setattr(discord_strategy, "dm_channel_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def strategy():
+    transport = HttpTransport()
+    yield DiscordStrategy(transport)
+    transport.close()
+
+
+def dm_request(messenger_id=None):
+    return {"user_id": "555", "messenger_id": messenger_id, "create_dm": True}
+
+
+def test_cached_channel_skips_opening_dm(discord_api, cache, strategy):
+    assert strategy.send(None, "first", extra_data=dm_request())
+    assert strategy.send(None, "second", extra_data=dm_request())
+
+    assert discord_api.calls == ["/users/@me/channels", "/channels/101/messages", "/channels/101/messages"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_channel_is_invalidated_and_reopened(discord_api, cache, strategy):
+    cache.put("555", "99")
+    discord_api.stale_channels.add("99")
+
+    assert strategy.send("99", "hello", extra_data={"user_id": "555", "create_dm": False})
+
+    assert discord_api.calls == ["/channels/99/messages", "/users/@me/channels", "/channels/101/messages"]
+    assert cache.get("555") == "101"
+    assert cache.stats()["invalidated"] == 1
+
+
+def test_flush_writes_opened_channels_back(discord_api, cache, strategy):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Messenger(id=1, discord={"user_id": "555"}))
+    db.commit()
+
+    assert strategy.send(None, "hello", extra_data=dm_request(messenger_id=1))
+    assert cache.stats()["pending"] == 1
+    assert cache.flush(db) == 1
+
+    db.expire_all()
+    assert db.get(Messenger, 1).discord == {"user_id": "555", "dm_channel_id": "101"}
+    assert cache.stats()["pending"] == 0
+    db.close()
+    engine.dispose()
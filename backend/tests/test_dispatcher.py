@@ -0,0 +1,96 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.messaging.dispatcher import AsyncDispatcher, run_sync
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        self.connections = set()
+        super().__init__(("127.0.0.1", 0), CountingHandler)
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = CountingServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_runs_share_one_keep_alive_transport(server):
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    async def one_run():
+        async with AsyncDispatcher() as dispatcher:
+            await dispatcher.transport.get(url)
+            return dispatcher.transport
+
+    first = run_sync(one_run())
+    second = run_sync(one_run())
+
+    assert first is second
+    assert len(server.connections) == 1
+
+
+def test_bulk_send_keeps_db_work_off_the_messaging_loop(monkeypatch):
+    from app.models.enums import MessengerType
+    from app.services.messaging import service as service_module
+    from app.services.messaging.recipients import Recipient
+
+    threads = []
+
+    class RecordingStrategy:
+        def __init__(self, transport):
+            pass
+
+        async def send(self, target, text, link=None, extra_data=None):
+            threads.append(("send", threading.current_thread().name))
+            return True
+
+    def load_contacts(db, user_ids):
+        threads.append(("contacts", threading.current_thread().name))
+        return {user_id: None for user_id in user_ids}
+
+    def audience():
+        for user_id in range(1, 6):
+            threads.append(("audience", threading.current_thread().name))
+            yield Recipient(user_id, "hi", to=f"u{user_id}@example.com")
+
+    class Log:
+        def add(self, *args):
+            threads.append(("log", threading.current_thread().name))
+
+        def flush(self):
+            threads.append(("log", threading.current_thread().name))
+
+    monkeypatch.setitem(service_module.ASYNC_STRATEGIES, MessengerType.MAIL, RecordingStrategy)
+    monkeypatch.setattr(service_module, "load_contacts", load_contacts)
+    service = service_module.MessagingService()
+    service.message_log = Log()
+
+    results = service.send_messages(None, MessengerType.MAIL, audience(), chunk_size=2)
+
+    assert results == [True] * 5
+    caller = threading.current_thread().name
+    assert {name for kind, name in threads if kind == "send"} == {"messaging-loop"}
+    assert {name for kind, name in threads if kind != "send"} == {caller}
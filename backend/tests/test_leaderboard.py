@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.quiz import PlayedQuiz
+from app.schemas.quiz import PlayedQuizCreate
+from app.services.leaderboard import LeaderboardService, LeaderboardNotBuilt, LeaderboardUnavailable, MemoryLeaderboardStore, leaderboard_service
+from app.services.messaging import service as messaging
+
+SCORES = [
+    # user_id, subs_id, score
+    (1, 7, 10), (2, 7, 30), (3, 7, 20), (1, 7, 15),
+    (4, 8, 50), (2, None, 5), (5, 7, 0),
+]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([User(id=i, username=f"0170000000{i}") for i in range(1, 6)])
+    session.add_all([Subscription(id=7, name="Quiz"), Subscription(id=8, name="Wordly")])
+    session.commit()
+    leaderboard_service.store.clear()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_memory_store_ranks():
+    service = LeaderboardService(MemoryLeaderboardStore())
+    for user_id, subs_id, score in SCORES:
+        service.record_play(user_id, subs_id, score)
+
+    assert service.top(7, 3) == [(2, 30), (1, 25), (3, 20)]
+    assert service.rank_range(7, 2, 3) == [(1, 25), (3, 20)]
+    assert service.user_rank(7, 3) == (3, 20)
+    assert service.user_rank(7, 5) is None  # zero scores are not recorded
+    assert service.user_rank(None, 4) == (1, 50)
+    assert service.top(None, 10) == [(4, 50), (2, 35), (1, 25), (3, 20)]
+
+    service.record_play(3, 7, 11)
+    assert service.top(7, 1) == [(3, 31)]
+    assert service.user_rank(7, 2) == (2, 30)
+
+
+def test_quiz_create_and_rebuild_agree(db):
+    for user_id, subs_id, score in SCORES:
+        quiz = crud.quiz.create(db, obj_in=PlayedQuizCreate(user_id=user_id, subs_id=subs_id, score=score))
+        leaderboard_service.record_play(quiz.user_id, quiz.subs_id, quiz.score)
+    incremental = {board: leaderboard_service.store.range(board, 0, -1) for board in ("global", "subs:7", "subs:8")}
+
+    leaderboard_service.store.incr("subs:99", {1: 1})  # stale board
+    assert leaderboard_service.rebuild(db) == {"global": 4, "subs:7": 3, "subs:8": 1, "subs:99": 0}
+    rebuilt = {board: leaderboard_service.store.range(board, 0, -1) for board in ("global", "subs:7", "subs:8")}
+
+    assert rebuilt == incremental
+    assert leaderboard_service.top(99, 10) == []
+
+
+def test_top_players_falls_back_to_sql(db, monkeypatch):
+    db.add_all([PlayedQuiz(user_id=u, subs_id=s, score=sc, created_at=datetime.now() - timedelta(hours=1)) for u, s, sc in SCORES])
+    db.commit()
+    leaderboard_service.rebuild(db)
+    from_engine = messaging.top_players(db, 7, 0, 3)
+
+    def unavailable(*args):
+        raise LeaderboardUnavailable("connection refused")
+
+    monkeypatch.setattr(leaderboard_service, "rank_range", unavailable)
+    from_sql = messaging.top_players(db, 7, 0, 3)
+
+    assert from_engine == from_sql
+    assert [(p.username, p.total_score) for p in from_engine] == [("01700000002", 30), ("01700000001", 25), ("01700000003", 20)]
+
+
+def test_crud_create_leaves_the_boards_to_the_caller(db):
+    crud.quiz.create(db, obj_in=PlayedQuizCreate(user_id=1, subs_id=7, score=10))
+
+    assert leaderboard_service.store.boards() == []
+
+
+def test_lost_boards_are_rebuilt_before_ranking(db):
+    db.add_all([PlayedQuiz(user_id=u, subs_id=s, score=sc, created_at=datetime.now() - timedelta(hours=1)) for u, s, sc in SCORES])
+    db.commit()
+    # Redis was flushed: only scores recorded since then are on the board
+    leaderboard_service.record_play(3, 7, 1)
+
+    ranked = messaging.top_players(db, 7, 0, 3)
+
+    assert [(p.id, p.total_score) for p in ranked] == [(2, 30), (1, 25), (3, 20)]
+    assert leaderboard_service.store.is_built()
+
+
+def test_ranking_uses_sql_while_another_caller_rebuilds(db, monkeypatch):
+    db.add_all([PlayedQuiz(user_id=u, subs_id=s, score=sc, created_at=datetime.now() - timedelta(hours=1)) for u, s, sc in SCORES])
+    db.commit()
+
+    # Another process holds the rebuild lock
+    leaderboard_service.store.acquire_rebuild("other", 60)
+    try:
+        with pytest.raises(LeaderboardNotBuilt):
+            leaderboard_service.ensure_built(db)
+        ranked = messaging.top_players(db, 7, 0, 3)
+    finally:
+        leaderboard_service.store.release_rebuild("other")
+
+    assert [(p.id, p.total_score) for p in ranked] == [(2, 30), (1, 25), (3, 20)]
+    assert not leaderboard_service.store.is_built()
+
+
+def test_scores_recorded_during_a_rebuild_are_kept(db):
+    db.add_all([PlayedQuiz(user_id=u, subs_id=s, score=sc, created_at=datetime.now() - timedelta(hours=1)) for u, s, sc in SCORES])
+    db.commit()
+
+    class RacingStore(MemoryLeaderboardStore):
+        def boards(self):
+            # Runs after the aggregate query and before the boards are swapped in
+            quiz = crud.quiz.create(db, obj_in=PlayedQuizCreate(user_id=3, subs_id=7, score=40))
+            service.record_play(quiz.user_id, quiz.subs_id, quiz.score)
+            return super().boards()
+
+    service = LeaderboardService(RacingStore())
+    service.rebuild(db)
+    service.record_play(1, 7, 1)
+
+    assert service.top(7, 3) == [(3, 60), (2, 30), (1, 26)]
+    assert service.user_rank(None, 3) == (1, 60)
+
+
+def test_rebuild_refuses_while_another_process_holds_the_lock(db):
+    store = MemoryLeaderboardStore()
+    service = LeaderboardService(store)
+    assert store.acquire_rebuild("other", 60)
+
+    with pytest.raises(LeaderboardNotBuilt):
+        service.rebuild(db)
+
+    store.release_rebuild("other")
+    service.rebuild(db)
+    assert store.is_built()
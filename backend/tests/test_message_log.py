@@ -0,0 +1,62 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.enums import MessengerType
+from app.services.messaging.message_log import MessageLogWriter
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def logged_texts(session_factory):
+    with session_factory() as db:
+        return [text for (text,) in db.query(Message.text).order_by(Message.id)]
+
+
+def test_size_threshold_flushes_on_own_session(session_factory):
+    writer = MessageLogWriter(flush_size=3, flush_interval_ms=60000, session_factory=session_factory)
+    for i in range(3):
+        writer.add(MessengerType.TELEGRAM, f"msg {i}")
+
+    assert logged_texts(session_factory) == ["msg 0", "msg 1", "msg 2"]
+    assert writer.stats()["pending"] == 0
+    writer.close()
+
+
+def test_timer_flushes_once_traffic_stops(session_factory):
+    writer = MessageLogWriter(flush_size=500, flush_interval_ms=50, session_factory=session_factory)
+    writer.add(MessengerType.MAIL, "lonely row")
+
+    deadline = time.monotonic() + 2
+    while writer.stats()["flushed"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert logged_texts(session_factory) == ["lonely row"]
+    writer.close()
+
+
+def test_failed_flush_leaves_caller_session_alone(session_factory):
+    caller = session_factory()
+    caller.add(User(username="pending-user"))
+
+    # A NOT NULL violation makes the log insert fail
+    writer = MessageLogWriter(flush_size=500, flush_interval_ms=60000, session_factory=session_factory)
+    writer.add(MessengerType.MAIL, None)
+    assert writer.flush() == 0
+    assert writer.stats()["dropped"] == 1
+
+    caller.commit()
+    assert caller.query(User).filter(User.username == "pending-user").count() == 1
+    caller.close()
+    writer.close()
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.utils.helpers import normalize_msisdn
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1712345678", "1712345678"),
+    ("01712345678", "1712345678"),
+    ("8801712345678", "1712345678"),
+    ("+8801712345678", "1712345678"),
+    ("+880 1712-345678", "1712345678"),
+    ("  01712345678 ", "1712345678"),
+    (1712345678, "1712345678"),
+    # 880 is only a country code on a full 13-digit number
+    ("880123", "880123"),
+    ("0", None),
+    ("", None),
+    (None, None),
+    ("arcade_hero", None),
+    ("017abc45678", None),
+    ("1234567890123456", None),
+])
+def test_normalize_msisdn(value, expected):
+    assert normalize_msisdn(value) == expected
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_resolve_msisdns_maps_every_spelling_to_one_user(db):
+    db.add_all([
+        User(id=1, username="01712345678"),
+        User(id=2, username="1812000000"),
+        User(id=3, username="arcade_hero"),
+    ])
+    db.commit()
+
+    resolved = crud.user.resolve_msisdns(db, msisdns=[
+        "01712345678", "1712345678", "8801712345678", "+8801712345678",
+        "01812000000", "arcade_hero", "01999999999", "ghost", None,
+    ])
+
+    assert resolved == {
+        "01712345678": 1, "1712345678": 1, "8801712345678": 1, "+8801712345678": 1,
+        "01812000000": 2,
+        "arcade_hero": 3,
+    }
+
+
+def test_resolve_msisdns_prefers_exact_username_then_oldest(db):
+    # Two accounts registered with different spellings of one number
+    db.add_all([User(id=5, username="1712345678"), User(id=9, username="01712345678")])
+    db.commit()
+
+    resolved = crud.user.resolve_msisdns(db, msisdns=["01712345678", "1712345678", "8801712345678"])
+
+    assert resolved == {"01712345678": 9, "1712345678": 5, "8801712345678": 5}
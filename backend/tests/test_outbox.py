@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.crud.outbox import outbox as outbox_crud
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.enums import MessageScenarioType, MessengerType, NotificationContextType, OutboxStatus
+from app.models.outbox import OutboxMessage
+from app.models.send_ledger import ScenarioSendLedger
+from app.services.messaging import messaging_service
+from app.services.messaging.recipients import Recipient
+from app.utils.helpers import utcnow
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def enqueue(db, count):
+    return outbox_crud.enqueue_many(db, rows=[
+        {"user_id": None, "messenger_type": MessengerType.TELEGRAM, "target": str(i), "text": f"msg {i}"}
+        for i in range(count)
+    ])
+
+
+def rows_by_id(db):
+    db.expire_all()
+    return {row.id: row for row in db.query(OutboxMessage)}
+
+
+def test_claim_leases_rows_until_expiry(db):
+    enqueue(db, 3)
+
+    first = outbox_crud.claim_batch(db, limit=2, lease_seconds=300)
+    second = outbox_crud.claim_batch(db, limit=10, lease_seconds=300)
+
+    assert [m.id for m in first] == [1, 2]
+    assert [m.id for m in second] == [3]
+    assert outbox_crud.claim_batch(db, limit=10, lease_seconds=300) == []
+    row = rows_by_id(db)[1]
+    assert row.status == OutboxStatus.SENDING and row.attempts == 1
+    assert row.available_at > utcnow() + timedelta(seconds=290)
+
+    # The worker holding row 1 died: once the lease runs out it is claimable again
+    db.execute(update(OutboxMessage).where(OutboxMessage.id == 1).values(available_at=utcnow() - timedelta(seconds=1)))
+    db.commit()
+    reclaimed = outbox_crud.claim_batch(db, limit=10, lease_seconds=300)
+    assert [(m.id, m.attempts) for m in reclaimed] == [(1, 2)]
+
+
+def test_claim_locks_with_skip_locked():
+    statement = outbox_crud.claim_statement(limit=10, now=utcnow())
+    sql = str(statement.compile(dialect=mysql.dialect()))
+    assert sql.rstrip().endswith("FOR UPDATE SKIP LOCKED")
+
+
+def test_mark_sent_and_failed_with_backoff(db):
+    enqueue(db, 3)
+    claimed = outbox_crud.claim_batch(db, limit=3, lease_seconds=300)
+    exhausted = claimed[2]._replace(attempts=5)
+
+    assert outbox_crud.mark_sent(db, ids=[claimed[0].id]) == 1
+    before = utcnow()
+    dead = outbox_crud.mark_failed(db, rows=[claimed[1], exhausted], max_attempts=5, retry_delay_seconds=60, error="boom")
+
+    assert dead == 1
+    rows = rows_by_id(db)
+    assert rows[1].status == OutboxStatus.SENT
+    assert rows[2].status == OutboxStatus.PENDING and rows[2].last_error == "boom"
+    # Backoff is retry_delay_seconds x attempts (1 so far)
+    assert before + timedelta(seconds=59) <= rows[2].available_at <= utcnow() + timedelta(seconds=61)
+    assert rows[3].status == OutboxStatus.FAILED
+
+
+def test_scenario_outbox_rows_and_ledger_commit_together(db, monkeypatch):
+    monkeypatch.setattr(settings, "MESSAGING_USE_OUTBOX", True)
+
+    def broken_enqueue_many(*args, **kwargs):
+        raise RuntimeError("outbox down")
+
+    monkeypatch.setattr(outbox_crud, "enqueue_many", broken_enqueue_many)
+    recipients = [Recipient(1, "hi"), Recipient(2, "hi")]
+
+    with pytest.raises(RuntimeError):
+        messaging_service.send_scenario_recipients(db, MessageScenarioType.DAILY_REFERRAL_PROMO, MessengerType.TELEGRAM, recipients)
+
+    assert db.query(OutboxMessage).count() == 0
+    # The ledger claims rolled back with the failed enqueue
+    assert db.query(ScenarioSendLedger).count() == 0
+
+
+def test_channel_posts_go_through_the_outbox(db, monkeypatch):
+    monkeypatch.setattr(settings, "MESSAGING_USE_OUTBOX", True)
+    monkeypatch.setattr(settings, "TELEGRAM_CHANNEL_ID", "@quizard")
+
+    result = messaging_service.send_contextual_messages(db, NotificationContextType.CHANNEL_PROMO, MessengerType.TELEGRAM)
+
+    assert result["processed_count"] == 1
+    (row,) = db.query(OutboxMessage).all()
+    assert (row.target, row.user_id, row.link) == ("@quizard", None, "https://subscribe-here.com")
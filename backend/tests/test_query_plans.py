@@ -0,0 +1,161 @@
+import importlib.util
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.daily_activity import user_daily_activity
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.enums import MessageScenarioType
+from app.models.messenger import Message
+from app.models.quiz import UserSubscribed
+from app.models.subscription import Subscription
+from app.services.messaging import messaging_service
+from app.utils.helpers import day_range
+
+MIGRATION = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "e5b7c2d4f910_add_hot_path_indexes.py"
+
+NEW_INDEXES = {
+    "played_quizzes": ["ix_played_quizzes_created_at_user_id_subs_id", "ix_played_quizzes_user_id_created_at"],
+    "user_subscribed": ["ix_user_subscribed_user_id_subs_id", "ix_user_subscribed_end_date"],
+    "messages": ["ix_messages_user_id_time"],
+    "subscriptions": ["ix_subscriptions_name"],
+}
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("hot_path_indexes", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def engine():
+    """Schema as it was before the migration, with duplicate links to clean up, then upgraded."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    now = datetime.now()
+
+    with engine.begin() as conn:
+        for indexes in NEW_INDEXES.values():
+            for name in indexes:
+                conn.execute(text(f"DROP INDEX {name}"))
+
+        conn.execute(text("INSERT INTO subscriptions (id, name, created_at, modified_at) VALUES (1, 'Quiz', :now, :now)"), {"now": now})
+        conn.execute(text("INSERT INTO users (id, username, created_at, modified_at) VALUES (1, '01700000001', :now, :now)"), {"now": now})
+        for link_id, end_date in [(1, now - timedelta(days=3)), (2, now + timedelta(days=5)), (3, None)]:
+            conn.execute(
+                text("INSERT INTO user_subscribed (id, user_id, subs_id, end_date, created_at, modified_at) VALUES (:id, 1, 1, :end, :now, :now)"),
+                {"id": link_id, "end": end_date, "now": now},
+            )
+
+        with Operations.context(MigrationContext.configure(conn)):
+            load_migration().upgrade()
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def explain(db, statement, params=()) -> str:
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(params)).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def scenario_plans(db, scenario_type):
+    """EXPLAIN every statement the scenario runs against its tables."""
+    statements = []
+
+    def capture(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, params))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        list(messaging_service.iter_scenario_recipients(db, scenario_type))
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+    return [explain(db, statement, params) for statement, params in statements]
+
+
+def test_migration_creates_indexes(engine):
+    inspector = inspect(engine)
+    for table, names in NEW_INDEXES.items():
+        existing = {index["name"]: index for index in inspector.get_indexes(table)}
+        for name in names:
+            assert name in existing
+    unique = {i["name"]: i["unique"] for i in inspector.get_indexes("user_subscribed")}
+    assert unique["ix_user_subscribed_user_id_subs_id"]
+
+
+def test_migration_keeps_latest_link(db):
+    links = db.query(UserSubscribed).all()
+    assert [link.id for link in links] == [2]
+
+    db.add(UserSubscribed(id=4, user_id=1, subs_id=1))
+    with pytest.raises(IntegrityError):
+        db.commit()
+
+
+def test_daily_score_update_reads_one_day_of_rollup(db):
+    plans = scenario_plans(db, MessageScenarioType.DAILY_SCORE_UPDATE)
+    assert any("user_daily_activity USING INDEX sqlite_autoindex_user_daily_activity_1 (day=?)" in plan for plan in plans), plans
+
+
+def test_daily_play_reminder_uses_user_activity_index(db):
+    plans = scenario_plans(db, MessageScenarioType.DAILY_PLAY_REMINDER)
+    assert any("ix_user_daily_activity_user_id_day (user_id=? AND day=?)" in plan for plan in plans), plans
+
+
+def test_rollup_rebuild_uses_created_at_range(db):
+    statements = []
+
+    def capture(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO USER_DAILY_ACTIVITY"):
+            statements.append((statement, params))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        user_daily_activity.rebuild(db, start=date.today(), end=date.today() + timedelta(days=1))
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+
+    (statement, params), = statements
+    plan = explain(db, statement, params)
+    assert "ix_played_quizzes_created_at_user_id_subs_id (created_at>? AND created_at<?)" in plan, plan
+
+
+def test_subscription_expiry_uses_end_date_index(db):
+    plans = scenario_plans(db, MessageScenarioType.SUBSCRIPTION_EXPIRY)
+    assert any("ix_user_subscribed_end_date (end_date>? AND end_date<?)" in plan for plan in plans), plans
+
+
+def test_message_history_and_subscription_lookup_use_indexes(db):
+    history = db.query(Message).filter(Message.user_id == 1).order_by(Message.time)
+    by_name = db.query(Subscription).filter(Subscription.name == "Quiz")
+
+    for query, index in [(history, "ix_messages_user_id_time"), (by_name, "ix_subscriptions_name")]:
+        compiled = query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+        plan = explain(db, str(compiled))
+        assert f"USING INDEX {index}" in plan, plan
+
+
+def test_day_range_is_half_open():
+    start, end = day_range(date(2026, 1, 31))
+    assert (start, end) == (datetime(2026, 1, 31), datetime(2026, 2, 1))
+    assert day_range(date(2026, 1, 31), days=3)[1] == datetime(2026, 2, 3)
@@ -0,0 +1,90 @@
+import logging
+from datetime import date, datetime, timedelta
+
+import pytest
+import requests
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.enums import MessageScenarioType
+from app.models.quiz import UserSubscribed
+from app.services.messaging.recipients import Recipient
+from app.services.messaging.service import MessagingService
+from app.services.messaging.templates import templates
+from app.services.messaging.transport import HttpTransport
+
+NOON = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=12)
+
+
+class OfflineTransport(HttpTransport):
+    def request(self, method, url, **kwargs):
+        raise requests.ConnectionError(f"offline: {url}")
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def service():
+    return MessagingService(transport=OfflineTransport())
+
+
+def count_selects(db, table):
+    selects = []
+
+    def capture(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and f"FROM {table}" in statement:
+            selects.append(statement)
+
+    event.listen(db.connection(), "before_cursor_execute", capture)
+    return selects
+
+
+def test_subscription_expiry_loads_names_once_per_chunk(db, service):
+    db.add_all([Subscription(id=1, name="Quiz"), Subscription(id=2, name="Word")])
+    db.add_all(User(id=i, username=f"0170000{i:04d}") for i in range(1, 31))
+    db.add_all(
+        UserSubscribed(user_id=i, subs_id=1 if i % 2 else 2, end_date=NOON if i <= 20 else NOON + timedelta(days=3))
+        for i in range(1, 31)
+    )
+    db.commit()
+
+    selects = count_selects(db, "subscriptions")
+    recipients = list(service.iter_scenario_recipients(db, MessageScenarioType.SUBSCRIPTION_EXPIRY))
+
+    assert len(selects) == 1
+    expected = {name: templates.render("scenario.subscription_expiry", {"sub_name": name}) for name in ("Quiz", "Word")}
+    assert sorted(r.user_id for r in recipients) == list(range(1, 21))
+    assert all(r.text == expected["Quiz" if r.user_id % 2 else "Word"] for r in recipients)
+
+
+def test_daily_winner_fetch_failure_is_logged(db, service, caplog):
+    with caplog.at_level(logging.ERROR):
+        recipients = list(service.iter_scenario_recipients(db, MessageScenarioType.DAILY_WINNER_CONGRATS))
+
+    assert recipients == []
+    assert "could not fetch winners" in caplog.text
+
+
+def test_scenario_chunks_keep_links_and_contacts():
+    from app.tasks.scenario import pack_chunk, unpack_chunk
+
+    chunk = [
+        Recipient(1, "Quiz time", link="https://quiz.example/play", message_key="7"),
+        Recipient(2, "Quiz time", link="https://quiz.example/play", message_key="7"),
+        Recipient(None, "Welcome", to="someone@example.com"),
+    ]
+
+    payload = pack_chunk(chunk)
+
+    assert payload["texts"] == ["Quiz time", "Welcome"] and payload["links"] == ["https://quiz.example/play"]
+    assert unpack_chunk(payload) == chunk
@@ -0,0 +1,185 @@
+import threading
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.send_ledger import ANY_MESSAGE, LedgerKey, LedgerScope, scenario_send_ledger
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.enums import LedgerStatus, MessageScenarioType, MessengerType
+from app.models.daily_activity import UserDailyActivity
+from app.models.send_ledger import ScenarioSendLedger
+from app.services.messaging.recipients import Recipient
+from app.services.messaging.service import MessagingService
+from app.utils.helpers import utcnow
+
+SCENARIO = MessageScenarioType.DAILY_REFERRAL_PROMO
+DAY = date(2026, 10, 17)
+
+
+class RecordingService(MessagingService):
+    """Records what would be sent; user ids in `failing` fail to deliver."""
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.sent = []
+        self.failing = set(failing)
+        self.lock = threading.Lock()
+        self.barrier = None
+
+    def send_messages(self, db, messenger_type, recipients):
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        with self.lock:
+            self.sent.extend((r.user_id, r.text) for r in recipients)
+        return [r.user_id not in self.failing for r in recipients]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file database so concurrent runs each get their own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'ledger.db'}", connect_args={"check_same_thread": False, "timeout": 10})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def run(service, session_factory, recipients, chunk_size=100):
+    with session_factory() as db:
+        return service.send_scenario_recipients(db, SCENARIO, MessengerType.TELEGRAM, recipients, send_date=DAY, chunk_size=chunk_size)
+
+
+def ledger_rows(session_factory):
+    with session_factory() as db:
+        return {(r.user_id, r.message_key): r.status for r in db.query(ScenarioSendLedger)}
+
+
+def test_retried_chunk_sends_nothing_twice(session_factory):
+    service = RecordingService()
+    recipients = [Recipient(i, "hi") for i in range(1, 6)]
+
+    first = run(service, session_factory, recipients)
+    retry = run(service, session_factory, recipients)
+
+    assert sorted(service.sent) == [(i, "hi") for i in range(1, 6)]
+    assert (first["sent_count"], retry["sent_count"], retry["skipped_count"]) == (5, 0, 5)
+    assert set(ledger_rows(session_factory).values()) == {LedgerStatus.SENT}
+
+
+def test_concurrent_runs_split_the_audience(session_factory):
+    service = RecordingService()
+    service.barrier = threading.Barrier(2)
+    recipients = [Recipient(i, "hi") for i in range(1, 41)]
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(run(service, session_factory, recipients, chunk_size=10)))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every user is sent exactly once across both runs
+    assert sorted(service.sent) == [(i, "hi") for i in range(1, 41)]
+    assert sum(r["sent_count"] for r in results) == 40
+    assert sum(r["skipped_count"] for r in results) == 40
+
+
+def test_failed_send_is_released_and_retried(session_factory):
+    recipients = [Recipient(1, "hi"), Recipient(2, "hi")]
+
+    first = run(RecordingService(failing={2}), session_factory, recipients)
+    assert first["sent_count"] == 1
+    assert set(ledger_rows(session_factory)) == {(1, "")}
+
+    retry_service = RecordingService()
+    retry = run(retry_service, session_factory, recipients)
+    assert retry_service.sent == [(2, "hi")]
+    assert (retry["sent_count"], retry["skipped_count"]) == (1, 1)
+
+
+def test_crashed_send_releases_the_chunk(session_factory):
+    class CrashingService(RecordingService):
+        def send_messages(self, db, messenger_type, recipients):
+            raise RuntimeError("worker lost")
+
+    with pytest.raises(RuntimeError):
+        run(CrashingService(), session_factory, [Recipient(1, "hi")])
+
+    assert ledger_rows(session_factory) == {}
+
+
+def test_stale_claim_is_taken_over(session_factory):
+    scope = LedgerScope(SCENARIO, MessengerType.TELEGRAM, DAY)
+    held, dead = LedgerKey(1, ""), LedgerKey(2, "")
+    with session_factory() as db:
+        scenario_send_ledger.claim(db, scope=scope, keys=[held, dead], claim_id="other")
+        # The claim on user 2 belongs to a worker that died long ago
+        db.execute(update(ScenarioSendLedger).where(ScenarioSendLedger.user_id == 2).values(created_at=utcnow() - timedelta(hours=1)))
+        db.commit()
+
+    service = RecordingService()
+    run(service, session_factory, [Recipient(1, "hi"), Recipient(2, "hi")])
+
+    assert service.sent == [(2, "hi")]
+    assert ledger_rows(session_factory) == {(1, held.message_key): LedgerStatus.CLAIMED, (2, dead.message_key): LedgerStatus.SENT}
+
+
+def test_rerun_with_fresh_scores_sends_nothing(session_factory):
+    # The beat run, then a manual run later that day: the scores moved on
+    service = RecordingService()
+    morning = run(service, session_factory, [Recipient(1, "score 40", message_key="7"), Recipient(2, "score 10", message_key="7")])
+    evening = run(service, session_factory, [Recipient(1, "score 55", message_key="7"), Recipient(2, "score 12", message_key="7")])
+
+    assert service.sent == [(1, "score 40"), (2, "score 10")]
+    assert (morning["sent_count"], evening["sent_count"], evening["skipped_count"]) == (2, 0, 2)
+
+
+def test_one_message_per_key_for_each_user(session_factory):
+    service = RecordingService()
+    recipients = [
+        Recipient(1, "Quiz expires", message_key="7"),
+        Recipient(1, "Word expires", message_key="8"),
+        Recipient(1, "Quiz expires again", message_key="7"),
+    ]
+
+    result = run(service, session_factory, recipients)
+
+    assert service.sent == [(1, "Quiz expires"), (1, "Word expires")]
+    assert (result["sent_count"], result["skipped_count"]) == (2, 1)
+
+
+def test_migrated_rows_block_every_message_that_day(session_factory):
+    # A row carried over from the per-user ledger by migration b3d8f1a6c2e9
+    with session_factory() as db:
+        db.add(ScenarioSendLedger(
+            scenario_type=SCENARIO, send_date=DAY, messenger_type=MessengerType.TELEGRAM, user_id=1,
+            message_key=ANY_MESSAGE, claim_id="migrated", status=LedgerStatus.SENT, created_at=utcnow(),
+        ))
+        db.commit()
+
+    service = RecordingService()
+    result = run(service, session_factory, [Recipient(1, "hi", message_key="7"), Recipient(1, "hi"), Recipient(2, "hi")])
+
+    assert service.sent == [(2, "hi")]
+    assert result["skipped_count"] == 2
+
+
+def test_daily_score_update_rerun_after_new_high_score(session_factory):
+    with session_factory() as db:
+        db.add(UserDailyActivity(day=date.today(), user_id=1, subs_id=7, rounds=2, max_score=40, sum_score=60))
+        db.commit()
+    service = RecordingService()
+
+    with session_factory() as db:
+        service.send_scenario_messages(db, MessageScenarioType.DAILY_SCORE_UPDATE, MessengerType.TELEGRAM)
+        db.query(UserDailyActivity).update({"rounds": 3, "max_score": 55})
+        db.commit()
+        rerun = service.send_scenario_messages(db, MessageScenarioType.DAILY_SCORE_UPDATE, MessengerType.TELEGRAM)
+
+    assert len(service.sent) == 1 and "40" in service.sent[0][1]
+    assert (rerun["sent_count"], rerun["skipped_count"]) == (0, 1)
@@ -0,0 +1,225 @@
+import importlib.util
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.enums import PlatformType
+from app.services.leaderboard import leaderboard_service
+from app.crud.quiz import PlayedRecord
+from app.services.sync_service import SyncService
+
+MIGRATION = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "f2c8d6a9e4b1_add_played_quizzes_natural_key.py"
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements executed while the test runs."""
+    executed = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: executed.append(statement))
+    return executed
+
+
+def test_logins_upsert_in_bulk(db, statements, monkeypatch):
+    db.add_all([
+        User(username="01700000001", quizard=True),
+        User(username="01700000002", wordly=True, phone_number="keep-me"),
+    ])
+    db.commit()
+    statements.clear()
+    monkeypatch.setattr("app.services.sync_service.LOGIN_BATCH_SIZE", 2)
+
+    stats = SyncService()._process_logins(db, {
+        "quizard": [
+            {"username": "01700000001"},                          # already flagged
+            {"username": "01700000002", "phone": "01800000000"},  # exists, flag missing
+            {"username": "8801700000003", "phone": "01700000003"},
+            {"username": ""},
+        ],
+        "unknown": [{"username": "01700000009"}],
+    })
+
+    assert {k: stats[k] for k in ("inserted", "updated", "unchanged", "skipped")} == {
+        "inserted": 1, "updated": 1, "unchanged": 1, "skipped": 1,
+    }
+    assert [b["records"] for b in stats["batches"]] == [2, 1]
+    # Per batch: one lookup and at most one upsert
+    assert len([s for s in statements if s.lstrip().upper().startswith(("SELECT", "INSERT"))]) == 4
+
+    users = {u.username: u for u in db.query(User).all()}
+    assert set(users) == {"01700000001", "01700000002", "8801700000003"}
+    assert users["01700000002"].quizard and users["01700000002"].wordly
+    assert users["01700000002"].phone_number == "keep-me"
+    assert users["8801700000003"].quizard and not users["8801700000003"].wordly
+    assert users["8801700000003"].msisdn_key == "1700000003"
+    assert users["8801700000003"].phone_number == "01700000003"
+
+
+def test_subscription_links_upsert_per_batch(db, statements):
+    db.add_all([User(id=1, username="01700000001"), Subscription(id=1, name="Daily Pack", platform=PlatformType.QUIZARD)])
+    db.add(UserSubscribed(user_id=1, subs_id=1, start_date=datetime(2026, 1, 1), end_date=datetime(2026, 1, 31)))
+    db.commit()
+    statements.clear()
+
+    stats = SyncService()._process_subscriptions(db, {
+        "quizard": [
+            # Existing link: only end_date provided, start_date kept
+            {"username": "01700000001", "service_type": "Daily Pack", "end_date": "2026-02-28 00:00:00"},
+            {"username": "01700000002", "service_type": "Daily Pack", "start_date": "2026-02-01T10:00:00"},
+            {"username": "01700000002", "service_type": "Daily Pack", "end_date": "2026-03-01 10:00:00"},
+            {"username": "01700000002", "service_type": ""},
+        ],
+    })
+
+    assert stats["links"] == 2 and stats["skipped"] == 1
+    assert len([s for s in statements if s.lstrip().upper().startswith("INSERT INTO USER_SUBSCRIBED")]) == 1
+    links = {(l.user_id, l.subs_id): (l.start_date, l.end_date) for l in db.query(UserSubscribed).all()}
+    new_user = db.query(User).filter(User.username == "01700000002").one()
+    assert links == {
+        (1, 1): (datetime(2026, 1, 1), datetime(2026, 2, 28)),
+        (new_user.id, 1): (datetime(2026, 2, 1, 10), datetime(2026, 3, 1, 10)),
+    }
+
+
+def played_window(*rows):
+    return {"quizard": [
+        {"username": username, "service_type": "Daily Pack", "right_cout": score, "time_taken": 30, "time": played}
+        for username, score, played in rows
+    ]}
+
+
+def test_overlapping_played_windows_are_deduplicated(db, monkeypatch):
+    monkeypatch.setattr("app.services.sync_service.PLAYED_BATCH_SIZE", 2)
+    leaderboard_service.store.clear()
+    service = SyncService()
+
+    first = service._process_played(db, played_window(
+        ("01700000001", 7, "2026-03-01 10:00:00"),
+        ("01700000001", 9, "2026-03-01 10:05:00"),
+        ("01700000001", 9, "2026-03-01 10:05:00"),   # repeated within the window
+    ))
+    second = service._process_played(db, played_window(
+        ("01700000001", 9, "2026-03-01 10:05:00"),   # overlap with the previous window
+        ("01700000002", 4, "2026-03-01 10:20:00"),
+    ))
+
+    assert (first["inserted"], first["duplicates"]) == (2, 1)
+    assert (second["inserted"], second["duplicates"]) == (1, 1)
+    assert db.query(PlayedQuiz).count() == 3
+
+    rollup = {(r.user_id, r.rounds, r.sum_score) for r in db.query(UserDailyActivity).all()}
+    user1 = db.query(User).filter(User.username == "01700000001").one()
+    user2 = db.query(User).filter(User.username == "01700000002").one()
+    assert rollup == {(user1.id, 2, 16), (user2.id, 1, 4)}
+    assert leaderboard_service.top(None, 5) == [(user1.id, 16), (user2.id, 4)]
+
+
+def test_rows_the_database_ignores_are_skipped_not_failed(db):
+    db.add_all([User(id=1, username="01700000001"), Subscription(id=1, name="Daily Pack")])
+    db.commit()
+    played = datetime(2026, 3, 1, 10)
+    # INSERT OR IGNORE drops the NULL user like MySQL's IGNORE drops a bad foreign key
+    records = [PlayedRecord(1, 1, 5, 30, played), PlayedRecord(None, 1, 6, 30, played)]
+
+    counts = crud.quiz.insert_many(db, records=records)
+
+    assert (counts.inserted, counts.duplicates, counts.skipped) == (1, 0, 1)
+    assert [r.score for r in counts.records] == [5]
+    assert db.query(UserDailyActivity).one().sum_score == 5
+
+
+def test_rows_stored_by_a_concurrent_run_count_as_duplicates(db, monkeypatch):
+    db.add_all([User(id=1, username="01700000001"), Subscription(id=1, name="Daily Pack")])
+    db.add(PlayedQuiz(user_id=1, subs_id=1, score=5, time=30, created_at=datetime(2026, 3, 1, 10)))
+    db.commit()
+    records = [PlayedRecord(1, 1, 5, 30, datetime(2026, 3, 1, 10)), PlayedRecord(1, 1, 7, 30, datetime(2026, 3, 1, 11))]
+    lookups = []
+    real_filter = crud.quiz._filter_stored
+
+    def racing_filter(db, records):
+        # The first lookup ran before the other run committed its row
+        lookups.append(len(records))
+        return records if len(lookups) == 1 else real_filter(db, records)
+
+    monkeypatch.setattr(crud.quiz, "_filter_stored", racing_filter)
+    counts = crud.quiz.insert_many(db, records=records)
+
+    assert (counts.inserted, counts.duplicates, counts.skipped) == (1, 1, 0)
+    assert [r.score for r in counts.records] == [7]
+    assert db.query(PlayedQuiz).count() == 2
+    assert {r.sum_score for r in db.query(UserDailyActivity)} == {7}
+
+
+def test_natural_key_migration_dedupes_and_repairs_rollup(engine, db):
+    db.add_all([User(id=1, username="01700000001"), Subscription(id=1, name="Daily Pack")])
+    db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_played_quizzes_user_id_subs_id_created_at_score"))
+    played = datetime(2026, 3, 1, 10)
+    for score in (5, 5, 5, 8):
+        db.add(PlayedQuiz(user_id=1, subs_id=1, score=score, created_at=played))
+    db.commit()
+    crud.user_daily_activity.rebuild(db, start=played.date(), end=played.date() + timedelta(days=1))
+    assert db.query(UserDailyActivity).one().rounds == 4
+
+    spec = importlib.util.spec_from_file_location("natural_key", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with engine.begin() as conn, Operations.context(MigrationContext.configure(conn)):
+        migration.upgrade()
+
+    db.expire_all()
+    assert sorted(p.score for p in db.query(PlayedQuiz).all()) == [5, 8]
+    row = db.query(UserDailyActivity).one()
+    assert (row.rounds, row.sum_score, row.max_score) == (2, 13, 8)
+    assert "ix_played_quizzes_user_id_subs_id_created_at_score" in {i["name"] for i in inspect(engine).get_indexes("played_quizzes")}
+
+
+def test_sync_context_resolves_names_once_per_run(db, statements):
+    db.add_all([User(username="01700000001"), Subscription(name="Daily Pack")])
+    db.commit()
+    statements.clear()
+
+    payload = {
+        "login": {"quizard": [{"username": "01700000002"}]},
+        "subscription": {"quizard": [
+            {"username": name, "service_type": sub, "end_date": "2026-03-31 00:00:00"}
+            for name in ("01700000001", "01700000002", "01700000003") for sub in ("Daily Pack", "Weekly Pack")
+        ]},
+        "played": played_window(*[
+            (name, score, f"2026-03-01 10:{score:02d}:00")
+            for name in ("01700000001", "01700000002", "01700000003") for score in range(5)
+        ]),
+    }
+    report = SyncService()._process_payload(db, payload)
+
+    assert report["subscription"]["links"] == 6
+    assert report["played"]["inserted"] == 15
+    user_lookups = [s for s in statements if s.lstrip().startswith("SELECT") and "users.username =" in s]
+    sub_lookups = [s for s in statements if s.lstrip().startswith("SELECT") and "subscriptions.name =" in s]
+    # Only names missing from the preload are looked up (and created) one by one
+    assert len(user_lookups) == 1      # 01700000003
+    assert len(sub_lookups) == 1       # Weekly Pack
+    assert db.query(User).count() == 3 and db.query(Subscription).count() == 2
@@ -0,0 +1,162 @@
+import gzip
+import io
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.core.config import settings
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.services import sync_service as sync_module
+from app.services.sync_service import SyncService
+from app.services.sync_sources import PayloadStream, create_sync_session, fetch_sources
+
+PAYLOAD = {"login": {"quizard": [{"username": "01700000001"}]}}
+
+PLAYED = {"played": {"quizard": [
+    {"username": "01700000001", "service_type": "Daily Pack", "right_cout": score, "time_taken": 30, "time": f"2026-03-01 10:{minute:02d}:00"}
+    for score, minute in [(3, 0), (5, 10), (7, 20)]
+]}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    hits = {}
+    queries = []
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        Handler.queries.append(query)
+        if path == "/played":
+            self.send_json(PLAYED)
+            return
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        if self.path == "/slow":
+            time.sleep(1.0)
+        if self.path == "/flaky" and Handler.hits[self.path] == 1:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/broken":
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_json(PAYLOAD)
+
+    def send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def base_url():
+    Handler.hits = {}
+    Handler.queries = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_sources_yields_in_arrival_order(base_url):
+    urls = [f"{base_url}/slow", f"{base_url}/fast", f"{base_url}/flaky", f"{base_url}/broken"]
+    session = create_sync_session(retries=2, backoff=0.01)
+
+    start = time.perf_counter()
+    results = list(fetch_sources(urls, session=session))
+    elapsed = time.perf_counter() - start
+
+    order = [r.url.rsplit("/", 1)[1] for r in results]
+    assert order[-1] == "slow"
+    assert {r.url.rsplit("/", 1)[1]: r.body and json.load(r.body) for r in results} == {
+        "slow": PAYLOAD, "fast": PAYLOAD, "flaky": PAYLOAD, "broken": None,
+    }
+    assert Handler.hits["/flaky"] == 2      # retried after the 503
+    assert Handler.hits["/broken"] == 3     # first try + 2 retries
+    assert elapsed < 1.9                    # fetched concurrently, not one after another
+
+
+def test_sync_processes_each_source_as_it_arrives(base_url, db, monkeypatch):
+    monkeypatch.setattr(sync_module, "EXTERNAL_API_URLS", [f"{base_url}/slow", f"{base_url}/fast"])
+    service = SyncService()
+    service.session = create_sync_session(retries=0)
+    processed = []
+    monkeypatch.setattr(service, "_process_logins", lambda db, data: processed.append((time.perf_counter(), data)))
+
+    start = time.perf_counter()
+    service.sync_from_updates_api(db)
+
+    assert [data for _, data in processed] == [PAYLOAD["login"], PAYLOAD["login"]]
+    assert processed[0][0] - start < 0.9    # the fast source did not wait for the slow one
+
+
+def test_watermark_skips_consumed_records(base_url, db, monkeypatch):
+    source = f"{base_url}/played"
+    monkeypatch.setattr(sync_module, "EXTERNAL_API_URLS", [source])
+    monkeypatch.setattr(settings, "SYNC_WATERMARK_PARAMS", {"127.0.0.1": "since"})
+    service = SyncService()
+    service.session = create_sync_session(retries=0)
+
+    first = service.sync_from_updates_api(db)[source]
+    assert (first["stale"], first["played"]["inserted"]) == (0, 3)
+    assert crud.sync_state.get_all(db)[source].last_event_at == datetime(2026, 3, 1, 10, 20)
+
+    # The source ignores the watermark and replays the window: only the round
+    # at the mark reaches the database, where its natural key drops it
+    second = service.sync_from_updates_api(db)[source]
+    assert Handler.queries == ["", "since=2026-03-01+10%3A20%3A00"]
+    assert second["stale"] == 2
+    assert (second["played"]["inserted"], second["played"]["duplicates"]) == (0, 1)
+    assert db.query(PlayedQuiz).count() == 3
+
+
+def test_payload_stream_batches_by_platform():
+    body = io.BytesIO(json.dumps({
+        "login": {"quizard": [{"username": str(i)} for i in range(5)], "wordly": [{"username": "w"}]},
+        "other": {"quizard": [{"username": "ignored"}]},
+        "played": {"quizard": [{"username": "p", "meta": {"tags": [1, 2.5]}}]},
+        "cursor": "next-page",
+    }).encode())
+    stream = PayloadStream(body, batch_size=2)
+
+    batches = [(b.category, b.platform, [r["username"] for r in b.records]) for b in stream]
+
+    assert batches == [
+        ("login", "quizard", ["0", "1"]),
+        ("login", "quizard", ["2", "3"]),
+        ("login", "quizard", ["4"]),
+        ("login", "wordly", ["w"]),
+        ("played", "quizard", ["p"]),
+    ]
+    assert stream.cursor == "next-page"
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.core.config import settings
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.services import sync_service as sync_module
+from app.services.sync_service import SyncService
+from app.services.sync_sources import create_sync_session
+
+PLAYED_PER_PLATFORM = 40000
+LOGINS = 20000
+START = datetime(2026, 3, 1)
+
+
+def write_payload(path: str) -> None:
+    """A catch-up sized payload, written record by record so the test never holds it in memory."""
+    with open(path, "w") as f:
+        f.write('{"cursor": "page-42", "login": {"quizard": [')
+        f.write(",".join(json.dumps({"username": f"0170{i:07d}", "phone": f"0170{i:07d}"}) for i in range(LOGINS)))
+        f.write(']}, "played": {')
+        for p, platform in enumerate(("quizard", "wordly")):
+            f.write(("," if p else "") + f'"{platform}": [')
+            for i in range(PLAYED_PER_PLATFORM):
+                played = START + timedelta(seconds=i)
+                f.write(("," if i else "") + json.dumps({
+                    "username": f"0170{i % LOGINS:07d}", "service_type": f"{platform} daily",
+                    "right_cout": i % 10, "time_taken": 30, "time": played.strftime("%Y-%m-%d %H:%M:%S"),
+                    "meta": {"device": "android", "tags": ["a", "b"]},
+                }))
+            f.write("]")
+        f.write("}}")
+
+
+@pytest.fixture(scope="module")
+def payload_file():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "payload.json")
+    write_payload(path)
+    yield path
+    shutil.rmtree(directory)
+
+
+@pytest.fixture
+def base_url(payload_file):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(os.path.getsize(payload_file)))
+            self.end_headers()
+            with open(payload_file, "rb") as f:
+                shutil.copyfileobj(f, self.wfile, 64 * 1024)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_large_payload_is_processed_in_bounded_memory(base_url, payload_file, db, monkeypatch):
+    source = f"{base_url}/catch-up"
+    monkeypatch.setattr(sync_module, "EXTERNAL_API_URLS", [source])
+    monkeypatch.setattr(settings, "SYNC_SPOOL_MAX_MB", 1)
+    monkeypatch.setattr(settings, "SYNC_STREAM_BATCH_SIZE", 500)
+
+    service = SyncService()
+    service.session = create_sync_session(retries=0)
+    received = {}
+    largest_batch = 0
+
+    def process_batch(db, category, platform_name, records, ctx):
+        # Stand-in for the DB phases: this test is about the parsing pipeline
+        nonlocal largest_batch
+        largest_batch = max(largest_batch, len(records))
+        received[(category, platform_name)] = received.get((category, platform_name), 0) + len(records)
+        return {"inserted": len(records), "failed": 0}
+
+    monkeypatch.setattr(service, "_process_batch", process_batch)
+
+    tracemalloc.start()
+    report = service.sync_from_updates_api(db)[source]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    payload_size = os.path.getsize(payload_file)
+    assert received == {
+        ("login", "quizard"): LOGINS,
+        ("played", "quizard"): PLAYED_PER_PLATFORM,
+        ("played", "wordly"): PLAYED_PER_PLATFORM,
+    }
+    assert report["played"]["inserted"] == 2 * PLAYED_PER_PLATFORM
+    assert largest_batch == 500
+    assert payload_size > 14 * 1024 * 1024
+    # Peak Python allocations are bounded by the spool buffer and one batch,
+    # not the payload: no full body or parsed document is ever in memory
+    # (json.loads of this payload alone allocates well over 100 MB)
+    assert peak < 5 * 1024 * 1024, (peak, payload_size)
+
+    state = crud.sync_state.get_all(db)[source]
+    assert state.cursor == "page-42"
+    assert state.last_event_at == START + timedelta(seconds=PLAYED_PER_PLATFORM - 1)
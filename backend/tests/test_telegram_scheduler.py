@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import redis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+from app.core.config import settings
+from app.services.messaging import telegram_scheduler
+from app.services.messaging.telegram_scheduler import RedisTokenBucket, TelegramSendScheduler, TokenBucket
+from app.services.messaging.transport import AsyncHttpTransport
+
+
+class FakeBotAPI(ThreadingHTTPServer):
+    """Local stand-in for api.telegram.org that records every sendMessage call."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.calls = []            # (chat_id, monotonic time)
+        self.rate_limited = 0      # answer the next N calls with 429
+        self.retry_after = 1
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), FakeBotHandler)
+
+
+class FakeBotHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        server = self.server
+        with server.lock:
+            server.calls.append((body["chat_id"], time.monotonic()))
+            throttle = server.rate_limited > 0
+            if throttle:
+                server.rate_limited -= 1
+
+        if throttle:
+            status = 429
+            reply = {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                     "parameters": {"retry_after": server.retry_after}}
+        else:
+            status = 200
+            reply = {"ok": True, "result": {"message_id": len(server.calls)}}
+
+        data = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def bot_api(monkeypatch):
+    server = FakeBotAPI()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "TELEGRAM_API_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "test-token")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run_scheduler(messages, **scheduler_kwargs):
+    async def run():
+        async with AsyncHttpTransport(max_connections=50, max_keepalive_connections=50, timeout=5) as transport:
+            scheduler = TelegramSendScheduler(transport, **scheduler_kwargs)
+            results = await asyncio.gather(*(scheduler.send(chat_id, text) for chat_id, text in messages))
+            return results, scheduler.stats()
+
+    return asyncio.run(run())
+
+
+def test_per_chat_limit_spaces_messages(bot_api):
+    results, stats = run_scheduler([("42", f"msg {i}") for i in range(3)], global_rate=100, per_chat_rate=5)
+
+    assert all(results)
+    assert stats["sent"] == 3
+    times = [t for _, t in bot_api.calls]
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert min(gaps) >= 0.18  # 1 / per_chat_rate, minus scheduling jitter
+
+
+def test_global_limit_caps_throughput(bot_api):
+    results, stats = run_scheduler([(str(1000 + i), "hello") for i in range(20)], global_rate=10, per_chat_rate=100)
+
+    assert all(results)
+    # First 10 go out as a burst, the remaining 10 at 10/s
+    assert stats["elapsed_s"] >= 0.85
+    assert stats["throughput_per_s"] <= 25
+    assert len(bot_api.calls) == 20
+
+
+def test_429_is_requeued_after_retry_after(bot_api):
+    bot_api.rate_limited = 1
+    bot_api.retry_after = 1
+
+    results, stats = run_scheduler([("7", "hello")], global_rate=30, per_chat_rate=1)
+
+    assert results == [True]
+    assert stats["sent"] == 1
+    assert stats["retried"] == 1
+    assert stats["failed"] == 0
+    (_, first), (_, second) = bot_api.calls
+    assert second - first >= 0.95
+
+
+def test_gives_up_after_max_attempts(bot_api):
+    bot_api.rate_limited = 100
+    bot_api.retry_after = 0
+
+    results, stats = run_scheduler([("7", "hello")], global_rate=100, per_chat_rate=100, max_attempts=3)
+
+    assert results == [False]
+    assert stats["retried"] == 3
+    assert stats["failed"] == 1
+    assert len(bot_api.calls) == 3
+
+
+def test_local_bucket_is_reserved_on_the_event_loop(bot_api, monkeypatch):
+    async def no_thread_hop(fn, *args):
+        raise AssertionError(f"{fn} sent to a thread")
+
+    monkeypatch.setattr(telegram_scheduler.asyncio, "to_thread", no_thread_hop)
+    bot_api.rate_limited = 1
+    bot_api.retry_after = 0
+
+    results, stats = run_scheduler([("1", "a"), ("2", "b")], global_rate=100, per_chat_rate=100)
+
+    assert results == [True, True]
+    assert stats["retried"] == 1
+
+
+def test_default_schedulers_share_one_process_bucket(monkeypatch):
+    monkeypatch.setattr(telegram_scheduler, "_global_bucket", None)
+    monkeypatch.setattr(settings, "TELEGRAM_RATE_BACKEND", "memory")
+    monkeypatch.setattr(settings, "TELEGRAM_GLOBAL_RATE", 30.0)
+    monkeypatch.setattr(settings, "TELEGRAM_RATE_PROCESSES", 3)
+
+    first = TelegramSendScheduler(transport=None, strategy=object())
+    second = TelegramSendScheduler(transport=None, strategy=object())
+
+    assert first.global_bucket is second.global_bucket
+    assert first.global_bucket.rate == 10.0
+
+
+def test_redis_bucket_falls_back_to_local_bucket():
+    client = redis.Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.2, retry=Retry(NoBackoff(), 0))
+    local = TokenBucket(rate=5, capacity=1, clock=lambda: 0.0)
+    bucket = RedisTokenBucket(client, "telegram:rate:test", rate=30, fallback=local)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.05)
+    bucket.pause(2)
+    assert local.reserve() >= 2
@@ -0,0 +1,41 @@
+import pytest
+
+from app.services.messaging.templates import CompiledTemplate, TemplateError, compile_custom_text
+
+
+@pytest.mark.parametrize("source, values, expected", [
+    ("score {a}", {"a": 7}, "score 7"),
+    ("{a} and {b}", {"a": 1, "b": None}, "1 and None"),
+    ("{a}{b}{c}!", {"a": "x", "b": "y", "c": "z"}, "xyz!"),
+    # More fields than the unrolled arities, with a repeated field
+    ("{a}-{b}-{c}-{d}-{a}", {"a": 1, "b": 2, "c": 3, "d": 4}, "1-2-3-4-1"),
+])
+def test_render_fills_every_field(source, values, expected):
+    template = CompiledTemplate("t", source)
+    assert template.render(values) == expected
+    assert template.render_many([values, values]) == [expected, expected]
+
+
+def test_literal_braces_and_values_are_not_formatted():
+    template = CompiledTemplate("t", "{{not a field}} {name} {0} {}")
+    assert template.render({"name": "{name}"}) == "{{not a field}} {name} {0} {}"
+
+
+def test_strict_template_reports_missing_value():
+    template = CompiledTemplate("t", "{a} {b}")
+    with pytest.raises(TemplateError, match="missing a value for b"):
+        template.render_many([{"a": 1, "b": 2}, {"a": 1}])
+
+
+def test_strict_template_rejects_undeclared_placeholder():
+    with pytest.raises(TemplateError, match="undeclared placeholders: other"):
+        CompiledTemplate("t", "{name} {other}", fields=("name",))
+
+
+def test_custom_text_leaves_unknown_and_missing_fields():
+    template = compile_custom_text("Hi {username}, {total_score} pts {unknown}")
+
+    assert template.render_many([
+        {"username": "rafi", "total_score": 12},
+        {"username": "mim"},
+    ]) == ["Hi rafi, 12 pts {unknown}", "Hi mim, {total_score} pts {unknown}"]
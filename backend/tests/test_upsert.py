@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.crud.quiz import Link
+from app.crud.upsert import upsert
+from app.database.base import Base
+from app.models import *  # noqa: F401,F403 - register every table
+from app.models.enums import PlatformType
+from app.models.quiz import UserSubscribed
+
+metadata = MetaData()
+counters = Table(
+    "counters", metadata,
+    Column("name", String(20), primary_key=True),
+    Column("hits", Integer, nullable=False),
+    Column("label", String(20), nullable=True),
+)
+
+
+@pytest.fixture(params=["native", "generic"])
+def db(request):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    metadata.create_all(engine)
+    if request.param == "generic":
+        # A dialect without a native upsert takes the select-then-write path
+        engine.dialect.name = "generic"
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_upsert_inserts_and_merges(db):
+    def merge(new):
+        return {"hits": counters.c.hits + new.hits, "label": func.coalesce(new.label, counters.c.label)}
+
+    upsert(db, counters, [{"name": "a", "hits": 1, "label": "first"}, {"name": "b", "hits": 2, "label": None}],
+           key=[counters.c.name], set_=merge)
+    upsert(db, counters, [{"name": "a", "hits": 5, "label": None}, {"name": "c", "hits": 1, "label": "new"}],
+           key=[counters.c.name], set_=merge)
+    db.commit()
+
+    rows = db.execute(select(counters).order_by(counters.c.name)).all()
+    assert [tuple(row) for row in rows] == [("a", 6, "first"), ("b", 2, None), ("c", 1, "new")]
+
+
+def test_upsert_platform_users_sets_the_flag(db):
+    db.add(User(username="01711111111", quizard=True))
+    db.commit()
+
+    counts = crud.user.upsert_platform_users(
+        db, platform=PlatformType.WORDLY, users=[("01711111111", None), ("01722222222", "01722222222")]
+    )
+
+    assert (counts.inserted, counts.updated, counts.unchanged) == (1, 1, 0)
+    users = {u.username: u for u in db.query(User)}
+    assert users["01711111111"].quizard and users["01711111111"].wordly
+    assert users["01722222222"].wordly and users["01722222222"].msisdn_key == "1722222222"
+
+
+def test_user_subscribed_upsert_keeps_dates_not_provided(db):
+    db.add_all([User(id=1, username="01711111111"), User(id=2, username="01722222222"), Subscription(id=7, name="Quiz")])
+    db.commit()
+    start, end, renewed = datetime(2026, 10, 1), datetime(2026, 10, 31), datetime(2026, 11, 30)
+
+    assert crud.user_subscribed.upsert_many(db, links=[Link(1, 7, start, end)]) == 1
+    assert crud.user_subscribed.upsert_many(db, links=[Link(1, 7, end_date=renewed), Link(2, 7, start)]) == 2
+
+    links = {row.user_id: (row.start_date, row.end_date) for row in db.query(UserSubscribed)}
+    assert links == {1: (start, renewed), 2: (start, None)}